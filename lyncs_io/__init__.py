@@ -3,3 +3,9 @@
 __version__ = "0.2.3"
 
 from .base import *
+from .batch import *
+from .background import *
+from .stream import *
+from .transcode import *
+from .writer import *
+from .pread import *
@@ -0,0 +1,116 @@
+"""
+Asynchronous interface (asyncio) for saving and loading data.
+
+The blocking reads and writes are executed in a pool of threads,
+while the number of concurrent operations is limited globally.
+"""
+
+__all__ = [
+    "load",
+    "head",
+    "save",
+    "set_limit",
+]
+
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
+from threading import Event
+from weakref import WeakKeyDictionary
+from .base import load_with, head_with, save_with
+from .formats import formats
+from .utils import find_file
+
+# Formats whose load can be interrupted while reading (see utils.read_array)
+chunked_formats = ["numpy", "lime", "openqcd"]
+
+_limit = 16
+_executor = None
+_semaphores = WeakKeyDictionary()
+
+
+def set_limit(limit):
+    "Sets the maximum number of concurrent operations (and threads in the pool)"
+    # pylint: disable=global-statement
+    global _limit, _executor
+    if limit < 1:
+        raise ValueError("limit must be a positive integer")
+    _limit = limit
+    _semaphores.clear()
+    if _executor is not None:
+        _executor.shutdown(wait=False)
+        _executor = None
+
+
+def get_executor():
+    "Returns the pool of threads used for the operations"
+    # pylint: disable=global-statement
+    global _executor
+    if _executor is None:
+        _executor = ThreadPoolExecutor(max_workers=_limit, thread_name_prefix="aio")
+    return _executor
+
+
+def _semaphore():
+    "Returns the semaphore of the running event loop"
+    loop = asyncio.get_running_loop()
+    if loop not in _semaphores:
+        _semaphores[loop] = asyncio.Semaphore(_limit)
+    return _semaphores[loop]
+
+
+async def run(fnc, *args, cancel=None, **kwargs):
+    """
+    Runs fnc in the pool of threads. If cancel is given, it is passed to fnc
+    and set when the coroutine is cancelled for interrupting the function.
+    """
+    if cancel is not None:
+        kwargs["cancel"] = cancel
+    async with _semaphore():
+        future = get_executor().submit(partial(fnc, *args, **kwargs))
+        try:
+            return await asyncio.shield(asyncio.wrap_future(future))
+        except asyncio.CancelledError:
+            future.cancel()
+            if cancel is not None:
+                cancel.set()
+            raise
+
+
+def _get_format(filename, format=None, sniff=True):
+    "Returns the filename and its format"
+    if sniff:
+        filename = find_file(filename)
+    return filename, formats.get_format(format, filename=filename, sniff=sniff)
+
+
+async def load(filename, format=None, **kwargs):
+    """
+    Loads data from a file. See lyncs_io.load.
+
+    For the formats in chunked_formats, the reading of the data is interrupted
+    if the coroutine is cancelled. Otherwise the operation is completed
+    in background and the result discarded.
+    """
+    filename, fmt = await run(_get_format, filename, format)
+
+    cancel = None
+    if str(fmt).lower() in chunked_formats and not {"comm", "chunks"} & set(kwargs):
+        cancel = Event()
+    return await run(load_with, fmt, filename, cancel=cancel, **kwargs)
+
+
+async def head(filename, format=None, **kwargs):
+    "Returns the header of a file. See lyncs_io.head."
+    filename, fmt = await run(_get_format, filename, format)
+    return await run(head_with, fmt, filename, **kwargs)
+
+
+async def save(obj, filename, format=None, **kwargs):
+    """
+    Saves data into a file. See lyncs_io.save.
+
+    NOTE: writes are not interrupted if the coroutine is cancelled.
+    """
+    fmt = formats.get_format(format, filename=filename, sniff=False)
+    return await run(save_with, fmt, obj, filename, **kwargs)
@@ -7,6 +7,7 @@ from typing import Any
 from dataclasses import dataclass
 from lyncs_utils import to_path
 from .header import Header
+from .utils import dir_index
 
 
 @dataclass
@@ -213,7 +214,7 @@ def split_filename(filename, key=None):
     except TypeError:
         return filename, key
 
-    while not path.parent.is_dir():
+    while not dir_index.is_dir(path.parent):
         if key:
             key = f"{path.name}/{key}"
         else:
@@ -0,0 +1,160 @@
+"""
+Saving in background with snapshot semantics.
+
+The data is copied (snapshot) when save is called, such that it can be
+modified right after, and written to file by a background thread.
+For parallel writes (comm) of numpy and lime files, non-blocking MPI is used.
+The number of outstanding snapshots is limited for bounding the memory.
+"""
+
+__all__ = [
+    "flush_all",
+]
+
+import copy
+from collections.abc import Mapping
+from concurrent.futures import Future, ThreadPoolExecutor
+from threading import Condition
+import numpy
+from .formats import formats
+from .utils import is_dask_array
+
+# Formats supporting non-blocking MPI writes (nonblocking option of save)
+nonblocking_formats = ["numpy", "lime"]
+
+_limit = 4
+_executor = None
+_condition = Condition()
+_outstanding = set()
+_mpi_outstanding = []
+
+
+def set_limit(limit):
+    "Sets the maximum number of outstanding snapshots"
+    # pylint: disable=global-statement
+    global _limit
+    if limit < 1:
+        raise ValueError("limit must be a positive integer")
+    with _condition:
+        _limit = limit
+        _condition.notify_all()
+
+
+def get_executor():
+    "Returns the thread writing the snapshots. Writes are executed in order."
+    # pylint: disable=global-statement
+    global _executor
+    if _executor is None:
+        _executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="lyncs_io")
+    return _executor
+
+
+def snapshot(obj):
+    "Returns a copy of obj that is not affected by later changes of obj"
+    if is_dask_array(obj):
+        raise TypeError("Dask arrays cannot be saved in background")
+    if isinstance(obj, numpy.ndarray):
+        return obj.copy(order="K")
+    if isinstance(obj, Mapping):
+        return {key: snapshot(val) for key, val in obj.items()}
+    return copy.deepcopy(obj)
+
+
+class MpiSave(Future):
+    """
+    Future of a non-blocking MPI write.
+    The write is completed by result or wait, that are collective operations.
+    """
+
+    def __init__(self, handle):
+        super().__init__()
+        self.handle = handle
+        self.set_running_or_notify_cancel()
+
+    def wait(self):
+        "Waits for the write to complete (collective)"
+        if not super().done():
+            try:
+                self.handle.wait()
+                self.set_result(None)
+            except Exception as err:  # pylint: disable=broad-except
+                self.set_exception(err)
+
+    def result(self, timeout=None):
+        self.wait()
+        return super().result(timeout)
+
+    def exception(self, timeout=None):
+        self.wait()
+        return super().exception(timeout)
+
+
+def _release(future):
+    with _condition:
+        _outstanding.discard(future)
+        _condition.notify_all()
+
+
+def save(obj, filename, format=None, comm=None, **kwargs):
+    """
+    Saves a snapshot of obj into a file in background. See lyncs_io.save.
+    Blocks if the number of outstanding snapshots is at the limit (see set_limit).
+
+    Returns
+    -------
+    future: Future
+        A future that completes once the data has been written.
+        For MPI writes, waiting the future is a collective operation.
+    """
+    # pylint: disable=import-outside-toplevel
+    # base imports this module
+    from .base import save_with
+
+    fmt = formats.get_format(format, filename=filename, sniff=False)
+
+    if comm is not None:
+        if str(fmt).lower() not in nonblocking_formats:
+            # writing in place since the operation is collective
+            future = Future()
+            future.set_result(save_with(fmt, obj, filename, comm=comm, **kwargs))
+            return future
+
+        # all the processes have the same list of writes, thus this is deterministic
+        while len(_mpi_outstanding) >= _limit:
+            _mpi_outstanding.pop(0).wait()
+        handle = save_with(
+            fmt, snapshot(obj), filename, comm=comm, nonblocking=True, **kwargs
+        )
+        future = MpiSave(handle)
+        _mpi_outstanding.append(future)
+        return future
+
+    with _condition:
+        _condition.wait_for(lambda: len(_outstanding) < _limit)
+        future = get_executor().submit(
+            save_with, fmt, snapshot(obj), filename, **kwargs
+        )
+        _outstanding.add(future)
+    future.add_done_callback(_release)
+    return future
+
+
+def wait(*futures):
+    "Waits for the futures to complete and returns their results"
+    return [future.result() for future in futures]
+
+
+def flush_all():
+    """
+    Waits for all the outstanding writes to complete.
+    Raises the first error of the writes, if any.
+    Collective operation if MPI writes are pending.
+    """
+    futures = list(_mpi_outstanding)
+    _mpi_outstanding.clear()
+    # all the MPI writes are completed before raising any error
+    for future in futures:
+        future.wait()
+    with _condition:
+        futures += list(_outstanding)
+    wait(*futures)
@@ -10,7 +10,10 @@ __all__ = [
     "formats",
 ]
 
+from lyncs_utils.io import FileLike
 from .formats import formats
+from . import background as _background
+from . import metrics as _metrics
 from .utils import find_file
 
 
@@ -27,14 +30,45 @@ def load(filename, format=None, **kwargs):
         on the format.
     format: str, Format
         One of the implemented formats. See documentation for more details.
+        If not given, it is deduced from the content of the file or its extension.
     """
 
+    filename, fmt = _find_format(filename, format, kwargs.get("comm"))
+    return load_with(fmt, filename, **kwargs)
+
+
+def load_with(fmt, filename, **kwargs):
+    "Loads data from a file with the given format (measured, see lyncs_io.metrics)"
+    with _metrics.measure("load", fmt.name.lower(), filename) as record:
+        data = fmt.load(filename, **kwargs)
+        record.nbytes = _metrics.data_nbytes(data)
+    return data
+
+
+def _find_format(filename, format=None, comm=None):
+    """
+    Returns the filename (see find_file) and the format of the file.
+    If comm is given, the file is looked up and sniffed by rank 0 only.
+    """
+    # pylint: disable=redefined-builtin
+    if comm is not None and not isinstance(filename, FileLike):
+        # pylint: disable=import-outside-toplevel
+        from .mpi_io import on_root
+
+        filename, name = on_root(comm, _find_format_name, filename, format)
+        return filename, formats.get_format(name)
+
     filename = find_file(filename)
+    return filename, formats.get_format(format, filename=filename)
 
-    return formats.get_format(format, filename=filename).load(filename, **kwargs)
 
+def _find_format_name(filename, format=None):
+    # pylint: disable=redefined-builtin
+    filename, fmt = _find_format(filename, format)
+    return filename, fmt.name
 
-def head(filename, format=None, **kwargs):
+
+def head(filename, format=None, comm=None, **kwargs):
     """
     Returns the header of a file. Reads the information about the content of the file
     without actually loading the data. Returns either an Header class or an Archive
@@ -46,17 +80,32 @@ def head(filename, format=None, **kwargs):
         The filename of the data file to read. It can also be a file-like object.
     format: str, Format
         One of the implemented formats. See documentation for more details.
+        If not given, it is deduced from the content of the file or its extension.
+    comm: MPI.Comm
+        If given, the header is read by rank 0 only and broadcast to comm.
     kwargs: dict
         Additional options for performing the reading. The list of options depends
         on the format.
     """
 
+    if comm is not None and not isinstance(filename, FileLike):
+        # pylint: disable=import-outside-toplevel
+        from .mpi_io import on_root
+
+        return on_root(comm, head, filename, format=format, **kwargs)
+
     filename = find_file(filename)
+    fmt = formats.get_format(format, filename=filename)
+    return head_with(fmt, filename, **kwargs)
+
 
-    return formats.get_format(format, filename=filename).head(filename, **kwargs)
+def head_with(fmt, filename, **kwargs):
+    "Returns the header of a file with the given format (measured)"
+    with _metrics.measure("head", fmt.name.lower(), filename):
+        return fmt.head(filename, **kwargs)
 
 
-def save(obj, filename, format=None, **kwargs):
+def save(obj, filename, format=None, background=False, **kwargs):
     """
     Saves data into a file.
 
@@ -66,12 +115,26 @@ def save(obj, filename, format=None, **kwargs):
         The filename of the data file to write. It can also be a file-like object.
     format: str, Format
         One of the implemented formats. See documentation for more details.
+    background: bool
+        If True, a snapshot of the data is written in background and a Future
+        is returned. See lyncs_io.background and lyncs_io.flush_all.
     kwargs: dict
         Additional options for performing the writing. The list of options depends
         on the format.
     """
 
-    return formats.get_format(format, filename=filename).save(obj, filename, **kwargs)
+    if background:
+        return _background.save(obj, filename, format=format, **kwargs)
+
+    fmt = formats.get_format(format, filename=filename, sniff=False)
+    return save_with(fmt, obj, filename, **kwargs)
+
+
+def save_with(fmt, obj, filename, **kwargs):
+    "Saves data into a file with the given format (measured)"
+    nbytes = _metrics.data_nbytes(obj)
+    with _metrics.measure("save", fmt.name.lower(), filename, nbytes):
+        return fmt.save(obj, filename, **kwargs)
 
 
 dump = save
@@ -0,0 +1,226 @@
+"""
+Batched versions of load, head and save executed over a pool of workers
+"""
+
+__all__ = [
+    "load_many",
+    "head_many",
+    "save_many",
+]
+
+import os
+from collections.abc import Mapping
+from concurrent.futures import (
+    Executor,
+    ThreadPoolExecutor,
+    ProcessPoolExecutor,
+    wait,
+    FIRST_COMPLETED,
+    FIRST_EXCEPTION,
+    ALL_COMPLETED,
+)
+from contextlib import contextmanager
+from . import base
+
+executors = {
+    "thread": ThreadPoolExecutor,
+    "process": ProcessPoolExecutor,
+}
+
+
+@contextmanager
+def get_executor(executor="thread", workers=None):
+    "Returns an executor. Executors given by the user are not shut down."
+    if isinstance(executor, Executor):
+        yield executor
+        return
+    if executor not in executors:
+        raise ValueError(f"Unknown executor {executor}. Available: {list(executors)}")
+    with executors[executor](max_workers=workers) as pool:
+        yield pool
+
+
+def run_many(
+    fnc,
+    calls,
+    workers=None,
+    executor="thread",
+    max_bytes=None,
+    errors="return",
+):
+    """
+    Executes fnc for each call in calls over a pool of workers.
+
+    Parameters
+    ----------
+    fnc: callable
+        The function to execute.
+    calls: iterable
+        List of (args, kwargs, nbytes) where nbytes is the number of bytes
+        transferred by the call (used for bounding the bytes in flight).
+        It is consumed while the calls are submitted.
+    workers: int
+        Number of workers of the pool.
+    executor: str, Executor
+        Either "thread", "process" or an instance of concurrent.futures.Executor.
+    max_bytes: int
+        Maximum number of bytes in flight. At least one call is always executed.
+    errors: str
+        Either "return", the exceptions are returned in place of the results,
+        or "raise", the calls not started are cancelled at the first failure
+        and its exception is raised (the first in the order of the calls
+        among the failed ones).
+
+    Returns
+    -------
+    results: list
+        The results in the same order of the calls.
+    """
+    if errors not in ("return", "raise"):
+        raise ValueError("errors must be either 'return' or 'raise'")
+
+    raising = errors == "raise"
+    results = []
+    pending = {}
+    in_flight = 0
+    failed = []
+
+    def collect(futures):
+        nonlocal in_flight
+        for future in futures:
+            idx, nbytes = pending.pop(future)
+            in_flight -= nbytes
+            if future.cancelled():
+                continue
+            try:
+                results[idx] = future.result()
+            except Exception as err:  # pylint: disable=broad-except
+                results[idx] = err
+                failed.append(idx)
+
+    with get_executor(executor, workers) as pool:
+        try:
+            for idx, (args, kwargs, nbytes) in enumerate(calls):
+                while pending and max_bytes and in_flight + nbytes > max_bytes:
+                    done, _ = wait(pending, return_when=FIRST_COMPLETED)
+                    collect(done)
+                if raising and failed:
+                    break
+                results.append(None)
+                future = pool.submit(fnc, *args, **kwargs)
+                pending[future] = (idx, nbytes)
+                in_flight += nbytes
+
+            when = FIRST_EXCEPTION if raising else ALL_COMPLETED
+            while pending and not (raising and failed):
+                done, _ = wait(pending, return_when=when)
+                collect(done)
+        finally:
+            for future in pending:
+                future.cancel()
+            collect(wait(pending).done)
+
+    if raising and failed:
+        raise results[min(failed)]
+    return results
+
+
+def _file_size(filename):
+    "Size of the file or zero if unknown (file-like objects, archive paths)"
+    try:
+        return os.path.getsize(filename)
+    except (OSError, TypeError):
+        return 0
+
+
+def load_many(
+    filenames,
+    format=None,
+    workers=None,
+    executor="thread",
+    max_bytes=None,
+    errors="return",
+    **kwargs,
+):
+    """
+    Loads data from many files over a pool of workers.
+
+    Parameters
+    ----------
+    filenames: iterable
+        The filenames of the data files to read.
+    format: str, Format
+        One of the implemented formats. If not given, it is deduced per file.
+    workers: int
+        Number of workers of the pool.
+    executor: str, Executor
+        Either "thread", "process" or an instance of concurrent.futures.Executor.
+    max_bytes: int
+        Maximum number of bytes (size of the files) being read at the same time.
+    errors: str
+        Either "return" (default) or "raise". See `run_many`.
+    kwargs: dict
+        Additional options passed to `load`.
+
+    Returns
+    -------
+    data: list
+        The loaded data in the same order of filenames.
+        Failed loads are replaced by their exception if errors="return".
+    """
+    calls = (
+        ((filename,), dict(format=format, **kwargs), _file_size(filename))
+        for filename in filenames
+    )
+    return run_many(base.load, calls, workers, executor, max_bytes, errors)
+
+
+def head_many(
+    filenames, format=None, workers=None, executor="thread", errors="return", **kwargs
+):
+    """
+    Reads the headers of many files over a pool of workers.
+    Same parameters as `load_many` (but max_bytes). Returns the list of headers.
+    """
+    calls = (((filename,), dict(format=format, **kwargs), 0) for filename in filenames)
+    return run_many(base.head, calls, workers, executor, errors=errors)
+
+
+def save_many(
+    objs,
+    format=None,
+    workers=None,
+    executor="thread",
+    max_bytes=None,
+    errors="return",
+    **kwargs,
+):
+    """
+    Saves many objects into files over a pool of workers.
+
+    Parameters
+    ----------
+    objs: Mapping, iterable
+        Either a mapping of filename -> object or an iterable of (filename, object).
+    format: str, Format
+        One of the implemented formats. If not given, it is deduced per file.
+    workers, executor, errors:
+        See `load_many`.
+    max_bytes: int
+        Maximum number of bytes (nbytes of the objects) being written at the same time.
+    kwargs: dict
+        Additional options passed to `save`.
+
+    Returns
+    -------
+    results: list
+        The values returned by save in the same order of objs.
+        Failed saves are replaced by their exception if errors="return".
+    """
+    if isinstance(objs, Mapping):
+        objs = objs.items()
+    calls = (
+        ((obj, filename), dict(format=format, **kwargs), getattr(obj, "nbytes", 0))
+        for filename, obj in objs
+    )
+    return run_many(base.save, calls, workers, executor, max_bytes, errors)
@@ -0,0 +1,14 @@
+"""
+Benchmarks of load, save and head for the registered formats.
+
+Standalone runner (see --help for the options):
+
+    python -m lyncs_io.benchmarks --sizes 1KB 1MB 1GB 20GB --output results.json
+    mpirun -n 4 python -m lyncs_io.benchmarks --mode mpi
+
+With pytest-benchmark:
+
+    pytest --pyargs lyncs_io.benchmarks --benchmark-json results.json
+"""
+
+from .suite import *
@@ -0,0 +1,57 @@
+"Command line interface of the benchmarks"
+
+import argparse
+import json
+from .suite import cases, modes, run, compare
+
+
+def main(args=None):
+    "Runs the benchmarks"
+    parser = argparse.ArgumentParser(
+        prog="python -m lyncs_io.benchmarks", description=__doc__
+    )
+    parser.add_argument(
+        "--formats", nargs="+", choices=list(cases), help="default: all available"
+    )
+    parser.add_argument("--sizes", nargs="+", default=["1KB", "1MB", "64MB"])
+    parser.add_argument("--dtypes", nargs="+", default=["float64"])
+    parser.add_argument("--mode", choices=modes, default="serial")
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument(
+        "--operations", nargs="+", choices=["save", "head", "load"], default=None
+    )
+    parser.add_argument("--directory", help="where the files are written")
+    parser.add_argument(
+        "--max-dense",
+        default="1GB",
+        help="larger arrays are written as sparse files (save is not measured)",
+    )
+    parser.add_argument("--output", help="JSON file where the results are written")
+    parser.add_argument(
+        "--compare", metavar="JSON", help="results of a previous run to compare with"
+    )
+    opts = parser.parse_args(args)
+
+    report = run(
+        formats=opts.formats,
+        sizes=opts.sizes,
+        dtypes=opts.dtypes,
+        mode=opts.mode,
+        repeat=opts.repeat,
+        operations=opts.operations,
+        directory=opts.directory,
+        max_dense=opts.max_dense,
+        output=opts.output,
+        verbose=True,
+    )
+
+    if report is not None and opts.compare:
+        with open(opts.compare, encoding="utf-8") as fptr:
+            ratios = compare(json.load(fptr), report)
+        for key, ratio in sorted(ratios.items()):
+            print(" ".join(map(str, key)), f"{ratio:.3f}x")
+    return report
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,260 @@
+"""
+Scaling of the IO with Dask (DaskIO) on a local cluster.
+
+    python -m lyncs_io.benchmarks.dask_scaling --shape 64 64 64 64 --workers 1 2 4
+
+For each cluster (number of workers and threads per worker), format and chunk
+shape, the save of a dask array (blockwise writes with locking of the header)
+and the load with chunks are executed and the following quantities reported:
+- wall: wall time of the computation
+- ntasks, graph: number of executed tasks and size of the task graph
+- overhead: per-task overhead, i.e. (wall * threads - compute time) / ntasks
+- lock: total time spent by the workers waiting for the lock on the header
+- throughput: bytes over wall time
+Chunk shapes that do not divide the array (e.g. as chunksize_loop in testing)
+are included by default.
+"""
+
+__all__ = [
+    "run_dask_scaling",
+]
+
+import os
+import json
+from time import perf_counter
+import numpy
+from lyncs_utils import prod
+from .. import base, metrics
+from .suite import cases, metadata, check_repeat, DaskMode, _remove
+
+dask_formats = ["npy", "lime"]
+
+
+def default_chunks(shape):
+    "Chunk sizes that divide (aligned) and do not divide (misaligned) the smallest axis"
+    size = min(shape)
+    chunks = []
+    for chunk in (size // 2, size // 4, size // 3 + 1, size // 8 + 1):
+        if chunk > 0 and chunk not in chunks:
+            chunks.append(chunk)
+    return chunks
+
+
+def _summary():
+    return os.getpid(), metrics.summary()
+
+
+def _worker_metrics(client, stage):
+    "Total seconds of the stage measured on the workers"
+    # workers in the same process share the metrics
+    stats = dict(client.run(_summary).values())
+    return sum(
+        values["seconds"]
+        for summary in stats.values()
+        for (name, _), values in summary.items()
+        if name == stage
+    )
+
+
+def measure(client, collection, nbytes):
+    "Computes the collection on the cluster and returns the measured quantities"
+    # pylint: disable=import-outside-toplevel
+    from dask.distributed import get_task_stream, wait
+
+    graph = len(collection.__dask_graph__())
+    client.run(metrics.reset)
+    with get_task_stream(client) as stream:
+        start = perf_counter()
+        persisted = client.persist(collection)
+        wait(persisted)
+        wall = perf_counter() - start
+    del persisted
+
+    compute = sum(
+        part["stop"] - part["start"]
+        for task in stream.data
+        for part in task["startstops"]
+        if part["action"] == "compute"
+    )
+    threads = sum(client.nthreads().values())
+    ntasks = len(stream.data)
+    return dict(
+        wall=wall,
+        graph=graph,
+        ntasks=ntasks,
+        compute=compute,
+        overhead=max(wall * threads - compute, 0) / max(ntasks, 1),
+        lock=_worker_metrics(client, "dask.lock"),
+        throughput=nbytes / wall / 1e9,
+    )
+
+
+def run_cluster(client, shape, dtype, formats, chunks, directory, repeat=3):
+    "Runs the benchmarks on a cluster. Returns the results."
+    # pylint: disable=redefined-outer-name
+    check_repeat(repeat)
+    results = []
+    nbytes = prod(shape) * numpy.dtype(dtype).itemsize
+    workers = len(client.nthreads())
+    threads = sum(client.nthreads().values()) // max(workers, 1)
+    for name in formats:
+        case = cases[name]
+        path = os.path.join(directory, case.path)
+        for chunk in chunks:
+            mode = DaskMode(chunks=chunk)
+            for operation in ("save", "load"):
+                runs = []
+                for _ in range(repeat):
+                    if operation == "save":
+                        _remove(path)
+                        collection = base.save(mode.array(shape, dtype), path)
+                    else:
+                        collection = base.load(path, chunks=chunk)
+                    runs.append(measure(client, collection, nbytes))
+                best = min(runs, key=lambda result: result["wall"])
+                best.update(
+                    format=name,
+                    operation=operation,
+                    workers=workers,
+                    threads=threads,
+                    shape=list(shape),
+                    dtype=numpy.dtype(dtype).name,
+                    chunks=chunk if isinstance(chunk, int) else list(chunk),
+                    nbytes=nbytes,
+                )
+                results.append(best)
+    return results
+
+
+def run_dask_scaling(
+    shape=(32, 32, 32, 32),
+    dtype="complex128",
+    formats=None,
+    workers=(1, 2, 4),
+    threads=(1,),
+    chunks=None,
+    processes=True,
+    repeat=3,
+    directory=None,
+    output=None,
+    verbose=False,
+):
+    """
+    Runs the benchmark on local clusters with varying number of workers
+    and threads per worker.
+
+    Parameters
+    ----------
+    shape: tuple
+        Shape of the array.
+    dtype: str
+        Data type of the array.
+    formats: list
+        Subset of "npy" and "lime".
+    workers: list
+        Numbers of workers of the clusters.
+    threads: list
+        Numbers of threads per worker of the clusters.
+    chunks: list
+        Chunk sizes (int) or shapes (tuple). By default see default_chunks.
+    processes: bool
+        Whether the workers are processes or threads of this process.
+    repeat: int
+        Number of repetitions. The best wall time is taken.
+    directory: str
+        Where the files are written. By default the system temporary.
+    output: str
+        JSON file where the results are written.
+    verbose: bool
+        Prints the results while running.
+    """
+    # pylint: disable=import-outside-toplevel
+    check_repeat(repeat)
+    from dask.distributed import Client, LocalCluster
+
+    shape = tuple(shape)
+    formats = formats or dask_formats
+    chunks = chunks or default_chunks(shape)
+    directory = DaskMode().tempdir(directory)
+
+    results = []
+    try:
+        for nthreads in threads:
+            for nworkers in workers:
+                with LocalCluster(
+                    n_workers=nworkers,
+                    threads_per_worker=nthreads,
+                    processes=processes,
+                    dashboard_address=None,
+                ) as cluster, Client(cluster) as client:
+                    client.run(metrics.enable)
+                    new = run_cluster(
+                        client, shape, dtype, formats, chunks, directory, repeat
+                    )
+                    client.run(metrics.disable)
+                if verbose:
+                    for result in new:
+                        print(_row(result), flush=True)
+                results += new
+    finally:
+        _remove(directory)
+
+    info = dict(metadata(DaskMode()), processes=processes)
+    report = dict(metadata=info, results=results)
+    if output:
+        with open(output, "w", encoding="utf-8") as fptr:
+            json.dump(report, fptr, indent=1)
+    return report
+
+
+def _row(result):
+    return (
+        f"{result['format']:>5} {result['operation']:>5} "
+        f"{result['workers']:>3}x{result['threads']:<3} "
+        f"chunks={str(result['chunks']):<12} "
+        f"{result['wall'] * 1e3:10.3f} ms {result['throughput']:8.3f} GB/s "
+        f"tasks={result['ntasks']:<6} graph={result['graph']:<6} "
+        f"overhead={result['overhead'] * 1e3:.3f} ms/task "
+        f"lock={result['lock'] * 1e3:.3f} ms"
+    )
+
+
+def main(args=None):
+    "Command line interface"
+    # pylint: disable=import-outside-toplevel
+    import argparse
+
+    parser = argparse.ArgumentParser(
+        prog="python -m lyncs_io.benchmarks.dask_scaling", description=__doc__
+    )
+    parser.add_argument("--shape", nargs="+", type=int, default=[32, 32, 32, 32])
+    parser.add_argument("--dtype", default="complex128")
+    parser.add_argument("--formats", nargs="+", choices=dask_formats)
+    parser.add_argument("--workers", nargs="+", type=int, default=[1, 2, 4])
+    parser.add_argument("--threads", nargs="+", type=int, default=[1])
+    parser.add_argument("--chunks", nargs="+", type=int, help="chunk sizes")
+    parser.add_argument(
+        "--threads-only", action="store_true", help="workers are not processes"
+    )
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--directory")
+    parser.add_argument("--output", help="JSON file where the results are written")
+    opts = parser.parse_args(args)
+
+    return run_dask_scaling(
+        shape=opts.shape,
+        dtype=opts.dtype,
+        formats=opts.formats,
+        workers=opts.workers,
+        threads=opts.threads,
+        chunks=opts.chunks,
+        processes=not opts.threads_only,
+        repeat=opts.repeat,
+        directory=opts.directory,
+        output=opts.output,
+        verbose=True,
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,425 @@
+"""
+Weak and strong scaling of the parallel IO with MPI (MpiIO and parallel HDF5).
+
+Run under MPI, e.g.
+
+    mpirun -n 16 python -m lyncs_io.benchmarks.scaling --lattices 32x32x32x32
+
+(add --oversubscribe for running locally more processes than cores).
+The processes of COMM_WORLD are split in groups of increasing size
+(1, 2, 4, ..., N) and for each group all the Cartesian process grids
+are measured. For strong scaling the lattice
+is the global one, for weak scaling it is the local one of each process.
+The slowest process defines the time of an operation, the aggregate bandwidth
+is the global size over this time, while the per-rank bandwidth is the local
+size over the time of each rank.
+"""
+
+__all__ = [
+    "run_scaling",
+    "scaling_table",
+]
+
+import os
+import csv
+import json
+from itertools import product
+from time import perf_counter
+import numpy
+from lyncs_utils import prod
+from .. import base
+from ..formats import formats
+from ..decomposition import Decomposition
+from .suite import cases, metadata, check_repeat, _remove
+
+scaling_formats = ["npy", "lime", "hdf5"]
+
+
+def parse_lattice(lattice):
+    "Converts lattices like '16x16x16x32' to tuples"
+    if isinstance(lattice, str):
+        return tuple(int(size) for size in lattice.lower().split("x"))
+    return tuple(lattice)
+
+
+def group_sizes(size):
+    "Sizes of the groups of processes: powers of two smaller than size and size"
+    sizes = []
+    num = 1
+    while num < size:
+        sizes.append(num)
+        num *= 2
+    return sizes + [size]
+
+
+def process_grids(nprocs, ndims, max_grids=None):
+    """
+    Cartesian grids of nprocs processes with at most ndims dimensions,
+    as in testing.get_procs_list but using all the divisors of nprocs.
+    Grids differing only by trailing ones are equivalent and returned once.
+    """
+    divisors = [num for num in range(1, nprocs + 1) if nprocs % num == 0]
+    grids = []
+    for grid in product(divisors, repeat=ndims):
+        if prod(grid) != nprocs:
+            continue
+        while len(grid) > 1 and grid[-1] == 1:
+            grid = grid[:-1]
+        if grid not in grids:
+            grids.append(grid)
+    # grids with fewer dimensions first
+    grids.sort(key=lambda grid: (len(grid), [-num for num in grid]))
+    return grids[:max_grids] if max_grids else grids
+
+
+def available_formats():
+    "Formats with parallel IO in this environment"
+    available = ["npy", "lime"]
+    if formats["hdf5"].available:
+        # pylint: disable=import-outside-toplevel
+        import h5py
+
+        if h5py.get_config().mpi:
+            available.append("hdf5")
+    return available
+
+
+def global_shape(lattice, grid, site=(), scaling="strong"):
+    "Global shape of the array or None if the lattice cannot be split on the grid"
+    if scaling == "weak":
+        grid = tuple(grid) + (1,) * (len(lattice) - len(grid))
+        return tuple(size * procs for size, procs in zip(lattice, grid)) + tuple(site)
+    if scaling != "strong":
+        raise ValueError("scaling must be either 'strong' or 'weak'")
+    if any(size < procs for size, procs in zip(lattice, grid)):
+        return None
+    return tuple(lattice) + tuple(site)
+
+
+def _measure(fnc, comm, repeat, setup=None):
+    "Returns the best time of this rank and the best time of the slowest rank"
+    # pylint: disable=import-outside-toplevel
+    from mpi4py import MPI
+
+    local, slowest = [], []
+    for _ in range(repeat):
+        if setup and comm.rank == 0:
+            setup()
+        comm.Barrier()
+        start = perf_counter()
+        fnc()
+        elapsed = perf_counter() - start
+        local.append(elapsed)
+        slowest.append(comm.allreduce(elapsed, op=MPI.MAX))
+    return min(local), min(slowest)
+
+
+def measure_grid(comm, case, grid, shape, dtype, directory, repeat=3):
+    """
+    Measures save and load of an array of given global shape on a grid
+    of processes. Collective on comm. Returns the results on rank 0.
+    """
+    cart = comm.Create_cart(dims=grid)
+    try:
+        _, local_shape, _ = Decomposition(comm=cart).decompose(shape)
+        arr = numpy.ones(local_shape, dtype=dtype)
+        path = os.path.join(directory, case.path)
+        target = os.path.join(directory, case.path.split("/")[0])
+
+        times = {
+            "save": _measure(
+                lambda: base.save(arr, path, comm=cart),
+                cart,
+                repeat,
+                setup=lambda: _remove(target),
+            ),
+            "load": _measure(lambda: base.load(path, comm=cart), cart, repeat),
+        }
+        gathered = cart.gather((arr.nbytes, times), root=0)
+    finally:
+        cart.Free()
+
+    if comm.rank != 0:
+        return []
+
+    nbytes = prod(shape) * numpy.dtype(dtype).itemsize
+    results = []
+    for operation in ("save", "load"):
+        slowest = gathered[0][1][operation][1]
+        ranks = [local_nbytes / t[operation][0] / 1e9 for local_nbytes, t in gathered]
+        rank_times = [t[operation][0] for _, t in gathered]
+        results.append(
+            dict(
+                format=case.name,
+                operation=operation,
+                dtype=numpy.dtype(dtype).name,
+                nprocs=comm.size,
+                grid=list(grid),
+                shape=list(shape),
+                local_shape=list(local_shape),
+                nbytes=nbytes,
+                time=slowest,
+                aggregate=nbytes / slowest / 1e9,
+                rank_min=min(ranks),
+                rank_mean=sum(ranks) / len(ranks),
+                rank_max=max(ranks),
+                imbalance=max(rank_times) / min(rank_times),
+            )
+        )
+    return results
+
+
+def run_scaling(
+    lattices=((16, 16, 16, 16),),
+    site=(),
+    dtypes=("complex128",),
+    formats=None,
+    scaling="strong",
+    sizes=None,
+    max_grids=None,
+    repeat=3,
+    directory=None,
+    comm=None,
+    output=None,
+    plot_data=None,
+    verbose=False,
+):
+    """
+    Runs the scaling benchmark. Collective on comm (default COMM_WORLD).
+    Returns the report on rank 0 and None on the other ranks.
+
+    Parameters
+    ----------
+    lattices: list
+        Lattice sizes, global for strong scaling, local for weak scaling.
+    site: tuple
+        Shape of the site, not split (e.g. (4, 3, 3) for gauge fields).
+    dtypes: list
+        Data types of the arrays.
+    formats: list
+        Subset of "npy", "lime" and "hdf5" (parallel HDF5 via mpio).
+    scaling: str
+        Either "strong" or "weak".
+    sizes: list
+        Number of processes of the groups. By default 1, 2, 4, ..., comm.size.
+    max_grids: int
+        Maximum number of process grids per group.
+    repeat: int
+        Number of repetitions. The best time is taken.
+    directory: str
+        Directory shared by the processes where the files are written.
+    output: str
+        JSON file where the results are written.
+    plot_data: str
+        CSV file where the table is written (one row per result).
+    verbose: bool
+        Prints the table while running.
+    """
+    # pylint: disable=import-outside-toplevel,redefined-outer-name
+    check_repeat(repeat)
+    from mpi4py import MPI
+    from .suite import MpiMode
+
+    comm = comm or MPI.COMM_WORLD
+    formats = formats or available_formats()
+    sizes = sizes or group_sizes(comm.size)
+    lattices = [parse_lattice(lattice) for lattice in lattices]
+    directory = MpiMode(comm).tempdir(directory)
+
+    results = []
+    try:
+        for size in sizes:
+            group = comm.Split(color=int(comm.rank < size), key=comm.rank)
+            if comm.rank < size:
+                results += _run_group(
+                    group,
+                    lattices,
+                    site=site,
+                    dtypes=dtypes,
+                    formats=formats,
+                    scaling=scaling,
+                    max_grids=max_grids,
+                    repeat=repeat,
+                    directory=directory,
+                    verbose=verbose,
+                )
+            group.Free()
+            comm.Barrier()
+    finally:
+        if comm.rank == 0:
+            _remove(directory)
+
+    if comm.rank != 0:
+        return None
+
+    for result in results:
+        result["scaling"] = scaling
+    _add_efficiency(results)
+    info = dict(metadata(MpiMode(comm)), scaling=scaling)
+    report = dict(metadata=info, results=results)
+    if output:
+        with open(output, "w", encoding="utf-8") as fptr:
+            json.dump(report, fptr, indent=1)
+    if plot_data:
+        write_plot_data(plot_data, results)
+    return report
+
+
+def _run_group(group, lattices, **kwargs):
+    "Runs the benchmarks on a group of processes"
+    site, scaling, verbose = kwargs["site"], kwargs["scaling"], kwargs["verbose"]
+    results = []
+    for lattice in lattices:
+        for grid in process_grids(group.size, len(lattice), kwargs["max_grids"]):
+            shape = global_shape(lattice, grid, site, scaling)
+            if shape is None:
+                continue
+            for name in kwargs["formats"]:
+                for dtype in kwargs["dtypes"]:
+                    new = measure_grid(
+                        group,
+                        cases[name],
+                        grid,
+                        shape,
+                        dtype,
+                        kwargs["directory"],
+                        repeat=kwargs["repeat"],
+                    )
+                    for result in new:
+                        result["lattice"] = list(lattice)
+                        if verbose:
+                            print(_row(result), flush=True)
+                    results += new
+    return results
+
+
+def _key(result):
+    return (
+        result["format"],
+        result["operation"],
+        result["dtype"],
+        tuple(result["lattice"]),
+    )
+
+
+def _add_efficiency(results):
+    """
+    Adds the parallel efficiency relative to the smallest group of processes:
+    aggregate bandwidth per process over the one of the reference.
+    For strong scaling this is speedup / (nprocs / nprocs_ref),
+    for weak scaling it is time_ref / time. The best grid of the reference is used.
+    """
+    reference = {}
+    for result in results:
+        key = _key(result)
+        per_proc = result["aggregate"] / result["nprocs"]
+        ref = reference.get(key)
+        if (
+            ref is None
+            or result["nprocs"] < ref[0]
+            or (result["nprocs"] == ref[0] and per_proc > ref[1])
+        ):
+            reference[key] = (result["nprocs"], per_proc)
+    for result in results:
+        per_proc = result["aggregate"] / result["nprocs"]
+        result["efficiency"] = per_proc / reference[_key(result)][1]
+
+
+_columns = [
+    "format",
+    "operation",
+    "dtype",
+    "lattice",
+    "nprocs",
+    "grid",
+    "time",
+    "aggregate",
+    "rank_min",
+    "rank_max",
+    "imbalance",
+    "efficiency",
+]
+
+
+def _row(result):
+    lattice = "x".join(map(str, result["lattice"]))
+    grid = "x".join(map(str, result["grid"]))
+    line = (
+        f"{result['format']:>5} {result['operation']:>5} {result['dtype']:>10} "
+        f"{lattice:>14} {result['nprocs']:>6} {grid:>10} "
+        f"{result['time'] * 1e3:10.3f} ms {result['aggregate']:8.3f} GB/s "
+        f"[{result['rank_min']:.3f}, {result['rank_max']:.3f}] GB/s/rank "
+        f"x{result['imbalance']:.2f}"
+    )
+    if "efficiency" in result:
+        line += f" {result['efficiency'] * 100:6.1f}%"
+    return line
+
+
+def scaling_table(results):
+    "Returns the scaling table as a string"
+    header = (
+        f"{'fmt':>5} {'op':>5} {'dtype':>10} {'lattice':>14} {'nprocs':>6} "
+        f"{'grid':>10} {'time':>13} {'aggregate':>13} "
+        "[rank min, max] imbalance efficiency"
+    )
+    rows = sorted(results, key=lambda result: _key(result) + (result["nprocs"],))
+    return "\n".join([header] + [_row(result) for result in rows])
+
+
+def write_plot_data(filename, results):
+    "Writes the results as CSV, one row per result"
+    with open(filename, "w", newline="", encoding="utf-8") as fptr:
+        writer = csv.writer(fptr)
+        writer.writerow(["scaling"] + _columns)
+        for result in results:
+            row = [result["scaling"]]
+            for column in _columns:
+                value = result[column]
+                if isinstance(value, list):
+                    value = "x".join(map(str, value))
+                row.append(value)
+            writer.writerow(row)
+
+
+def main(args=None):
+    "Command line interface"
+    # pylint: disable=import-outside-toplevel
+    import argparse
+
+    parser = argparse.ArgumentParser(
+        prog="mpirun -n N python -m lyncs_io.benchmarks.scaling", description=__doc__
+    )
+    parser.add_argument("--lattices", nargs="+", default=["16x16x16x16"])
+    parser.add_argument("--site", nargs="*", type=int, default=[])
+    parser.add_argument("--dtypes", nargs="+", default=["complex128"])
+    parser.add_argument("--formats", nargs="+", choices=scaling_formats)
+    parser.add_argument("--scaling", choices=["strong", "weak"], default="strong")
+    parser.add_argument("--sizes", nargs="+", type=int, help="numbers of processes")
+    parser.add_argument("--max-grids", type=int)
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--directory", help="directory shared by the processes")
+    parser.add_argument("--output", help="JSON file where the results are written")
+    parser.add_argument("--plot-data", help="CSV file where the table is written")
+    opts = parser.parse_args(args)
+
+    report = run_scaling(
+        lattices=opts.lattices,
+        site=tuple(opts.site),
+        dtypes=opts.dtypes,
+        formats=opts.formats,
+        scaling=opts.scaling,
+        sizes=opts.sizes,
+        max_grids=opts.max_grids,
+        repeat=opts.repeat,
+        directory=opts.directory,
+        output=opts.output,
+        plot_data=opts.plot_data,
+    )
+    if report is not None:
+        print(scaling_table(report["results"]))
+    return report
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,478 @@
+"""
+Benchmark cases and runner of the load, save and head functions
+"""
+
+__all__ = [
+    "cases",
+    "modes",
+    "parse_size",
+    "run",
+    "compare",
+]
+
+import os
+import re
+import sys
+import json
+import socket
+import shutil
+import tempfile
+from dataclasses import dataclass
+from datetime import datetime
+from statistics import mean, median
+from time import perf_counter
+import numpy
+from .. import base, __version__
+from ..formats import formats
+from ..lib import with_lib
+
+modes = ["serial", "mpi", "dask"]
+
+
+@dataclass
+class Case:
+    """
+    A benchmarked format.
+
+    Attributes
+    ----------
+    - name: name of the case
+    - format: name of the format in lyncs_io.formats
+    - path: path of the file relative to the directory, e.g. "data.tar/arr.npy"
+    - modes: execution modes supported by the format
+    - sparse: whether the file can be created sparse (only the header is written)
+    - dtypes: if given, the only dtypes supported by the format
+    - head: whether the format implements head
+    """
+
+    name: str
+    format: str
+    path: str
+    modes: tuple = ("serial",)
+    sparse: bool = False
+    dtypes: tuple = None
+    head: bool = True
+
+    @property
+    def available(self):
+        "Whether the dependencies of the format are installed"
+        if self.format == "openqcd" and not with_lib:
+            # the reordering of the links needs the compiled library
+            return False
+        return formats[self.format].available
+
+    def shape(self, nbytes, dtype):
+        "Shape of an array of (about) nbytes"
+        size = max(nbytes // numpy.dtype(dtype).itemsize, 1)
+        if self.format == "openqcd":
+            # lattice of L^4 sites with 4x3x3 links
+            size = max(round((size / 36) ** 0.25), 1)
+            return (size,) * 4 + (4, 3, 3)
+        return (size,)
+
+
+cases = {
+    case.name: case
+    for case in [
+        Case("npy", "numpy", "arr.npy", ("serial", "mpi", "dask"), sparse=True),
+        Case("npz", "numpyz", "arr.npz"),
+        Case("lime", "lime", "arr.lime", ("serial", "mpi", "dask"), sparse=True),
+        Case("openqcd", "openqcd", "arr.oqcd", dtypes=("complex128",)),
+        Case("tar", "tar", "data.tar/arr.npy", ("serial", "mpi")),
+        Case("tar.gz", "tar", "data.tar.gz/arr.npy"),
+        Case("tar.bz2", "tar", "data.tar.bz2/arr.npy"),
+        Case("tar.xz", "tar", "data.tar.xz/arr.npy"),
+        Case("hdf5", "hdf5", "data.h5/arr", ("serial", "mpi")),
+        Case("pickle", "pickle", "arr.pkl", head=False),
+    ]
+}
+
+_units = {"": 1, "B": 1, "K": 2**10, "M": 2**20, "G": 2**30, "T": 2**40}
+
+
+def parse_size(size):
+    "Converts sizes like 1024, '4KB', '1.5 GiB' or '20G' to bytes"
+    if isinstance(size, (int, float)):
+        return int(size)
+    match = re.fullmatch(r"\s*([\d.]+)\s*([KMGT]?)I?B?\s*", size.upper())
+    if not match:
+        raise ValueError(f"Invalid size {size}")
+    return int(float(match.group(1)) * _units[match.group(2)])
+
+
+def _format_size(nbytes):
+    for unit in "TGMK":
+        if nbytes >= _units[unit]:
+            return f"{nbytes / _units[unit]:g}{unit}B"
+    return f"{nbytes}B"
+
+
+class Mode:
+    "Serial execution mode"
+
+    name = "serial"
+    rank = 0
+    size = 1
+
+    def array(self, shape, dtype):
+        "Returns the (local) array to save"
+        return numpy.ones(shape, dtype=dtype)
+
+    def save(self, arr, path, **kwargs):
+        "Saves the array"
+        base.save(arr, path, **kwargs)
+
+    def load(self, path, **kwargs):
+        "Loads the array"
+        return base.load(path, **kwargs)
+
+    def head(self, path, **kwargs):
+        "Reads the header"
+        return base.head(path, **kwargs)
+
+    def barrier(self):
+        "Synchronizes the processes"
+
+    def reduce(self, elapsed):
+        "Returns the time of the slowest process"
+        return elapsed
+
+    def bcast(self, value):
+        "Returns the value of the first process"
+        return value
+
+    def tempdir(self, path=None):
+        "Returns a temporary directory shared by the processes"
+        return tempfile.mkdtemp(prefix="lyncs_io_bench_", dir=path)
+
+
+class MpiMode(Mode):
+    "Parallel execution with MPI. The array is split over the first axis."
+
+    name = "mpi"
+
+    def __init__(self, comm=None):
+        # pylint: disable=import-outside-toplevel
+        from mpi4py import MPI
+
+        self.MPI = MPI
+        self.comm = comm or MPI.COMM_WORLD
+        self.rank = self.comm.rank
+        self.size = self.comm.size
+
+    def array(self, shape, dtype):
+        # pylint: disable=import-outside-toplevel
+        from ..decomposition import _split_work
+
+        low = _split_work(shape[0], self.size, self.rank)
+        high = _split_work(shape[0], self.size, self.rank + 1)
+        return numpy.ones((high - low,) + tuple(shape[1:]), dtype=dtype)
+
+    def save(self, arr, path, **kwargs):
+        base.save(arr, path, comm=self.comm, **kwargs)
+
+    def load(self, path, **kwargs):
+        return base.load(path, comm=self.comm, **kwargs)
+
+    def barrier(self):
+        self.comm.Barrier()
+
+    def reduce(self, elapsed):
+        return self.comm.allreduce(elapsed, op=self.MPI.MAX)
+
+    def bcast(self, value):
+        return self.comm.bcast(value, root=0)
+
+    def tempdir(self, path=None):
+        return self.bcast(super().tempdir(path) if self.rank == 0 else None)
+
+
+class DaskMode(Mode):
+    "Execution with Dask. The array is split in chunks over the first axis."
+
+    name = "dask"
+
+    def __init__(self, chunks=None):
+        # pylint: disable=import-outside-toplevel
+        import dask.array
+
+        self.dask = dask
+        self.chunks = chunks
+
+    def _chunks(self, shape):
+        if self.chunks is not None:
+            return self.chunks
+        return (max(shape[0] // os.cpu_count(), 1),) + tuple(shape[1:])
+
+    def array(self, shape, dtype):
+        return self.dask.array.ones(shape, dtype=dtype, chunks=self._chunks(shape))
+
+    def save(self, arr, path, **kwargs):
+        base.save(arr, path, **kwargs).compute()
+
+    def load(self, path, **kwargs):
+        shape = base.head(path)["shape"]
+        return base.load(path, chunks=self._chunks(shape), **kwargs).compute()
+
+
+def get_mode(mode):
+    "Returns the execution mode"
+    if isinstance(mode, Mode):
+        return mode
+    if mode == "serial":
+        return Mode()
+    if mode == "mpi":
+        return MpiMode()
+    if mode == "dask":
+        return DaskMode()
+    raise ValueError(f"Unknown mode {mode}. Available: {modes}")
+
+
+def make_sparse(path, case, shape, dtype):
+    """
+    Creates a sparse file, i.e. writes only the header of the data.
+    Returns False if the case does not support sparse files.
+    """
+    # pylint: disable=import-outside-toplevel
+    if not case.sparse:
+        return False
+    dtype = numpy.dtype(dtype)
+    nbytes = int(numpy.prod(shape)) * dtype.itemsize
+    if case.format == "numpy":
+        numpy.lib.format.open_memmap(path, mode="w+", dtype=dtype, shape=shape)
+        return True
+    if case.format == "lime":
+        from .. import lime
+        from ..convert import get_array_attrs
+
+        attrs = get_array_attrs(numpy.empty(0, dtype=dtype.newbyteorder(">")))
+        attrs.update(shape=tuple(shape), nbytes=nbytes)
+        header = lime.get_header_bytes(attrs)
+        with open(path, "wb") as fptr:
+            fptr.write(header)
+            fptr.truncate(len(header) + nbytes)
+        return True
+    return False
+
+
+def check_repeat(repeat):
+    "Raises ValueError if the number of repetitions is not positive"
+    if repeat < 1:
+        raise ValueError("repeat must be a positive integer")
+
+
+def timeit(fnc, mode, repeat, setup=None):
+    """
+    Returns the list of elapsed times of the slowest process.
+    setup is called by the first process before each repetition.
+    """
+    times = []
+    for _ in range(repeat):
+        if setup and mode.rank == 0:
+            setup()
+        mode.barrier()
+        start = perf_counter()
+        fnc()
+        times.append(mode.reduce(perf_counter() - start))
+    return times
+
+
+def _remove(path):
+    if os.path.isdir(path):
+        shutil.rmtree(path)
+    elif os.path.exists(path):
+        os.remove(path)
+
+
+def _result(case, mode, operation, nbytes, dtype, times, **kwargs):
+    best = min(times)
+    return dict(
+        format=case.name,
+        mode=mode.name,
+        procs=mode.size,
+        operation=operation,
+        nbytes=nbytes,
+        size=_format_size(nbytes),
+        dtype=numpy.dtype(dtype).name,
+        repeat=len(times),
+        times=times,
+        min=best,
+        median=median(times),
+        mean=mean(times),
+        throughput=nbytes / best / 1e9 if best and operation != "head" else None,
+        **kwargs,
+    )
+
+
+def run_case(
+    case, nbytes, dtype, mode, directory, repeat=3, operations=None, max_dense=2**30
+):
+    """
+    Runs the benchmarks of a case. Yields the results.
+
+    The file is written with save when nbytes <= max_dense, otherwise
+    a sparse file is created (if supported) and save is not benchmarked.
+    If save is not in operations, the file is written once.
+    """
+    operations = operations or ("save", "head", "load")
+    path = os.path.join(directory, case.path)
+    shape = case.shape(nbytes, dtype)
+    nbytes = int(numpy.prod(shape)) * numpy.dtype(dtype).itemsize
+    sparse = False
+
+    if nbytes <= max_dense:
+        # the file (or archive) is removed before each save
+        target = os.path.join(directory, case.path.split("/")[0])
+        arr = mode.array(shape, dtype)
+        times = timeit(
+            lambda: mode.save(arr, path),
+            mode,
+            repeat if "save" in operations else 1,
+            setup=lambda: _remove(target),
+        )
+        del arr
+        if "save" in operations:
+            yield _result(case, mode, "save", nbytes, dtype, times, sparse=False)
+    else:
+        if mode.rank == 0:
+            sparse = make_sparse(path, case, shape, dtype)
+        sparse = mode.bcast(sparse)
+        if not sparse:
+            return
+
+    if "head" in operations and case.head:
+        times = timeit(lambda: mode.head(path), mode, repeat)
+        yield _result(case, mode, "head", nbytes, dtype, times, sparse=sparse)
+
+    if "load" in operations:
+        times = timeit(lambda: mode.load(path), mode, repeat)
+        yield _result(case, mode, "load", nbytes, dtype, times, sparse=sparse)
+
+
+def metadata(mode):
+    "Information on the environment of the benchmarks"
+    return dict(
+        lyncs_io=__version__,
+        python=sys.version.split()[0],
+        numpy=numpy.__version__,
+        host=socket.gethostname(),
+        date=datetime.now().isoformat(timespec="seconds"),
+        mode=mode.name,
+        procs=mode.size,
+    )
+
+
+def run(
+    formats=None,
+    sizes=("1KB", "1MB", "64MB"),
+    dtypes=("float64",),
+    mode="serial",
+    repeat=3,
+    operations=None,
+    directory=None,
+    max_dense="1GB",
+    output=None,
+    verbose=False,
+):
+    """
+    Runs the benchmarks and returns the results (on rank 0 for MPI).
+
+    Parameters
+    ----------
+    formats: list
+        Names of the cases (see cases). By default all the available ones
+        supporting the mode.
+    sizes: list
+        Sizes of the arrays, e.g. ["1KB", "1GB", "20GB"].
+    dtypes: list
+        Data types of the arrays.
+    mode: str
+        One of "serial", "mpi" (run under mpirun) or "dask".
+    repeat: int
+        Number of repetitions of each operation.
+    operations: list
+        Subset of ("save", "head", "load").
+    directory: str
+        Where the temporary files are written. By default the system temporary.
+    max_dense: int, str
+        Arrays larger than this are not saved but written as sparse files,
+        for the formats supporting it, and only head and load are measured.
+    output: str
+        If given, the results are written in this JSON file.
+    verbose: bool
+        Prints the results while running.
+    """
+    check_repeat(repeat)
+    mode = get_mode(mode)
+    if formats is None:
+        formats = [
+            name
+            for name, case in cases.items()
+            if case.available and mode.name in case.modes
+        ]
+    max_dense = parse_size(max_dense)
+
+    results = []
+    for name in formats:
+        case = cases[name]
+        if not case.available or mode.name not in case.modes:
+            continue
+        for dtype in dtypes:
+            if case.dtypes and numpy.dtype(dtype).name not in case.dtypes:
+                continue
+            for size in sizes:
+                directory_ = mode.tempdir(directory)
+                try:
+                    for result in run_case(
+                        case,
+                        parse_size(size),
+                        dtype,
+                        mode,
+                        directory_,
+                        repeat=repeat,
+                        operations=operations,
+                        max_dense=max_dense,
+                    ):
+                        results.append(result)
+                        if verbose and mode.rank == 0:
+                            print(_summary(result), flush=True)
+                finally:
+                    mode.barrier()
+                    if mode.rank == 0:
+                        shutil.rmtree(directory_, ignore_errors=True)
+
+    if mode.rank != 0:
+        return None
+    report = dict(metadata=metadata(mode), results=results)
+    if output:
+        with open(output, "w", encoding="utf-8") as fptr:
+            json.dump(report, fptr, indent=1)
+    return report
+
+
+def _summary(result):
+    line = (
+        f"{result['format']:>8} {result['mode']:>6} {result['operation']:>5} "
+        f"{result['size']:>8} {result['dtype']:>10} {result['min'] * 1e3:10.3f} ms"
+    )
+    if result["throughput"] is not None:
+        line += f" {result['throughput']:8.3f} GB/s"
+    return line
+
+
+def compare(old, new):
+    """
+    Compares two reports (e.g. of two releases) returning, for each benchmark,
+    the ratio between the new and old minimum times.
+    """
+
+    def key(result):
+        keys = ("format", "mode", "procs", "operation", "nbytes", "dtype")
+        return tuple(result[k] for k in keys)
+
+    old = {key(result): result for result in old["results"]}
+    return {
+        key(result): result["min"] / old[key(result)]["min"]
+        for result in new["results"]
+        if key(result) in old and old[key(result)]["min"]
+    }
@@ -0,0 +1,77 @@
+"""
+Benchmarks with pytest-benchmark:
+
+    pytest --pyargs lyncs_io.benchmarks
+
+The sizes are given by the environment variable LYNCS_IO_BENCH_SIZES
+(default "1KB,1MB,64MB").
+"""
+
+# pylint: disable=redefined-outer-name
+
+import os
+import shutil
+import pytest
+from .suite import cases, parse_size, get_mode, make_sparse, _remove
+
+pytest.importorskip("pytest_benchmark")
+
+sizes = os.environ.get("LYNCS_IO_BENCH_SIZES", "1KB,1MB,64MB").split(",")
+max_dense = parse_size(os.environ.get("LYNCS_IO_BENCH_MAX_DENSE", "1GB"))
+dtype = "complex128"
+
+params = [
+    pytest.param(case, size, id=f"{case.name}-{size}")
+    for case in cases.values()
+    if case.available
+    for size in sizes
+]
+
+
+@pytest.fixture
+def mode():
+    return get_mode("serial")
+
+
+@pytest.fixture
+def directory(mode):
+    path = mode.tempdir()
+    yield path
+    shutil.rmtree(path, ignore_errors=True)
+
+
+def _prepare(case, size, mode, directory):
+    path = os.path.join(directory, case.path)
+    shape = case.shape(parse_size(size), dtype)
+    if parse_size(size) > max_dense:
+        if not make_sparse(path, case, shape, dtype):
+            pytest.skip(f"{case.name} does not support sparse files")
+    else:
+        mode.save(mode.array(shape, dtype), path)
+    return path, shape
+
+
+@pytest.mark.parametrize("case,size", params)
+def test_save(benchmark, case, size, mode, directory):
+    if parse_size(size) > max_dense:
+        pytest.skip("array too large for saving")
+    path = os.path.join(directory, case.path)
+    arr = mode.array(case.shape(parse_size(size), dtype), dtype)
+    target = os.path.join(directory, case.path.split("/")[0])
+    benchmark.extra_info["nbytes"] = arr.nbytes
+    benchmark.pedantic(mode.save, (arr, path), setup=lambda: _remove(target), rounds=3)
+
+
+@pytest.mark.parametrize("case,size", params)
+def test_head(benchmark, case, size, mode, directory):
+    if not case.head:
+        pytest.skip(f"{case.name} does not implement head")
+    path, _ = _prepare(case, size, mode, directory)
+    benchmark(mode.head, path)
+
+
+@pytest.mark.parametrize("case,size", params)
+def test_load(benchmark, case, size, mode, directory):
+    path, shape = _prepare(case, size, mode, directory)
+    benchmark.extra_info["shape"] = shape
+    benchmark(mode.load, path)
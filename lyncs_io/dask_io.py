@@ -18,6 +18,7 @@ except ImportError:
 
 from .convert import from_array
 from .utils import is_dask_array
+from . import metrics
 
 
 class DaskIO:
@@ -77,7 +78,9 @@ class DaskIO:
         array = self.dask.array.from_array(array, chunks=chunks)
 
         if metadata:
-            array = self.dask.array.map_blocks(from_array, array, metadata=metadata)
+            array = self.dask.array.map_blocks(
+                from_array, array, attrs=metadata, dtype=metadata.get("dtype", dtype)
+            )
 
         return array
 
@@ -119,14 +122,16 @@ class DaskIO:
         )
 
 
+@metrics.timed("header.write")
 def _write_header(filename, header, interval=0.001):
 
     lock_path = filename + ".lock"
     lock = FileLock(lock_path)
 
     # wait for lock to be release if is used
-    while lock.is_locked:
-        sleep(interval)
+    with metrics.measure("dask.lock", path=filename):
+        while lock.is_locked:
+            sleep(interval)
 
     # if file does not exist or header is wrong, then we write a new file
     if not os.path.exists(filename) or header != read(filename, len(header)):
@@ -178,6 +183,7 @@ def _write_blockwise_to_npy(
 
     # write array in right memmap slice
     slc = tuple(slice(*loc) for loc in block_info[None]["array-location"])
-    data[slc] = array_block
+    with metrics.measure("dask.write", path=filename, nbytes=array_block.nbytes):
+        data[slc] = array_block
 
     return data[slc]
@@ -2,9 +2,101 @@
 Domain Decomposition
 """
 
-__all__ = ["Decomposition"]
+__all__ = ["Decomposition", "get_decomposition", "plans"]
 
+from collections import OrderedDict
 import numpy
+from . import metrics
+
+
+class PlanCache:
+    """
+    Cache of the decomposition plans per communicator.
+
+    A plan is created once and reused by the following loads and saves over
+    the same communicator: the decomposed domains (keyed on the global shape),
+    the sub-communicators of the dimensions of the topology and the committed
+    MPI datatypes of the file views (keyed on sizes, sub-sizes, starts, dtype
+    and order). The communicators are identified by their handle and topology.
+    The plans of a communicator should be released (collectively) when it is
+    freed, otherwise its sub-communicators and datatypes are kept.
+
+    Attributes
+    ----------
+    - maxsize: maximum number of plans kept per communicator (the datatypes
+      of the least recently used ones are freed)
+    - enabled: global switch of the cache. It must be the same on all ranks.
+    """
+
+    def __init__(self, maxsize=256, enabled=True):
+        self.maxsize = maxsize
+        self.enabled = enabled
+        self._plans = {}
+        self._subcomms = {}
+
+    @staticmethod
+    def handle(comm):
+        "Returns the key of the communicator"
+        return comm.py2f()
+
+    def get(self, comm, key, create):
+        "Returns the plan of key for comm, calling create() if not cached"
+        if not self.enabled:
+            return create()
+        cache = self._plans.setdefault(self.handle(comm), OrderedDict())
+        if key in cache:
+            cache.move_to_end(key)
+            return cache[key]
+        value = cache[key] = create()
+        while len(cache) > self.maxsize:
+            _free(cache.popitem(last=False)[1])
+        return value
+
+    def subcomms(self, comm, topology, create):
+        """
+        Returns the sub-communicators of comm, calling create() if not cached
+        or if cached for a different topology (e.g. a reused handle).
+        """
+        if not self.enabled:
+            return create()
+        key = self.handle(comm)
+        cached, subcomms = self._subcomms.get(key, (None, ()))
+        if cached != topology:
+            for subcomm in subcomms:
+                _free(subcomm)
+            self._subcomms[key] = (topology, create())
+        return self._subcomms[key][1]
+
+    def release(self, comm=None):
+        """
+        Frees the datatypes and the sub-communicators of comm (all if None).
+        Collective operation over the communicators.
+        """
+        keys = list(self._plans.keys() | self._subcomms.keys())
+        if comm is not None:
+            keys = [self.handle(comm)]
+        for key in keys:
+            for value in self._plans.pop(key, {}).values():
+                _free(value)
+            for subcomm in self._subcomms.pop(key, (None, ()))[1]:
+                _free(subcomm)
+
+    def __len__(self):
+        return sum(map(len, self._plans.values()))
+
+
+def _free(value):
+    "Frees MPI handles (datatypes and communicators)"
+    if isinstance(value, tuple):
+        for val in value:
+            _free(val)
+        return
+    free = getattr(value, "Free", None)
+    if free is not None:
+        free()
+
+
+plans = PlanCache()
 
 
 class Decomposition:
@@ -24,7 +116,38 @@ class Decomposition:
 
         return MPI
 
-    def __init__(self, comm=None):
+    def __init__(
+        self,
+        comm=None,
+        axes=None,
+        blocks=None,
+        partition=None,
+        align=None,
+        cyclic=None,
+    ):
+        """
+        Parameters
+        ----------
+        comm : MPI.Comm
+            A cartesian or normal communicator.
+        axes : list
+            The axes of the domain decomposed over each dimension of the topology.
+            By default the leading axes.
+        blocks : list
+            For each dimension of the topology, the sizes of the blocks
+            assigned to the coordinates along it.
+        partition : callable
+            A function partition(size, parts) returning the list of the sizes
+            of the parts (blocks). By default the load is balanced.
+        align : int, list
+            The blocks (but the last one) are multiples of align, per dimension
+            of the topology, e.g. 2 for keeping even extents.
+        cyclic : int, list
+            If given, the decomposition is block-cyclic (as in ScaLAPACK) with
+            the given block size per dimension of the topology. The local
+            array holds the blocks of the rank in order (see local_indices).
+        """
+        # pylint: disable=too-many-arguments
         if (comm is None) or (not isinstance(comm, self.MPI.Comm)):
             raise TypeError("Expected an MPI communicator")
 
@@ -40,11 +163,112 @@ class Decomposition:
             self.dims = [self.size]
             self.coords = [self.rank]
 
+        ndims = len(self.dims)
+        self.axes = tuple(range(ndims)) if axes is None else tuple(axes)
+        if len(self.axes) != ndims or len(set(self.axes)) != ndims:
+            raise ValueError(f"axes must be {ndims} distinct axes, given {axes}")
+
+        if blocks is not None and partition is not None:
+            raise ValueError("blocks and partition cannot be both set")
+        if blocks is not None:
+            blocks = tuple(tuple(int(size) for size in block) for block in blocks)
+            if [len(block) for block in blocks] != list(self.dims):
+                raise ValueError(f"blocks must match the topology {self.dims}")
+        self.blocks = blocks
+        self.partition = partition
+
+        if align is None or isinstance(align, int):
+            align = (align or 1,) * ndims
+        self.align = tuple(align)
+        if len(self.align) != ndims or min(self.align, default=1) < 1:
+            raise ValueError(f"align must be {ndims} positive integers, given {align}")
+
+        if cyclic is not None:
+            if self.custom:
+                raise ValueError("cyclic cannot be used with blocks, partition, align")
+            if list(self.axes) != sorted(self.axes):
+                raise ValueError("cyclic requires the axes in increasing order")
+            if isinstance(cyclic, int):
+                cyclic = (cyclic,) * ndims
+            cyclic = tuple(cyclic)
+            if len(cyclic) != ndims or min(cyclic, default=1) < 1:
+                raise ValueError(f"cyclic must be {ndims} positive integers")
+        self.cyclic = cyclic
+
+    @property
+    def topology(self):
+        "The dims and coords of the rank, identifying the plans of the communicator"
+        return tuple(self.dims), tuple(self.coords)
+
+    @property
+    def options(self):
+        "The options of the decomposition"
+        return self.axes, self.blocks, self.partition, self.align, self.cyclic
+
+    @property
+    def custom(self):
+        "Whether the blocks are not the default ones"
+        return (
+            self.blocks is not None
+            or self.partition is not None
+            or set(self.align) != {1}
+        )
+
+    def _axes(self, domain):
+        "Returns the axes of the domain decomposed over the topology"
+        if len(domain) < len(self.dims):
+            raise ValueError(
+                "Dimensionality of the domain ({}) must be larger than \
+                    the dimensionality of the topology ({})".format(
+                    len(domain), len(self.dims)
+                )
+            )
+        try:
+            return [range(len(domain))[axis] for axis in self.axes]
+        except IndexError as err:
+            raise ValueError(
+                f"axes {self.axes} out of range for a domain of {len(domain)} axes"
+            ) from err
+
+    def bounds(self, dim, size):
+        """
+        Returns the bounds of the blocks along the dimension dim of the topology
+        for the given size, i.e. the block of the coordinate i is bounds[i:i+2].
+        """
+        workers, align = self.dims[dim], self.align[dim]
+        if self.blocks is not None:
+            parts = list(self.blocks[dim])
+        elif self.partition is not None:
+            parts = [int(part) for part in self.partition(size, workers)]
+        else:
+            # balanced over the units of size align, the last one can be shorter
+            units = -(-size // align)
+            if units < workers:
+                raise ValueError(f"Domain size ({size}) for dimension {dim} must be \
+                        larger than the amount of workers({workers})")
+            parts = [
+                (_split_work(units, workers, i + 1) - _split_work(units, workers, i))
+                * align
+                for i in range(workers)
+            ]
+            parts[-1] -= units * align - size
+
+        if len(parts) != workers or sum(parts) != size or min(parts) < 0:
+            raise ValueError(
+                f"The blocks {parts} for dimension {dim} do not partition "
+                f"{size} over {workers} workers"
+            )
+        bounds = [int(bound) for bound in numpy.cumsum([0] + parts)]
+        if any(bound % align for bound in bounds[:-1]):
+            raise ValueError(f"The blocks {parts} are not aligned to {align}")
+        return bounds
+
+    @metrics.measured("decomposition.decompose")
     def decompose(self, domain):
         """
         Decompose data over a cartesian/normal communicator.
         Data domains of higher order compared to communicators order
-        only decomposed on the slow moving indexes.
+        only decomposed on the slow moving indexes (or on the given axes).
 
         Parameters
         ----------
@@ -60,39 +284,41 @@ class Decomposition:
         starts : list
             global starting position
         """
-        if len(domain) < len(self.dims):
-            raise ValueError(
-                "Dimensionality of the domain ({}) must be larger than \
-                    the dimensionality of the topology ({})".format(
-                    len(domain), len(self.dims)
-                )
-            )
+        domain = tuple(domain)
+        key = ("decompose", self.topology, self.options, domain)
+        return plans.get(self.comm, key, lambda: self._decompose(domain))
+
+    def _decompose(self, domain):
         sizes = list(domain)
         sub_sizes = list(domain)
         starts = [0] * len(domain)
 
         # Iterating over the dimensions of the topology
         # allows for decomposition of higher order data domains
-        for dim in range(len(self.dims)):
-            workers, proc_id = self.dims[dim], self.coords[dim]
-            if domain[dim] < workers:
-                raise ValueError(
-                    f"Domain size ({domain[dim]}) for dimension {dim} must be \
-                        larger than the amount of workers({workers})"
-                )
+        for dim, axis in enumerate(self._axes(domain)):
+            if self.cyclic is not None:
+                # starts is the first element of the local blocks
+                coord, block = self.coords[dim], self.cyclic[dim]
+                sub_sizes[axis] = self.cyclic_sizes(dim, domain[axis])[coord]
+                starts[axis] = min(coord * block, domain[axis])
+                continue
 
-            low = _split_work(domain[dim], workers, proc_id)
-            high = _split_work(domain[dim], workers, proc_id + 1)
+            bounds = self.bounds(dim, domain[axis])
+            low, high = bounds[self.coords[dim]], bounds[self.coords[dim] + 1]
 
-            sub_sizes[dim] = high - low
-            starts[dim] = low
+            sub_sizes[axis] = high - low
+            starts[axis] = low
 
         return tuple(sizes), tuple(sub_sizes), tuple(starts)
 
+    @metrics.measured("decomposition.compose")
     def compose(self, domain):
         """
         Reconstruct global data domain and position of the
         local array relatively to the global domain.
+        With custom blocks, the local domains must match them.
+        Collective operation. The result is not cached since it depends
+        on the local domains of the other ranks.
 
         Parameters
         ----------
@@ -109,37 +335,249 @@ class Decomposition:
             global starting position
         """
 
-        if len(domain) < len(self.dims):
-            raise ValueError(
-                "Dimensionality of the domain ({}) must be larger than \
-                    the dimensionality of the topology ({})".format(
-                    len(domain), len(self.dims)
-                )
-            )
-
+        axes = self._axes(domain)
         sizes = list(domain)
         sub_sizes = list(domain)
         starts = [0] * len(domain)
 
         # Iterating over the dimensions of the topology
         # allows for composition of higher order data domains
-        for dim in range(len(self.dims)):
-            rdims = [False] * len(self.dims)
-            rdims[dim] = True
-
-            # sub-communicator for collective communications over
-            # a single dimension in the topology
-            if self.comm.topology is self.MPI.CART:
-                subcomm = self.comm.Sub(remain_dims=rdims)
+        subcomms = self.subcomms()
+        for dim, (axis, subcomm) in enumerate(zip(axes, subcomms)):
+            sub_size = subcomm.allgather(sub_sizes[axis])
+            sizes[axis] = sum(sub_size)
+            bounds = numpy.cumsum([0] + sub_size)
+            starts[axis] = bounds[self.coords[dim]]
+
+            if self.cyclic is not None:
+                starts[axis] = min(self.coords[dim] * self.cyclic[dim], sizes[axis])
+                expected = self.cyclic_sizes(dim, sizes[axis])
+            elif self.custom:
+                expected = numpy.diff(self.bounds(dim, sizes[axis])).tolist()
             else:
-                subcomm = self.comm
+                expected = sub_size
+            if sub_size != expected:
+                raise ValueError(
+                    f"The local sizes {sub_size} along axis {axis} do not match "
+                    "the blocks of the decomposition"
+                )
 
-            sub_size = subcomm.allgather(sub_sizes[dim])
-            sizes[dim] = sum(sub_size)
-            starts[dim] = numpy.cumsum([0] + sub_size)[self.coords[dim]]
+        if not plans.enabled:
+            for subcomm in subcomms:
+                if subcomm is not self.comm:
+                    subcomm.Free()
 
         return tuple(sizes), tuple(sub_sizes), tuple(starts)
 
+    def subcomms(self):
+        """
+        Returns the sub-communicators for collective communications over
+        a single dimension of the topology (cached, see plans).
+        """
+
+        if self.comm.topology is not self.MPI.CART:
+            return [self.comm] * len(self.dims)
+
+        def create():
+            subcomms = []
+            for dim in range(len(self.dims)):
+                rdims = [False] * len(self.dims)
+                rdims[dim] = True
+                subcomms.append(self.comm.Sub(remain_dims=rdims))
+            return subcomms
+
+        return plans.subcomms(self.comm, self.topology, create)
+
+    def cyclic_sizes(self, dim, size):
+        """
+        Returns the number of elements per coordinate along the dimension dim
+        of the topology for a block-cyclic decomposition of size elements.
+        """
+        workers, block = self.dims[dim], self.cyclic[dim]
+        blocks, rem = divmod(size, block)
+        sizes = [blocks // workers * block] * workers
+        for coord in range(blocks % workers):
+            sizes[coord] += block
+        sizes[blocks % workers] += rem
+        return sizes
+
+    def local_indices(self, domain):
+        """
+        Returns per axis the global indices of the elements of the local array,
+        e.g. local = global[numpy.ix_(*local_indices(global.shape))].
+        """
+        _, sub_sizes, starts = self.decompose(domain)
+        indices = [
+            numpy.arange(start, start + size) for start, size in zip(starts, sub_sizes)
+        ]
+        if self.cyclic is not None:
+            for dim, axis in enumerate(self._axes(domain)):
+                workers, block = self.dims[dim], self.cyclic[dim]
+                idx = numpy.arange(domain[axis])
+                indices[axis] = idx[idx // block % workers == self.coords[dim]]
+        return tuple(indices)
+
+    def darray(self, sizes, etype, order):
+        """
+        Returns the committed distributed-array datatype of the local blocks
+        of a block-cyclic decomposition (cached, see plans).
+        """
+        MPI = self.MPI
+        ndim = len(sizes)
+        distribs = [MPI.DISTRIBUTE_NONE] * ndim
+        dargs = [MPI.DISTRIBUTE_DFLT_DARG] * ndim
+        psizes = [1] * ndim
+        for dim, axis in enumerate(self._axes(sizes)):
+            distribs[axis] = MPI.DISTRIBUTE_CYCLIC
+            dargs[axis] = self.cyclic[dim]
+            psizes[axis] = self.dims[dim]
+
+        key = ("darray", self.topology, tuple(sizes), tuple(dargs), tuple(psizes))
+        key += (etype.py2f(), order)
+
+        def create():
+            filetype = etype.Create_darray(
+                self.size, self.rank, sizes, distribs, dargs, psizes, order=order
+            )
+            filetype.Commit()
+            return filetype
+
+        return plans.get(self.comm, key, create)
+
+    def filetype(self, sizes, subsizes, starts, etype, order):
+        """
+        Returns the committed subarray datatype of the local domain
+        (cached, see plans).
+        """
+        key = ("subarray", tuple(sizes), tuple(subsizes), tuple(starts))
+        key += (etype.py2f(), order)
+
+        def create():
+            filetype = etype.Create_subarray(sizes, subsizes, starts, order=order)
+            filetype.Commit()
+            return filetype
+
+        return plans.get(self.comm, key, create)
+
+    def _halo(self, domain, halo, periodic):
+        "Returns per axis of the domain the widths of the halo and the periodicity"
+        if isinstance(halo, int):
+            widths = [0] * len(domain)
+            for axis in self._axes(domain):
+                widths[axis] = halo
+        else:
+            widths = list(halo) + [0] * (len(domain) - len(halo))
+        if isinstance(periodic, bool):
+            periodic = [periodic] * len(domain)
+        else:
+            periodic = list(periodic) + [False] * (len(domain) - len(periodic))
+        if len(widths) != len(domain) or len(periodic) != len(domain):
+            raise ValueError(f"Too many halo widths for a domain of {len(domain)} axes")
+        if min(widths, default=0) < 0:
+            raise ValueError(f"The halo widths must be non-negative, given {halo}")
+        return tuple(int(width) for width in widths), tuple(map(bool, periodic))
+
+    def halo_indices(self, domain, halo, periodic=False):
+        """
+        Returns per axis the global indices of the elements of the local block
+        padded with halo layers of the given widths (see load). The layers
+        outside the domain wrap around along the periodic axes, otherwise
+        their indices are -1.
+        """
+        if self.cyclic is not None:
+            raise NotImplementedError("halo is not supported by cyclic decompositions")
+        _, sub_sizes, starts = self.decompose(domain)
+        widths, periodic = self._halo(domain, halo, periodic)
+        indices = []
+        for size, sub_size, start, width, wrap in zip(
+            domain, sub_sizes, starts, widths, periodic
+        ):
+            idx = numpy.arange(start - width, start + sub_size + width)
+            if wrap:
+                idx %= size
+            else:
+                idx[(idx < 0) | (idx >= size)] = -1
+            indices.append(idx)
+        return tuple(indices)
+
+    def halo_types(self, sizes, halo, periodic, etype):
+        """
+        Returns the shape of the local block padded with the halo, the
+        committed datatypes for reading it with a single collective read and
+        the sources of the repeated layers (cached, see plans). The file type
+        selects once the elements needed, in increasing order, and the memory
+        type places them at their first position in the padded block. The
+        layers repeated along an axis (periodic halo wider than the domain
+        of the neighbours) are then copied from sources[axis], if not None,
+        e.g. padded[...] = padded.take(sources[axis], axis). C order only.
+        """
+        sizes = tuple(sizes)
+        widths, periodic = self._halo(sizes, halo, periodic)
+        key = ("halo", self.topology, self.options, sizes, widths, periodic)
+        key += (etype.py2f(),)
+
+        def create():
+            indices = self.halo_indices(sizes, widths, periodic)
+            shape = tuple(map(len, indices))
+            # the trailing axes read whole are contiguous
+            tail = len(sizes)
+            while tail and numpy.array_equal(
+                indices[tail - 1], numpy.arange(sizes[tail - 1])
+            ):
+                tail -= 1
+            files, mems, sources = [], [], []
+            for idx in indices[:tail]:
+                valid = numpy.flatnonzero(idx >= 0)
+                uniq, first, inverse = numpy.unique(
+                    idx[valid], return_index=True, return_inverse=True
+                )
+                files.append(uniq)
+                mems.append(valid[first])
+                source = numpy.arange(len(idx))
+                source[valid] = valid[first][inverse]
+                repeated = len(uniq) < len(valid)
+                sources.append(source if repeated else None)
+            sources += [None] * (len(sizes) - tail)
+            return (
+                shape,
+                _selection_type(etype, sizes, files, tail),
+                _selection_type(etype, shape, mems, tail),
+                tuple(sources),
+            )
+
+        return plans.get(self.comm, key, create)
+
+
+def _selection_type(etype, shape, indices, tail):
+    """
+    Returns the committed datatype of the elements of an array of given shape
+    (C order) at the product of the indices per leading axis, the axes from
+    tail being whole. The innermost indices are grouped in contiguous runs.
+    """
+    extent = etype.Get_extent()[1]
+    inner = int(numpy.prod(shape[tail:], dtype=int))
+    datatype = etype.Create_contiguous(inner)
+    stride = inner * extent
+    for axis in reversed(range(tail)):
+        idx = [int(i) for i in indices[axis]]
+        if axis == tail - 1:
+            runs = []
+            for i in idx:
+                if runs and sum(runs[-1]) == i:
+                    runs[-1][1] += 1
+                else:
+                    runs.append([i, 1])
+            new = datatype.Create_hindexed(
+                [count for _, count in runs], [start * stride for start, _ in runs]
+            )
+        else:
+            new = datatype.Create_hindexed_block(1, [i * stride for i in idx])
+        datatype.Free()
+        datatype = new
+        stride *= shape[axis]
+    datatype.Commit()
+    return datatype
+
 
 def _split_work(load, workers, proc_id):
     """
@@ -170,3 +608,17 @@ def _split_work(load, workers, proc_id):
         bound = (unifload + 1) * rem + unifload * (proc_id - rem)
 
     return bound
+
+
+def get_decomposition(comm, decomposition=None):
+    """
+    Returns the Decomposition over comm. decomposition can be an instance of
+    Decomposition (over comm) or a dictionary of its options.
+    """
+    if decomposition is None:
+        return Decomposition(comm=comm)
+    if isinstance(decomposition, Decomposition):
+        if decomposition.comm != comm:
+            raise ValueError("The decomposition is over a different communicator")
+        return decomposition
+    return Decomposition(comm=comm, **decomposition)
@@ -0,0 +1,14 @@
+"""
+Interface for dill format
+"""
+
+__all__ = [
+    "load",
+    "save",
+]
+
+import dill
+from lyncs_utils import open_file
+
+load = open_file(dill.load, 0, "rb")
+save = open_file(dill.dump, 1, "wb")
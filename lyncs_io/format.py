@@ -2,10 +2,25 @@
 Base class for file formats
 """
 
-from dataclasses import dataclass
+from dataclasses import dataclass, field
 from collections import OrderedDict
+from importlib import import_module
+from importlib.util import find_spec
+from typing import Any
 from lyncs_utils import to_path
 from .archive import split_filename
+from .utils import dir_index
+
+# Number of bytes read from a file for detecting its format
+MAGIC_SIZE = 512
+
+
+def read_magic(path):
+    "Returns the first block of a file and its size"
+    path = to_path(path)
+    with open(path, "rb") as fptr:
+        block = fptr.read(MAGIC_SIZE)
+    return block, path.stat().st_size
 
 
 def not_implemented(*args, **kwargs):
@@ -13,6 +28,28 @@ def not_implemented(*args, **kwargs):
     raise NotImplementedError("This function is not avaiable")
 
 
+class BackendFunction:
+    """
+    Function of a format implemented in its backend module.
+    The module is imported only when the function is called.
+    """
+
+    def __init__(self, fmt, name):
+        self.format = fmt
+        self.name = name
+
+    @property
+    def function(self):
+        "The actual function of the backend"
+        return getattr(self.format.check().backend, self.name)
+
+    def __call__(self, *args, **kwargs):
+        return self.function(*args, **kwargs)
+
+    def __repr__(self):
+        return f"{self.format.module}.{self.name}"
+
+
 @dataclass
 class Format:
     """
@@ -28,6 +65,11 @@ class Format:
     - archive: whether the format is used for archiving
     - binary: whether the format stores the data as binary
     - description: a description of the format
+    - module: module implementing the format, imported on first use.
+      If given, load, save and head can be names of functions in the module.
+    - requires: list of modules (packages) needed by the format
+    - magic: bytes the file starts with, or function (block, size) -> bool
+      telling whether the first block of a file of given size is in this format
     """
 
     name: str
@@ -39,6 +81,17 @@ class Format:
     error: Exception = None
     archive: bool = False
     description: str = ""
+    module: str = None
+    requires: list = ()
+    magic: Any = None
+    _backend: Any = field(default=None, init=False, repr=False, compare=False)
+
+    def __post_init__(self):
+        for key in ("load", "save", "head"):
+            if isinstance(getattr(self, key), str):
+                if not self.module:
+                    raise ValueError(f"{key} given by name but module is not set")
+                setattr(self, key, BackendFunction(self, getattr(self, key)))
 
     def __eq__(self, other):
         if isinstance(other, Format):
@@ -56,10 +109,43 @@ class Format:
 
     def check(self):
         "Checks the format and return itself. Otherwise raises error."
+        if self.error is None and self.module and self._backend is None:
+            try:
+                self._backend = import_module(self.module, __package__)
+            except ImportError as err:
+                self.error = err
         if self.error:
             raise self.error
         return self
 
+    @property
+    def backend(self):
+        "The module implementing the format (imported on first access)"
+        if not self.module:
+            return None
+        return self.check()._backend
+
+    def matches(self, block, size=None):
+        """
+        Whether the first block of a file (of given size) is in this format.
+        Returns None if the format does not define a magic.
+        """
+        if self.magic is None:
+            return None
+        if isinstance(self.magic, bytes):
+            return block.startswith(self.magic)
+        return bool(self.magic(block, size))
+
+    @property
+    def available(self):
+        """
+        Whether the format can be used.
+        The required modules are searched for but not imported.
+        """
+        if self.error:
+            return False
+        return all(find_spec(module) is not None for module in self.requires)
+
     @property
     def names(self):
         "Names of the format (name and alias)"
@@ -92,26 +178,66 @@ class Formats(OrderedDict):
                     return format
         raise ValueError(f"Could not deduce the format from the suffix: {suffix}")
 
-    def from_path(self, path):
-        "Returns a format from the given path"
+    def from_content(self, block, size=None):
+        "Returns a format from the first block of a file (of given size)"
+        for format in self.unique():
+            if format.matches(block, size):
+                return format
+        raise ValueError("Could not deduce the format from the content")
+
+    def from_file(self, path):
+        """
+        Returns a format from an existing file.
+        The suffix is used if it agrees with the content of the file,
+        otherwise the format is deduced from the content.
+        """
+        path = to_path(path)
+        block, size = read_magic(path)
+
+        format = None
+        if path.suffix:
+            try:
+                format = self.from_suffix(*path.suffixes)
+            except ValueError:
+                pass
+            if format is not None and format.matches(block, size) is not False:
+                return format
+
+        try:
+            return self.from_content(block, size)
+        except ValueError:
+            if format is not None:
+                return format
+            raise
+
+    def from_path(self, path, sniff=True):
+        """
+        Returns a format from the given path.
+        If sniff, the content of existing files is used for detecting the format.
+        """
         path = to_path(path)
         err = "Could not deduce the format from the path"
 
-        if path.parent.is_dir():
+        if dir_index.is_dir(path.parent):
+            if sniff and path.is_file():
+                return self.from_file(path)
             if path.suffix:
                 return self.from_suffix(*path.suffixes)
             if path.exists():
                 raise ValueError(err)
-            matches = tuple(path.parent.glob(path.name + ".*"))
+            matches = dir_index.glob(path.parent, path.name + ".*")
             if not matches or len(matches) > 1:
                 raise ValueError(err)
-            return self.from_path(matches[0])
+            return self.from_path(matches[0], sniff=sniff)
 
         path, _ = split_filename(path)
-        return self.from_path(path)
+        return self.from_path(path, sniff=sniff)
 
-    def get_format(self, format=None, filename=None):
-        "Return the appropriate format checking the format string or the filename extension."
+    def get_format(self, format=None, filename=None, sniff=True):
+        """
+        Return the appropriate format checking the format string or the filename.
+        If sniff, the content of the file is checked, otherwise only its extension.
+        """
 
         # 1. Using format
         if format:
@@ -119,7 +245,7 @@ class Formats(OrderedDict):
 
         # 2. Using filename
         if filename:
-            return self.from_path(filename).check()
+            return self.from_path(filename, sniff=sniff).check()
 
         raise ValueError(
             """
@@ -136,6 +262,14 @@ class Formats(OrderedDict):
         for name in names:
             self[name.lower()] = fmt
 
+    def available(self):
+        "Returns the list of formats that can be used, without importing them"
+        return [fmt for fmt in self.unique() if fmt.available]
+
+    def unique(self):
+        "Returns the list of formats without repetitions due to aliases"
+        return list({id(fmt): fmt for fmt in self.values()}.values())
+
     def __str__(self):
         return ", ".join(self.keys())
 
@@ -1,4 +1,10 @@
-""" List of formats supported by Lyncs IO """
+"""
+List of formats supported by Lyncs IO
+
+The formats are registered giving the name of the module that implements them.
+The modules (and their dependencies) are imported only once the format is used,
+such that `import lyncs_io` stays cheap.
+"""
 
 __all__ = [
     "register",
@@ -7,17 +13,46 @@ __all__ = [
 
 import pickle
 import json
-from lyncs_utils import open_file
+import struct
+from lyncs_utils import open_file, prod
 from .format import Formats
-from . import numpy, lime, tar, openqcd
+from .tar import all_extensions as tar_extensions
 
 formats = Formats()
 register = formats.register
 
 
+# Functions for detecting the format from the first block of a file.
+# They must not import the backends.
+
+
+def is_pickle(block, _size=None):
+    "Whether the block starts with a pickle (protocol >= 2) header"
+    return len(block) > 1 and block[0] == 0x80 and 2 <= block[1] <= 5
+
+
+def is_tar(block, _size=None):
+    "Whether the block is the beginning of a (compressed) tarball"
+    return block[257:262] == b"ustar" or block.startswith(
+        (b"\x1f\x8b", b"BZh", b"\xfd7zXZ\x00")
+    )
+
+
+def is_openqcd(block, size=None):
+    "Whether the header (lattice sizes) is consistent with the size of the file"
+    if len(block) < 24:
+        return False
+    dims = struct.unpack("<iiii", block[:16])
+    if min(dims) <= 0:
+        return False
+    # header + 4 directions x SU(3) matrices of complex128
+    return size is None or size == 24 + prod(dims) * 4 * 9 * 16
+
+
 register(
     "pickle",
     extensions=["pkl"],
+    magic=is_pickle,
     load=open_file(pickle.load, 0, "rb"),
     save=open_file(pickle.dump, 1, "wb"),
     description="Python's pickle file format. See https://docs.python.org/3/library/pickle.html.",
@@ -32,103 +67,97 @@ register(
     description="Python's JSON file format. See https://docs.python.org/3/library/json.html.",
 )
 
-try:
-    import dill
-
-    _ = {
-        "load": open_file(dill.load, 0, "rb"),
-        "save": open_file(dill.dump, 1, "wb"),
-    }
-
-except ImportError as err:
-    _ = {
-        "error": err,
-    }
-
 register(
     "dill",
     extensions=["pkl", "dll"],
+    module=".dill",
+    magic=is_pickle,
+    requires=["dill"],
+    load="load",
+    save="save",
     description="Alternative to Python's pickle file format. Supports lambda functions.",
-    **_,
 )
 
 register(
     "ASCII",
     "txt",
     extensions=["txt"],
-    load=numpy.loadtxt,
-    save=numpy.savetxt,
+    module=".numpy",
+    load="loadtxt",
+    save="savetxt",
     description="ASCII, human-readable format. Limited to 1D or 2D arrays.",
 )
 
 register(
     "Numpy",
     extensions=["npy"],
-    head=numpy.head,
-    load=numpy.load,
-    save=numpy.save,
+    magic=b"\x93NUMPY",
+    module=".numpy",
+    head="head",
+    load="load",
+    save="save",
     description="Numpy binary format",
 )
 
 register(
     "NumpyZ",
     extensions=["npz"],
-    head=numpy.headz,
-    load=numpy.loadz,
-    save=numpy.savez,
+    magic=b"PK",
+    module=".numpy",
+    head="headz",
+    load="loadz",
+    save="savez",
     description="Numpy zip format",
     archive=True,
 )
 
 register(
     "Tar",
-    extensions=tar.all_extensions,
-    head=tar.head,
-    load=tar.load,
-    save=tar.save,
+    extensions=tar_extensions,
+    magic=is_tar,
+    module=".tar",
+    head="head",
+    load="load",
+    save="save",
     description="Tar/Tarball archive format",
     archive=True,
 )
 
-try:
-    from . import hdf5
-
-    _ = {
-        "head": hdf5.head,
-        "load": hdf5.load,
-        "save": hdf5.save,
-    }
-
-except ImportError as err:
-    _ = {
-        "error": err,
-    }
-
 register(
     "HDF5",
     extensions=["h5", "hdf5"],
+    magic=b"\x89HDF\r\n\x1a\n",
+    module=".hdf5",
+    requires=["h5py"],
+    head="head",
+    load="load",
+    save="save",
     description="HDF5 file format",
     archive=True,
-    **_,
 )
 
 
 register(
     "lime",
     extensions=["lime"],
+    magic=struct.pack(">l", 1164413355),  # lime.MAGIC_NUMBER
     description="LQCD lime format",
-    head=lime.head,
-    load=lime.load,
-    save=lime.save,
+    module=".lime",
+    head="head",
+    load="load",
+    save="save",
     # archive=True, # Supporting single dataset for now
 )
 
 register(
     "openqcd",
     extensions=["oqcd"],
+    magic=is_openqcd,
     description="OpenQCD file format",
-    head=openqcd.head,
-    load=openqcd.load,
-    save=openqcd.save,
+    module=".openqcd",
+    requires=["lyncs_cppyy"],
+    head="head",
+    load="load",
+    save="save",
     # archive=True, # Supporting single dataset for now
 )
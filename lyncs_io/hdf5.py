@@ -13,14 +13,42 @@ from h5py import File, Dataset, Group, h5
 from .archive import split_filename, Data, Loader, Archive
 from .convert import to_array, from_array
 from .header import Header
-from .utils import default_names, is_dask_array
-from .mpi_io import check_comm
-from .decomposition import Decomposition
+from .utils import default_names, is_dask_array, check_out
+from .mpi_io import check_comm, on_root
+from .decomposition import get_decomposition
+from .lazy import LazyArray
 
 mpi = h5.get_config().mpi
 
 
-def _load_dataset(dts, header_only=False, comm=None, **kwargs):
+class DatasetReader:
+    "Reads boxes (hyperslabs) of a dataset. See LazyArray."
+
+    def __init__(self, filename, key, attrs=None):
+        self.filename = filename
+        self.key = key
+        self.attrs = attrs
+
+    def __call__(self, box):
+        with File(self.filename, "r") as h5f:
+            return from_array(h5f[self.key][box], self.attrs)
+
+
+def _check_decomposition(decomposition):
+    if decomposition.cyclic is not None:
+        raise NotImplementedError("Block-cyclic decompositions are not supported")
+    return decomposition
+
+
+def _load_dataset(
+    dts,
+    header_only=False,
+    comm=None,
+    out=None,
+    lazy=False,
+    decomposition=None,
+    **kwargs,
+):
     assert isinstance(dts, Dataset)
     assert not kwargs, f"Unknown parameters {kwargs}"
 
@@ -32,19 +60,37 @@ def _load_dataset(dts, header_only=False, comm=None, **kwargs):
     if header_only:
         return attrs, None
 
+    if lazy:
+        if comm is not None:
+            raise ValueError("lazy and comm parameters cannot be both set")
+        reader = DatasetReader(dts.file.filename, dts.name, attrs)
+        return attrs, LazyArray(dts.shape, attrs["dtype"], reader, attrs=attrs)
+
     if comm is not None:
-        _, subsizes, starts = Decomposition(comm=comm).decompose(dts.shape)
+        decomposition = _check_decomposition(get_decomposition(comm, decomposition))
+        _, subsizes, starts = decomposition.decompose(dts.shape)
         slc = tuple(slice(start, start + size) for start, size in zip(starts, subsizes))
     else:
         slc = tuple(slice(size) for size in dts.shape)
 
+    if out is not None:
+        shape = tuple(sl.stop - (sl.start or 0) for sl in slc)
+        dts.read_direct(check_out(out, shape, dts.dtype), source_sel=slc)
+        return attrs, from_array(out, attrs)
+
     return attrs, from_array(dts[slc], attrs)
 
 
 def _load(h5f, depth=1, header_only=False, all_data=False, **kwargs):
     if isinstance(h5f, Group):
         return {
-            key: _load(val, depth=depth - 1, all_data=all_data, **kwargs)
+            key: _load(
+                val,
+                depth=depth - 1,
+                header_only=header_only,
+                all_data=all_data,
+                **kwargs,
+            )
             if all_data or depth > 0 or isinstance(val, Dataset)
             else None
             for key, val in h5f.items()
@@ -74,7 +120,11 @@ def _load_dispatch(h5f, key, loader, header_only=False, **kwargs):
         return data
 
     if isinstance(h5f, Group):
-        return Archive(_load(h5f, **kwargs), loader=loader, path=key)
+        if kwargs.pop("out", None) is not None:
+            raise ValueError("out can be used only for loading a dataset")
+        return Archive(
+            _load(h5f, header_only=header_only, **kwargs), loader=loader, path=key
+        )
 
     raise TypeError(f"Unsupported {type(h5f)}")
 
@@ -103,15 +153,18 @@ def load(filename, key=None, chunks=None, comm=None, **kwargs):
         return _load_dispatch(h5f, key, loader, **kwargs)
 
 
-def head(*args, **kwargs):
-    "Head function for HDF5"
+def head(*args, comm=None, **kwargs):
+    """
+    Head function for HDF5.
+    If comm is given, the file is opened and read by rank 0 only.
+    """
+    if comm is not None:
+        return on_root(comm, load, *args, header_only=True, **kwargs)
     return load(*args, header_only=True, **kwargs)
 
 
-def _write_dataset(grp, key, data, comm=None, **kwargs):
-    "Writes a dataset in the group"
-    assert not kwargs, f"Unknown parameters {kwargs}"
-
+def _dataset_key(grp, key):
+    "Returns the key of the dataset to write in the group, removing the old one"
     if not key:
         for name in default_names():
             if name not in grp:
@@ -126,23 +179,49 @@ def _write_dataset(grp, key, data, comm=None, **kwargs):
         #     return _write_dataset(grp[key], "", data, **kwargs)
         del grp[key]
 
+    return key
+
+
+def _write_attrs(dset, attrs):
+    for attr, val in attrs.items():
+        try:
+            dset.attrs[attr] = val
+        except TypeError:
+            dset.attrs[attr] = str(val)
+
+
+def create_dataset(h5f, key, shape, dtype, attrs=None):
+    """
+    Creates an empty dataset (replacing key) with the given attributes.
+    The data can then be written by hyperslabs, e.g. dset[box] = data.
+    """
+    group, key = split_key(key)
+    grp = h5f.require_group(group)
+    key = _dataset_key(grp, key)
+    dset = grp.create_dataset(key, shape, dtype=dtype)
+    _write_attrs(dset, attrs or {})
+    return dset
+
+
+def _write_dataset(grp, key, data, comm=None, decomposition=None, **kwargs):
+    "Writes a dataset in the group"
+    assert not kwargs, f"Unknown parameters {kwargs}"
+
+    key = _dataset_key(grp, key)
     data, attrs = to_array(data)
     if data.dtype.char == "U":
         data = data.astype("S")
 
     if comm is not None:
-        global_shape, subsizes, starts = Decomposition(comm=comm).compose(data.shape)
+        decomposition = _check_decomposition(get_decomposition(comm, decomposition))
+        global_shape, subsizes, starts = decomposition.compose(data.shape)
         slc = tuple(slice(start, start + size) for start, size in zip(starts, subsizes))
         dset = grp.create_dataset(key, global_shape, dtype=data.dtype)
         dset[slc] = data
     else:
         grp.create_dataset(key, data=data)
 
-    for attr, val in attrs.items():
-        try:
-            grp[key].attrs[attr] = val
-        except TypeError:
-            grp[key].attrs[attr] = str(val)
+    _write_attrs(grp[key], attrs)
 
 
 def split_key(key):
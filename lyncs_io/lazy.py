@@ -0,0 +1,212 @@
+"""
+Lazy arrays: the data is read from file only when sliced
+"""
+
+__all__ = [
+    "LazyArray",
+    "lazy_array",
+]
+
+import os
+from itertools import product
+from numbers import Integral
+import numpy
+from lyncs_utils import prod
+from lyncs_utils.io import FileLike
+from .pread import pread_runs
+
+
+def split_key(key, shape):
+    """
+    Splits a key (ints, slices and Ellipsis) in the box to be read and the
+    key to be applied to the box for getting the result.
+
+    Returns
+    -------
+    box: tuple
+        A slice with positive step for each axis
+    post: tuple
+        Key to apply to the box (removes the axes indexed by integers
+        and reverses the axes with negative steps)
+    """
+    if not isinstance(key, tuple):
+        key = (key,)
+
+    ellipsis = [i for i, k in enumerate(key) if k is Ellipsis]
+    if len(ellipsis) > 1:
+        raise IndexError("an index can only have a single ellipsis ('...')")
+    if ellipsis:
+        idx = ellipsis[0]
+        fill = (slice(None),) * (len(shape) - len(key) + 1)
+        key = key[:idx] + fill + key[idx + 1 :]
+    if len(key) > len(shape):
+        raise IndexError(f"too many indices: {len(shape)} dimensions, {len(key)} given")
+    key = key + (slice(None),) * (len(shape) - len(key))
+
+    box = []
+    post = []
+    for k, size in zip(key, shape):
+        if isinstance(k, Integral):
+            k = int(k)
+            if not -size <= k < size:
+                raise IndexError(f"index {k} is out of bounds for size {size}")
+            k %= size
+            box.append(slice(k, k + 1, 1))
+            post.append(0)
+        elif isinstance(k, slice):
+            rng = range(*k.indices(size))
+            if rng.step < 0:
+                rng = rng[::-1]
+                post.append(slice(None, None, -1))
+            else:
+                post.append(slice(None))
+            if not rng:
+                box.append(slice(0, 0, 1))
+            else:
+                box.append(slice(rng.start, rng[-1] + 1, rng.step))
+        else:
+            raise TypeError(
+                f"Unsupported index {type(k)}. Only integers, slices and Ellipsis."
+            )
+    return tuple(box), tuple(post)
+
+
+def box_runs(shape, box, order="C"):
+    """
+    Returns the list of (position, count) in elements of the contiguous runs
+    of a box (slices with positive step) of an array stored in the given order.
+    The runs follow the order of the elements of the box.
+    """
+    if order == "F":
+        shape, box = shape[::-1], box[::-1]
+    inner = [prod(shape[i + 1 :]) for i in range(len(shape))]
+
+    # the axes after k are fully covered
+    k = len(shape) - 1
+    while k >= 0 and box[k] == slice(0, shape[k], 1):
+        k -= 1
+    if k < 0:
+        return [(0, prod(shape))]
+
+    if box[k].step == 1:
+        outer = range(k)
+        first = box[k].start * inner[k]
+        count = (box[k].stop - box[k].start) * inner[k]
+    else:
+        outer = range(k + 1)
+        first = 0
+        count = inner[k]
+
+    runs = []
+    ranges = (range(box[i].start, box[i].stop, box[i].step) for i in outer)
+    for idx in product(*ranges):
+        pos = first + sum(i * inner[axis] for axis, i in zip(outer, idx))
+        if runs and runs[-1][0] + runs[-1][1] == pos:
+            runs[-1] = (runs[-1][0], runs[-1][1] + count)
+        else:
+            runs.append((pos, count))
+    return runs
+
+
+class LazyArray:
+    """
+    Array whose data is read from file only when it is sliced.
+
+    Attributes
+    ----------
+    - shape: shape of the array
+    - dtype: dtype of the array
+    - reader: function reading a box (tuple of slices with positive step)
+    - attrs: header of the array
+    """
+
+    def __init__(self, shape, dtype, reader, attrs=None):
+        self.shape = tuple(shape)
+        self.dtype = numpy.dtype(dtype)
+        self.reader = reader
+        self.attrs = attrs or {}
+
+    @property
+    def ndim(self):
+        "Number of dimensions"
+        return len(self.shape)
+
+    @property
+    def size(self):
+        "Number of elements"
+        return prod(self.shape)
+
+    @property
+    def nbytes(self):
+        "Number of bytes of the data"
+        return self.size * self.dtype.itemsize
+
+    def __len__(self):
+        if not self.shape:
+            raise TypeError("len() of unsized object")
+        return self.shape[0]
+
+    def __getitem__(self, key):
+        box, post = split_key(key, self.shape)
+        return self.reader(box)[post]
+
+    def __array__(self, dtype=None, copy=None):
+        arr = self[...]
+        if dtype is not None:
+            arr = arr.astype(dtype)
+        return arr
+
+    def __repr__(self):
+        return f"LazyArray(shape={self.shape}, dtype={self.dtype})"
+
+
+class RawReader:
+    """
+    Reads boxes of an array stored contiguously in a binary file,
+    using the minimal number of positioned reads (in parallel, see pread).
+    """
+
+    def __init__(self, filename, shape, dtype, offset=0, order="C"):
+        self.filename = filename
+        self.shape = tuple(shape)
+        self.dtype = numpy.dtype(dtype)
+        self.offset = offset
+        self.order = order
+
+    def runs(self, box):
+        "Returns the list of (position, count) in elements of the contiguous runs"
+        return box_runs(self.shape, box, self.order)
+
+    def __call__(self, box):
+        shape = tuple(len(range(sl.start, sl.stop, sl.step)) for sl in box)
+        itemsize = self.dtype.itemsize
+        buf = numpy.empty(prod(shape) * itemsize, dtype="u1")
+        if buf.size:
+            runs = [
+                (self.offset + start * itemsize, count * itemsize)
+                for start, count in self.runs(box)
+            ]
+            fd = os.open(self.filename, os.O_RDONLY | getattr(os, "O_BINARY", 0))
+            try:
+                pread_runs(fd, buf, runs)
+            finally:
+                os.close(fd)
+        return buf.view(self.dtype).reshape(shape, order=self.order)
+
+
+def lazy_array(filename, header, offset=0):
+    """
+    Returns a LazyArray for the data described by header (shape, dtype,
+    fortran_order and _offset) stored contiguously in the file.
+    The offset is added to header["_offset"].
+    """
+    if isinstance(filename, FileLike):
+        raise ValueError("Lazy arrays require a filename, not a file-like object")
+    reader = RawReader(
+        os.path.abspath(filename),
+        header["shape"],
+        header["dtype"],
+        offset + header["_offset"],
+        order="F" if header.get("fortran_order") else "C",
+    )
+    return LazyArray(header["shape"], header["dtype"], reader, attrs=header)
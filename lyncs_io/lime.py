@@ -20,9 +20,11 @@ from lyncs_utils import (
 )
 from .convert import from_array, to_array
 from .header import Header
-from .utils import is_dask_array
-from .mpi_io import MpiIO, check_comm
+from .utils import is_dask_array, read_array, map_array, header_cache
+from .mpi_io import MpiIO, check_comm, collective
 from .dask_io import DaskIO
+from .lazy import lazy_array
+from . import metrics
 
 # Constants
 HEADER_SIZE = 144
@@ -209,28 +211,52 @@ def write_records(_fp, records):
         write_record(_fp, key, val, begin=(idx == 0), end=(idx == last))
 
 
-def write_data(_fp, data, metadata=None, lime_type=None):
+def get_metadata_records(metadata, sizes=None):
+    """
+    Returns the records with the metadata.
+    If sizes is given, the records are padded to the given number of bytes.
+    """
+    records = {}
+    for key, fnc in write_metadatas.items():
+        try:
+            records[key] = fnc(metadata)
+        except ValueError:
+            pass
+    if sizes is not None:
+        for key, val in records.items():
+            if len(val) > sizes.get(key, 0):
+                raise ValueError(f"Metadata exceeds the space reserved for {key}")
+            # the parsers ignore trailing new lines
+            records[key] = val.ljust(sizes[key], b"\n")
+    return records
+
+
+def write_data(_fp, data, metadata=None, lime_type=None, sizes=None):
     "Writes a data object to file and its metadata"
     if lime_type is None:
         lime_type = datas[-1]
     records = {}
     if metadata:
-        for key, fnc in write_metadatas.items():
-            try:
-                records[key] = fnc(metadata)
-            except ValueError:
-                pass
+        records.update(get_metadata_records(metadata, sizes))
     records[lime_type] = data
     write_records(_fp, records)
 
 
-def get_header_bytes(metadata, lime_type=None):
-    "Returns the bytes of the header of metadata"
+def get_header_bytes(metadata, lime_type=None, sizes=None):
+    """
+    Returns the bytes of the header of metadata.
+    If sizes is given, the metadata records are padded (see get_metadata_records).
+    """
     out = BytesIO()
-    write_data(out, metadata["nbytes"], metadata=metadata, lime_type=lime_type)
+    write_data(
+        out, metadata["nbytes"], metadata=metadata, lime_type=lime_type, sizes=sizes
+    )
     return out.getvalue()
 
 
+@collective
+@header_cache
+@metrics.timed("header", "lime")
 @open_file
 def head(_fp):
     "Returns metadata of a lime file"
@@ -274,7 +300,19 @@ def head(_fp):
     return header
 
 
-def load(filename, chunks=None, comm=None, **kwargs):
+def load(
+    filename,
+    chunks=None,
+    comm=None,
+    cancel=None,
+    mmap=False,
+    out=None,
+    lazy=False,
+    decomposition=None,
+    halo=None,
+    periodic=False,
+    **kwargs,
+):
     """
     High level interface function for lime load.
     Loads a numpy array from file either in serial or parallel.
@@ -288,6 +326,27 @@ def load(filename, chunks=None, comm=None, **kwargs):
         How to divide the data domain. This enables the Dask API.
     comm: MPI.Cartcomm
         A valid cartesian MPI Communicator.
+    cancel: threading.Event
+        If given, the data is read in chunks and the reading is
+        interrupted once the event is set.
+    mmap: bool
+        If True, a read-only memory map of the data is returned.
+    out: numpy.ndarray
+        If given, the (local) data is read directly into out,
+        that must have the correct shape, dtype and order.
+    lazy: bool
+        If True, a LazyArray is returned that reads from file only
+        the slices accessed.
+    decomposition: Decomposition, dict
+        The decomposition of the data over comm or a dictionary of its
+        options (axes, blocks, partition, align). See Decomposition.
+    halo: int, list
+        If given (with comm), the local array is padded with halo layers of
+        the given widths (per axis, or an int for the decomposed axes) read
+        from the neighbouring domains in the same collective read.
+    periodic: bool, list
+        Whether the halo wraps around the global domain (per axis).
+        Otherwise the layers outside the domain are zero.
     kwargs: dict
         Additional parameters can be passed to override metadata.
         E.g. shape, dtype, etc.
@@ -301,12 +360,21 @@ def load(filename, chunks=None, comm=None, **kwargs):
     if comm is not None and chunks is not None:
         raise ValueError("chunks and comm parameters cannot be both set")
 
-    metadata = head(filename)
+    if halo is not None and comm is None:
+        raise ValueError("halo requires comm")
+
+    metadata = head(filename, comm=comm)
     shape = metadata["shape"]
     dtype = metadata["dtype"]
     offset = metadata["_offset"]
     order = "F" if metadata["fortran_order"] else "C"
 
+    if lazy:
+        return lazy_array(filename, metadata)
+
+    if out is not None and (chunks is not None or mmap):
+        raise ValueError("out cannot be used together with chunks or mmap")
+
     if chunks is not None:
 
         daskio = DaskIO(filename)
@@ -318,18 +386,26 @@ def load(filename, chunks=None, comm=None, **kwargs):
     if comm is not None:
         check_comm(comm)
 
-        with MpiIO(comm, filename, mode="r") as mpiio:
-            return from_array(mpiio.load(shape, dtype, order, offset), attrs=metadata)
+        with MpiIO(comm, filename, mode="r", decomposition=decomposition) as mpiio:
+            local = mpiio.load(
+                shape, dtype, order, offset, out=out, halo=halo, periodic=periodic
+            )
+            return from_array(local, attrs=metadata)
+
+    if mmap:
+        return from_array(
+            map_array(filename, shape, dtype, offset, order=order), attrs=metadata
+        )
 
     return from_array(
-        numpy.fromfile(filename, dtype=dtype, count=prod(shape), offset=offset).reshape(
-            shape
-        ),
+        read_array(filename, shape, dtype, offset, order=order, cancel=cancel, out=out),
         attrs=metadata,
     )
 
 
-def save(array, filename, comm=None, metadata=None):
+def save(
+    array, filename, comm=None, metadata=None, nonblocking=False, decomposition=None
+):
     """
     High level interface function for lime load.
     Loads a numpy array from file either in serial or parallel.
@@ -345,12 +421,18 @@ def save(array, filename, comm=None, metadata=None):
         A valid cartesian MPI Communicator.
     metadata: dict
         Additional metadata to write in the header
+    nonblocking: bool
+        If True (and comm is given), the write is non-blocking and
+        the MpiIO handle is returned. See MpiIO.wait.
+    decomposition: Decomposition, dict
+        The decomposition of the data over comm. See load.
     """
-
+    # pylint: disable=too-many-arguments
     array, attrs = to_array(array)
     if not array.dtype.byteorder == ">":
         attrs["dtype"] = array.dtype.newbyteorder(">")
-        array = array.astype(attrs["dtype"])
+        with metrics.measure("convert", "lime", filename, array.nbytes, copies=1):
+            array = array.astype(attrs["dtype"])
 
     if metadata:
         attrs.update(metadata)
@@ -363,7 +445,13 @@ def save(array, filename, comm=None, metadata=None):
     if comm is not None:
         check_comm(comm)
 
-        with MpiIO(comm, filename, mode="w") as mpiio:
+        with MpiIO(
+            comm,
+            filename,
+            mode="w",
+            nonblocking=nonblocking,
+            decomposition=decomposition,
+        ) as mpiio:
             global_shape, _, _ = mpiio.decomposition.compose(array.shape)
             attrs["shape"] = tuple(global_shape)
             attrs["nbytes"] = prod(global_shape) * attrs["dtype"].itemsize
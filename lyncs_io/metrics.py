@@ -0,0 +1,274 @@
+"""
+Metrics of the I/O operations: timings, bytes moved and buffer copies.
+
+The metrics are disabled by default and, when disabled, measuring an operation
+costs a single check. When enabled, every measured operation produces a Record
+that is aggregated in an in-process registry (see summary) and passed to the
+registered sinks (any callable, e.g. log_sink or a user-defined callback).
+The registry can be exported in the Prometheus textfile format (write_prometheus).
+See also lyncs_io.trace for timelines of the operations.
+
+Measured stages:
+- load, save, head: the high-level functions in lyncs_io.base
+- header: parsing of the headers (numpy, lime, openqcd)
+- header.write: writing of the header by the Dask workers
+- convert: data conversions requiring a copy (e.g. byte order of lime files)
+- convert_file: streaming conversion of a file (lyncs_io.convert_file)
+- iter_load: reads of the slabs yielded by lyncs_io.iter_load
+- writer.write: writes of the slabs by lyncs_io.open_writer
+- decomposition.compose, decomposition.decompose: domain decomposition
+- mpi.view: setup of the MPI file view
+- mpi.read, mpi.write: collective MPI reads and writes
+- dask.write: blockwise writes of Dask arrays
+- dask.lock: wait for the lock on the header by the Dask workers
+- tar.extract: extraction of the members of a tarball
+"""
+
+__all__ = [
+    "enable",
+    "disable",
+    "is_enabled",
+    "measure",
+    "timed",
+    "measured",
+    "add_sink",
+    "remove_sink",
+    "log_sink",
+    "summary",
+    "records",
+    "reset",
+    "write_prometheus",
+]
+
+import os
+import logging
+from collections import deque
+from dataclasses import dataclass
+from functools import wraps
+from threading import Lock
+from time import perf_counter, time
+import numpy
+
+_enabled = False
+_sinks = []
+_lock = Lock()
+_summary = {}
+_records = deque(maxlen=1024)
+
+
+@dataclass
+class Record:
+    "Metrics of a single operation"
+
+    stage: str
+    format: str = None
+    path: str = None
+    seconds: float = 0.0
+    nbytes: int = 0
+    copies: int = 0
+    start: float = 0.0
+
+    @property
+    def throughput(self):
+        "Achieved throughput in GB/s"
+        return self.nbytes / self.seconds / 1e9 if self.seconds else 0.0
+
+    def __enter__(self):
+        self.start = time()
+        self.seconds = perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc_val, traceback):
+        self.seconds = perf_counter() - self.seconds
+        if exc_type is None:
+            _collect(self)
+
+
+class _NullRecord:
+    "Record used when the metrics are disabled. Ignores any update."
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, traceback):
+        pass
+
+    def __setattr__(self, key, val):
+        pass
+
+
+_null = _NullRecord()
+
+
+def enable(flag=True):
+    "Enables (or disables) the metrics"
+    # pylint: disable=global-statement
+    global _enabled
+    _enabled = bool(flag)
+
+
+def disable():
+    "Disables the metrics"
+    enable(False)
+
+
+def is_enabled():
+    "Whether the metrics are enabled"
+    return _enabled
+
+
+def measure(stage, format=None, path=None, nbytes=0, copies=0):
+    """
+    Context manager measuring the wall time of an operation.
+    Returns the Record, whose nbytes and copies can be updated in the context.
+    """
+    # pylint: disable=redefined-builtin
+    if not _enabled:
+        return _null
+    if path is not None and not isinstance(path, (str, os.PathLike)):
+        path = getattr(path, "name", None)
+    return Record(stage, format, path and str(path), nbytes=nbytes, copies=copies)
+
+
+def timed(stage, format=None):
+    "Decorator measuring a function whose first argument is the filename"
+    # pylint: disable=redefined-builtin
+
+    def decorator(fnc):
+        @wraps(fnc)
+        def wrapped(filename, *args, **kwargs):
+            if not _enabled:
+                return fnc(filename, *args, **kwargs)
+            with measure(stage, format, filename):
+                return fnc(filename, *args, **kwargs)
+
+        return wrapped
+
+    return decorator
+
+
+def measured(stage, format=None):
+    "Decorator measuring a function"
+    # pylint: disable=redefined-builtin
+
+    def decorator(fnc):
+        @wraps(fnc)
+        def wrapped(*args, **kwargs):
+            if not _enabled:
+                return fnc(*args, **kwargs)
+            with measure(stage, format):
+                return fnc(*args, **kwargs)
+
+        return wrapped
+
+    return decorator
+
+
+def data_nbytes(obj):
+    "Number of bytes of the array obj, zero for other objects (e.g. lazy arrays)"
+    if isinstance(obj, numpy.ndarray):
+        return obj.nbytes
+    return 0
+
+
+def _collect(record):
+    key = (record.stage, record.format or "")
+    with _lock:
+        _records.append(record)
+        stats = _summary.setdefault(
+            key, {"calls": 0, "seconds": 0.0, "nbytes": 0, "copies": 0}
+        )
+        stats["calls"] += 1
+        stats["seconds"] += record.seconds
+        stats["nbytes"] += record.nbytes
+        stats["copies"] += record.copies
+        sinks = list(_sinks)
+    for sink in sinks:
+        sink(record)
+
+
+def add_sink(sink):
+    "Adds a callable that is called with every Record"
+    with _lock:
+        _sinks.append(sink)
+    return sink
+
+
+def remove_sink(sink):
+    "Removes a sink added with add_sink"
+    with _lock:
+        _sinks.remove(sink)
+
+
+def log_sink(logger=None, level=logging.INFO):
+    "Returns a sink that logs the records"
+    logger = logger or logging.getLogger("lyncs_io.metrics")
+
+    def sink(record):
+        logger.log(
+            level,
+            "%s %s %s: %.6f s, %d bytes, %.3f GB/s, %d copies",
+            record.stage,
+            record.format or "-",
+            record.path or "-",
+            record.seconds,
+            record.nbytes,
+            record.throughput,
+            record.copies,
+        )
+
+    return sink
+
+
+def summary():
+    """
+    Returns the aggregated metrics per (stage, format) as a dictionary
+    with calls, seconds, nbytes, copies and throughput (GB/s).
+    """
+    with _lock:
+        result = {key: dict(stats) for key, stats in _summary.items()}
+    for stats in result.values():
+        stats["throughput"] = (
+            stats["nbytes"] / stats["seconds"] / 1e9 if stats["seconds"] else 0.0
+        )
+    return result
+
+
+def records():
+    "Returns the list of the most recent records (at most 1024)"
+    with _lock:
+        return list(_records)
+
+
+def reset():
+    "Clears the registry"
+    with _lock:
+        _summary.clear()
+        _records.clear()
+
+
+def write_prometheus(filename, prefix="lyncs_io"):
+    """
+    Writes the aggregated metrics in the Prometheus textfile format.
+    The file is replaced atomically as required by the textfile collector.
+    """
+    metrics = {
+        "calls": ("calls_total", "Number of operations"),
+        "seconds": ("seconds_total", "Wall time of the operations in seconds"),
+        "nbytes": ("bytes_total", "Bytes moved by the operations"),
+        "copies": ("copies_total", "Buffer copies made by the operations"),
+    }
+    stats = summary()
+    lines = []
+    for key, (name, doc) in metrics.items():
+        lines.append(f"# HELP {prefix}_{name} {doc}")
+        lines.append(f"# TYPE {prefix}_{name} counter")
+        for (stage, fmt), values in sorted(stats.items()):
+            lines.append(
+                f'{prefix}_{name}{{stage="{stage}",format="{fmt}"}} {values[key]}'
+            )
+
+    tmp = f"{filename}.{os.getpid()}.tmp"
+    with open(tmp, "w", encoding="utf-8") as fptr:
+        fptr.write("\n".join(lines) + "\n")
+    os.replace(tmp, filename)
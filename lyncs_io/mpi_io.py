@@ -5,6 +5,7 @@ Parallel IO using MPI
 __all__ = ["MpiIO"]
 
 from contextlib import contextmanager
+from functools import wraps
 import tempfile
 import os
 import numpy
@@ -18,7 +19,11 @@ except ImportError:
     with_mpi = False
 
 
-from .decomposition import Decomposition
+# Decomposition is re-exported for backward compatibility
+from .decomposition import Decomposition  # pylint: disable=unused-import
+from .decomposition import get_decomposition, plans
+from .utils import check_out
+from . import metrics
 
 
 def check_comm(comm):
@@ -29,6 +34,44 @@ def check_comm(comm):
         )
 
 
+def on_root(comm, fnc, *args, **kwargs):
+    """
+    Calls fnc(*args, **kwargs) on the rank 0 of comm only and broadcasts the
+    result to the other ranks. The exception raised on rank 0, if any, is
+    raised on all the ranks. Archives returned keep loading with comm.
+    """
+    check_comm(comm)
+    result = error = None
+    if comm.rank == 0:
+        try:
+            result = fnc(*args, **kwargs)
+        except Exception as err:  # pylint: disable=broad-except
+            error = err
+    if comm.size > 1:
+        result, error = comm.bcast((result, error), root=0)
+    if error is not None:
+        raise error
+    loader = getattr(result, "loader", None)
+    if loader is not None:
+        loader.kwargs["comm"] = comm
+    return result
+
+
+def collective(fnc):
+    """
+    Decorator adding the comm option to a head function: the header is read
+    by rank 0 and broadcast to the communicator (see on_root).
+    """
+
+    @wraps(fnc)
+    def wrapped(*args, comm=None, **kwargs):
+        if comm is None:
+            return fnc(*args, **kwargs)
+        return on_root(comm, fnc, *args, **kwargs)
+
+    return wrapped
+
+
 def _tempdir_MPI(comm=None):
     """
     Creates a temporary directory to be used during testing
@@ -87,9 +130,10 @@ class MpiIO:
 
         return MPI
 
-    def __init__(self, comm, filename, mode="r"):
+    def __init__(self, comm, filename, mode="r", nonblocking=False, decomposition=None):
 
-        self.decomposition = Decomposition(comm=comm)
+        # decomposition: a Decomposition or a dictionary of its options
+        self.decomposition = get_decomposition(comm, decomposition)
 
         self.comm = self.decomposition.comm
         self.rank = self.decomposition.rank
@@ -97,15 +141,41 @@ class MpiIO:
         self.filename = filename
         self.handler = None
         self.mode = mode
+        self.nonblocking = nonblocking
+        self.requests = []
+        self._buffers = []
 
     def __enter__(self):
         self._file_open(mode=self.mode)
         return self
 
     def __exit__(self, exc_type, exc_val, traceback):
-        self._file_close()
+        # with pending non-blocking writes the file is closed by wait
+        if not self.requests or exc_type is not None:
+            self.wait()
+
+    def test(self):
+        "Whether the non-blocking writes have completed (local operation)"
+        return self.MPI.Request.Testall(self.requests)
 
-    def load(self, domain, dtype, order, header_offset):
+    def wait(self):
+        """
+        Waits for the non-blocking writes to complete and closes the file.
+        Collective operation.
+        """
+        if self.requests:
+            nbytes = sum(buf.nbytes for buf in self._buffers)
+            with metrics.measure("mpi.write", path=self.filename, nbytes=nbytes):
+                self.MPI.Request.Waitall(self.requests)
+        self.requests = []
+        self._buffers = []
+        if self.handler is not None:
+            self._file_close()
+            self.handler = None
+
+    def load(
+        self, domain, dtype, order, header_offset, out=None, halo=None, periodic=False
+    ):
         """
         Reads the local domain from a file and loads it in a numpy array
 
@@ -121,23 +191,82 @@ class MpiIO:
         header_offset: int
             offset in bytes to where the
             data start in the file.
+        out: numpy array
+            if given, the local data is read directly into it.
+            It must have the local shape, dtype and order.
+        halo: int, list
+            If given, the local data is padded with halo layers of the given
+            widths read from the neighbouring domains (see Decomposition.halo_indices).
+            An int applies to the decomposed axes, a list to the leading axes.
+        periodic: bool, list
+            Whether the halo wraps around the domain (per axis). Otherwise
+            the layers outside the domain are zero.
 
         Returns:
         --------
         local_array : numpy array
             Local data to the process
         """
+        # pylint: disable=too-many-arguments
 
         # skip header
         pos = self.handler.Get_position() + header_offset
 
+        if halo is not None:
+            return self._load_halo(domain, dtype, order, pos, out, halo, periodic)
+
         self._set_view(domain, dtype, order, pos)
 
         # allocate space for local_array to hold data read from file
         _, subsizes, _ = self.decomposition.decompose(domain)
-        local_array = numpy.empty(subsizes, dtype=dtype, order=order.upper())
+        if out is not None:
+            local_array = check_out(out, subsizes, dtype, order.upper())
+        else:
+            local_array = numpy.empty(subsizes, dtype=dtype, order=order.upper())
+
+        with metrics.measure("mpi.read", path=self.filename, nbytes=local_array.nbytes):
+            self.handler.Read_all(self._array_view(local_array))
+
+        return local_array
 
-        self.handler.Read_all(self._array_view(local_array))
+    def _load_halo(self, domain, dtype, order, pos, out, halo, periodic):
+        """
+        Reads the local domain padded with the halo in a single collective
+        read: the file view selects the elements of the padded domain
+        (overlapping the neighbouring ones) and a memory datatype places them.
+        The layers repeated in the padded domain are then copied locally.
+        """
+        # pylint: disable=too-many-arguments
+        if order.upper() != "C":
+            raise NotImplementedError("Currently noy supporting FORTRAN ordering")
+        etype = self._dtype_to_mpi(dtype)
+
+        with metrics.measure("mpi.view", path=self.filename):
+            shape, filetype, memtype, sources = self.decomposition.halo_types(
+                domain, halo, periodic, etype
+            )
+            self.handler.Set_view(pos, etype, filetype, datarep="native")
+
+        # the layers outside a non-periodic domain are zero
+        if out is not None:
+            local_array = check_out(out, shape, dtype, "C")
+            local_array.fill(0)
+        else:
+            local_array = numpy.zeros(shape, dtype=dtype)
+
+        try:
+            with metrics.measure(
+                "mpi.read", path=self.filename, nbytes=local_array.nbytes
+            ):
+                self.handler.Read_all([self._array_view(local_array), 1, memtype])
+        finally:
+            if not plans.enabled:
+                filetype.Free()
+                memtype.Free()
+
+        for axis, source in enumerate(sources):
+            if source is not None:
+                local_array[...] = local_array.take(source, axis=axis)
 
         return local_array
 
@@ -149,12 +278,18 @@ class MpiIO:
         ----------
         local_array : numpy array
             Local data to the process
+
+        Returns:
+        --------
+        self if nonblocking, i.e. a handle for waiting the write (see wait).
+        The array must not be modified until the write has completed.
         """
-        if not numpy.isfortran(array):
-            # ensure data are contiguous
-            array = numpy.ascontiguousarray(array)
-        else:
+        if numpy.isfortran(array):
             raise NotImplementedError("Currently noy supporting FORTRAN ordering")
+        # ensure data are contiguous, counting the copy if any
+        contiguous = numpy.ascontiguousarray(array)
+        copies = 0 if numpy.may_share_memory(contiguous, array) else 1
+        array = contiguous
 
         if offset is None:
             if header:
@@ -168,7 +303,16 @@ class MpiIO:
         self._set_view(array.shape, array.dtype, "C", offset, compose=True)
 
         # collectively write the array to file
-        self.handler.Write_all(self._array_view(array))
+        if self.nonblocking:
+            self.requests.append(self.handler.Iwrite_all(self._array_view(array)))
+            self._buffers.append(array)
+            return self
+
+        with metrics.measure(
+            "mpi.write", path=self.filename, nbytes=array.nbytes, copies=copies
+        ):
+            self.handler.Write_all(self._array_view(array))
+        return None
 
     def _file_open(self, mode=None):
         if mode is None:
@@ -198,11 +342,17 @@ class MpiIO:
         else:
             raise NotImplementedError("Currently noy supporting FORTRAN ordering")
 
-        # use fixed data-type
-        filetype = etype.Create_subarray(sizes, subsizes, starts, order=mpi_order)
-        filetype.Commit()
-
-        self.handler.Set_view(pos, etype, filetype, datarep="native")
+        with metrics.measure("mpi.view", path=self.filename):
+            # use fixed data-type, committed once per plan (see plans)
+            if self.decomposition.cyclic is not None:
+                filetype = self.decomposition.darray(sizes, etype, mpi_order)
+            else:
+                filetype = self.decomposition.filetype(
+                    sizes, subsizes, starts, etype, mpi_order
+                )
+            self.handler.Set_view(pos, etype, filetype, datarep="native")
+            if not plans.enabled:
+                filetype.Free()
 
     def _to_mpi_file_mode(self, mode):
         MPI = self.MPI
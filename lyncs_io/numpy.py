@@ -13,7 +13,9 @@ __all__ = [
     "savez",
 ]
 
+import struct
 from io import UnsupportedOperation, BytesIO
+from zipfile import ZipFile, ZIP_STORED, ZIP_DEFLATED
 from functools import wraps
 import numpy
 from numpy.lib.npyio import NpzFile
@@ -22,21 +24,36 @@ from numpy.lib.format import (
     _check_version,
     _read_array_header,
     _write_array_header,
+    write_array,
 )
 from lyncs_utils import is_keyword, open_file
 from .archive import split_filename, Data, Loader, Archive
 from .convert import to_array
 from .header import Header
-from .utils import swap, is_dask_array
-from .mpi_io import MpiIO, check_comm
+from .utils import swap, is_dask_array, read_array, map_array, header_cache
+from .mpi_io import MpiIO, check_comm, collective
 from .dask_io import DaskIO
+from .lazy import lazy_array
+from . import metrics
 
 loadtxt = numpy.loadtxt
 savetxt = swap(numpy.savetxt)
 
 
 @wraps(numpy.load)
-def load(filename, chunks=None, comm=None, **kwargs):
+def load(
+    filename,
+    chunks=None,
+    comm=None,
+    cancel=None,
+    mmap=False,
+    out=None,
+    lazy=False,
+    decomposition=None,
+    halo=None,
+    periodic=False,
+    **kwargs,
+):
     """
     High level interface function for numpy load.
     Loads a numpy array from file either in serial or parallel.
@@ -50,7 +67,27 @@ def load(filename, chunks=None, comm=None, **kwargs):
         How to divide the data domain. This enables the Dask API.
     comm: MPI.Cartcomm
         A valid cartesian MPI Communicator.
-
+    cancel: threading.Event
+        If given, the data is read in chunks and the reading is
+        interrupted once the event is set.
+    mmap: bool
+        If True, a read-only memory map of the data is returned.
+    out: numpy.ndarray
+        If given, the (local) data is read directly into out,
+        that must have the correct shape, dtype and order.
+    lazy: bool
+        If True, a LazyArray is returned that reads from file only
+        the slices accessed.
+    decomposition: Decomposition, dict
+        The decomposition of the data over comm or a dictionary of its
+        options (axes, blocks, partition, align). See Decomposition.
+    halo: int, list
+        If given (with comm), the local array is padded with halo layers of
+        the given widths (per axis, or an int for the decomposed axes) read
+        from the neighbouring domains in the same collective read.
+    periodic: bool, list
+        Whether the halo wraps around the global domain (per axis).
+        Otherwise the layers outside the domain are zero.
 
     Returns:
     --------
@@ -61,6 +98,22 @@ def load(filename, chunks=None, comm=None, **kwargs):
     if comm is not None and chunks is not None:
         raise ValueError("chunks and comm parameters cannot be both set")
 
+    if halo is not None and comm is None:
+        raise ValueError("halo requires comm")
+
+    if lazy:
+        metadata = head(filename)
+        if metadata["dtype"].hasobject:
+            raise ValueError("lazy is not supported for object arrays")
+        return lazy_array(filename, metadata)
+
+    if out is not None and (chunks is not None or mmap):
+        raise ValueError("out cannot be used together with chunks or mmap")
+
+    if out is not None and kwargs:
+        # the options of numpy.load are not supported by the direct read
+        raise ValueError(f"out cannot be used together with {', '.join(kwargs)}")
+
     if chunks is not None:
 
         metadata = head(filename)
@@ -77,20 +130,42 @@ def load(filename, chunks=None, comm=None, **kwargs):
     if comm is not None:
         check_comm(comm)
 
-        metadata = head(filename)
-        with MpiIO(comm, filename, mode="r") as mpiio:
+        metadata = head(filename, comm=comm)
+        with MpiIO(comm, filename, mode="r", decomposition=decomposition) as mpiio:
             return mpiio.load(
                 metadata["shape"],
                 metadata["dtype"],
                 "F" if metadata["fortran_order"] else "C",
                 metadata["_offset"],
+                out=out,
+                halo=halo,
+                periodic=periodic,
+            )
+
+    if mmap:
+        kwargs.setdefault("mmap_mode", "r")
+
+    if not (mmap or kwargs):
+        # plain arrays are read with parallel positioned reads
+        metadata = head(filename)
+        if not metadata["dtype"].hasobject:
+            return read_array(
+                filename,
+                metadata["shape"],
+                metadata["dtype"],
+                metadata["_offset"],
+                order="F" if metadata["fortran_order"] else "C",
+                cancel=cancel,
+                out=out,
             )
+        if out is not None:
+            raise ValueError("out is not supported for object arrays")
 
     return numpy.load(filename, **kwargs)
 
 
 @wraps(numpy.save)
-def save(array, filename, comm=None, **kwargs):
+def save(array, filename, comm=None, nonblocking=False, decomposition=None, **kwargs):
     """
     High level interface function for numpy save.
     Writes a numpy array to file either in serial or parallel.
@@ -104,8 +179,13 @@ def save(array, filename, comm=None, **kwargs):
         Filename of the numpy array to be loaded.
     comm: MPI.Cartcomm
         A valid cartesian MPI Communicator.
-
+    nonblocking: bool
+        If True (and comm is given), the write is non-blocking and
+        the MpiIO handle is returned. See MpiIO.wait.
+    decomposition: Decomposition, dict
+        The decomposition of the data over comm. See load.
     """
+    # pylint: disable=too-many-arguments
     array, attrs = to_array(array)
 
     if is_dask_array(array):
@@ -116,7 +196,13 @@ def save(array, filename, comm=None, **kwargs):
     if comm is not None:
         check_comm(comm)
 
-        with MpiIO(comm, filename, mode="w") as mpiio:
+        with MpiIO(
+            comm,
+            filename,
+            mode="w",
+            nonblocking=nonblocking,
+            decomposition=decomposition,
+        ) as mpiio:
             global_shape, _, _ = mpiio.decomposition.compose(array.shape)
             attrs["shape"] = global_shape
             header = _get_header_bytes(attrs)
@@ -156,7 +242,7 @@ def _get_head(npy):
     )
 
 
-head = open_file(_get_head)
+head = collective(header_cache(metrics.timed("header", "numpy")(open_file(_get_head))))
 
 
 def _get_headz(npz, key):
@@ -166,8 +252,12 @@ def _get_headz(npz, key):
         return _get_head(npy)
 
 
-def headz(filename, key=None, **kwargs):
-    "Numpy-z head function"
+def headz(filename, key=None, all_data=False, **kwargs):
+    """
+    Numpy-z head function.
+    The members are not nested, i.e. all of them are returned (all_data).
+    """
+    # pylint: disable=unused-argument
 
     filename, key = split_filename(filename, key)
 
@@ -178,22 +268,57 @@ def headz(filename, key=None, **kwargs):
         return Archive({key: _get_headz(npz, key) for key in npz})
 
 
-def loadz(filename, key=None, **kwargs):
-    "Numpy-z load function"
+def _data_offset(filename, info):
+    "Returns the position of the data of a member of a zip file"
+    with open(filename, "rb") as fptr:
+        fptr.seek(info.header_offset)
+        local_header = fptr.read(30)
+    # the local header is followed by the filename and the extra field
+    name_length, extra_length = struct.unpack("<HH", local_header[26:30])
+    return info.header_offset + 30 + name_length + extra_length
+
+
+def _mapz(npz, filename, key):
+    "Returns a memory map of a member of a numpy-z file"
+    info = npz.zip.getinfo(key + ".npy")
+    if info.compress_type != ZIP_STORED:
+        raise ValueError("Memory map is supported only for not compressed members")
+    header = _get_headz(npz, key)
+    if header["dtype"].hasobject:
+        raise ValueError("Memory map is not supported for object arrays")
+    return map_array(
+        filename,
+        header["shape"],
+        header["dtype"],
+        _data_offset(filename, info) + header["_offset"],
+        order="F" if header["fortran_order"] else "C",
+    )
+
+
+def loadz(filename, key=None, mmap=False, **kwargs):
+    """
+    Numpy-z load function.
+    If mmap, memory maps of the (not compressed) members are returned.
+    """
 
     filename, key = split_filename(filename, key)
 
-    loader = Loader(loadz, filename, kwargs=kwargs)
+    loader = Loader(loadz, filename, kwargs={"mmap": mmap, **kwargs})
 
     with numpy.load(filename, **kwargs) as npz:
         assert isinstance(npz, NpzFile), "Broken support for Numpy-z"
+        if key and mmap:
+            return _mapz(npz, filename, key.lstrip("/"))
         if key:
             return npz[key.lstrip("/")]
         return Archive({key: Data(_get_headz(npz, key)) for key in npz}, loader=loader)
 
 
-def savez(data, filename, key=None, compressed=False, **kwargs):
-    "Numpy-z save function"
+def savez(data, filename, key=None, compressed=False, append=False, **kwargs):
+    """
+    Numpy-z save function.
+    If append, the key is added to the existing file instead of overwriting it.
+    """
 
     # TODO: numpy overwrites files. Support to numpy-z should be done through zip format
     filename, key = split_filename(filename, key)
@@ -203,5 +328,15 @@ def savez(data, filename, key=None, compressed=False, **kwargs):
     if key:
         if not is_keyword(key):
             raise ValueError("Numpy-z supports only keys that are a valid keyword")
+        if append:
+            return _appendz(data, filename, key, compressed, **kwargs)
         return _savez(filename, **{key: data}, **kwargs)
     return _savez(filename, data, **kwargs)
+
+
+def _appendz(data, filename, key, compressed=False, allow_pickle=True):
+    "Adds a member to a numpy-z file (as done by numpy.savez)"
+    compression = ZIP_DEFLATED if compressed else ZIP_STORED
+    with ZipFile(filename, "a", compression=compression, allowZip64=True) as zfile:
+        with zfile.open(key + ".npy", "w", force_zip64=True) as fptr:
+            write_array(fptr, numpy.asanyarray(data), allow_pickle=allow_pickle)
@@ -1,5 +1,6 @@
 "Functions for OpenQcd file format"
 
+import os
 from array import array
 from lyncs_utils import (
     prod,
@@ -8,12 +9,19 @@ from lyncs_utils import (
     write_struct,
     file_size,
 )
+from lyncs_utils.io import FileLike
 import numpy
 from .convert import from_array, to_array
 from .lib import lib, with_lib as with_openqcd
-from .utils import is_dask_array
+from .utils import is_dask_array, read_array, check_out, header_cache
+from .lazy import LazyArray, RawReader
+from .mpi_io import collective
+from . import metrics
 
 
+@collective
+@header_cache
+@metrics.timed("header", "openqcd")
 @open_file
 def head(_fp):
     "Reads the header of a configuration"
@@ -26,7 +34,78 @@ def head(_fp):
     }
 
 
-def load(filename, chunks=None, comm=None, **kwargs):
+def reorder_slices(data, start, dims):
+    """
+    Reorders time slices from the openqcd order (implemented with numpy).
+    data contains the links of the odd sites in the time slices from start
+    to start + n included (periodically), the n reordered slices are returned.
+    """
+    _, nx, ny, nz = dims
+    nt = len(data) - 1
+    data = data.reshape(nt + 1, nx, ny, nz // 2, 4, 2, 3, 3)
+
+    # forward and backward links of the odd sites, that are stored
+    # once per pair of sites along z
+    links = numpy.empty((nt + 1, nx, ny, nz, 4, 2, 3, 3), dtype=data.dtype)
+    tpos, xpos, ypos = numpy.ogrid[start : start + nt + 1, :nx, :ny]
+    for parity in (0, 1):
+        odd = (tpos + xpos + ypos + parity) % 2 == 1
+        links[:, :, :, parity::2][odd] = data[odd]
+
+    out = numpy.empty((nt, nx, ny, nz, 4, 3, 3), dtype=data.dtype)
+    tpos, xpos, ypos, zpos = numpy.ogrid[start : start + nt, :nx, :ny, :nz]
+    odd = (tpos + xpos + ypos + zpos) % 2 == 1
+    even = ~odd
+    out[odd] = links[:nt][odd][:, :, 0]
+    for mu in range(4):
+        # the links of the even sites are the backward links of x + mu
+        backward = numpy.roll(links[..., mu, 1, :, :], -1, axis=mu)[:nt]
+        out[..., mu, :, :][even] = backward[even]
+    return out
+
+
+class Reader:
+    """
+    Reads boxes of a configuration (see LazyArray). The time slices of the box
+    and the following one are read and reordered.
+    """
+
+    # the boxes should contain whole time slices and the reordering
+    # needs three copies of the data (see reorder_slices)
+    slab_axes = 1
+    copies = 3
+
+    def __init__(self, filename, header):
+        self.filename = filename
+        self.header = header
+        self.dims = header["shape"][:4]
+        self.raw = RawReader(
+            filename,
+            (self.dims[0], prod(self.dims[1:]) * 4 * 9),
+            header["dtype"],
+            header["_offset"],
+        )
+
+    def _read(self, start, stop):
+        return self.raw((slice(start, stop, 1), slice(0, self.raw.shape[1], 1)))
+
+    def __call__(self, box):
+        shape = tuple(len(range(sl.start, sl.stop, sl.step)) for sl in box)
+        if not prod(shape):
+            return numpy.empty(shape, dtype=self.header["dtype"])
+
+        start, stop = box[0].start, box[0].stop
+        if stop < self.dims[0]:
+            data = self._read(start, stop + 1)
+        else:
+            data = numpy.concatenate([self._read(start, stop), self._read(0, 1)])
+
+        with metrics.measure("convert", "openqcd", self.filename, data.nbytes, 3):
+            data = reorder_slices(data, start, self.dims)
+        return data[(slice(None, None, box[0].step),) + box[1:]]
+
+
+def load(filename, chunks=None, comm=None, cancel=None, out=None, lazy=False, **kwargs):
     """
     Load function for OpenQCD file format.
     Loads a numpy array from file either in serial or parallel.
@@ -40,6 +119,15 @@ def load(filename, chunks=None, comm=None, **kwargs):
         How to divide the data domain. This enables the Dask API.
     comm: MPI.Cartcomm
         A valid cartesian MPI Communicator.
+    cancel: threading.Event
+        If given, the data is read in chunks and the reading is
+        interrupted once the event is set.
+    out: numpy.ndarray
+        If given, the reordered data is written into out,
+        that must have the correct shape and dtype.
+    lazy: bool
+        If True, a LazyArray is returned that reads from file and reorders
+        only the time slices accessed. It does not require lyncs_cppyy.
     kwargs: dict
         Additional parameters can be passed to override metadata.
         E.g. shape, dtype, etc.
@@ -52,11 +140,17 @@ def load(filename, chunks=None, comm=None, **kwargs):
     if comm is not None and chunks is not None:
         raise ValueError("chunks and comm parameters cannot be both set")
 
-    metadata = head(filename)
+    metadata = head(filename, comm=comm)
     shape = metadata["shape"]
     dtype = metadata["dtype"]
     offset = metadata["_offset"]
 
+    if lazy:
+        if isinstance(filename, FileLike):
+            raise ValueError("Lazy arrays require a filename, not a file-like object")
+        reader = Reader(os.path.abspath(filename), metadata)
+        return LazyArray(shape, dtype, reader, attrs=metadata)
+
     if chunks is not None:
         raise NotImplementedError("Missing reordering")
         daskio = DaskIO(filename)
@@ -72,16 +166,18 @@ def load(filename, chunks=None, comm=None, **kwargs):
         with MpiIO(comm, filename, mode="r") as mpiio:
             return from_array(mpiio.load(shape, dtype, order, offset), attrs=metadata)
 
+    if out is not None:
+        check_out(out, shape, dtype)
+
     def reorder(arr):
-        out = numpy.empty_like(arr)
-        lib.from_openqcd(out, arr, 4, array("i", shape[:4]))
-        return out
+        res = numpy.empty_like(arr) if out is None else out
+        with metrics.measure("convert", "openqcd", filename, arr.nbytes, copies=1):
+            lib.from_openqcd(res, arr, 4, array("i", shape[:4]))
+        return res
 
     return reorder(
         from_array(
-            numpy.fromfile(
-                filename, dtype=dtype, count=prod(shape), offset=offset
-            ).reshape(shape),
+            read_array(filename, shape, dtype, offset, cancel=cancel),
             attrs=metadata,
         )
     )
@@ -0,0 +1,215 @@
+"""
+Thread-parallel positioned reads for serial loads.
+
+The bytes to read are split into ranges aligned in the file that are read
+concurrently with os.preadv on a pool of threads directly into the destination
+buffer. The reads release the GIL, such that several requests are outstanding
+at the same time, as needed for saturating NVMe drives and parallel file systems.
+Used by read_array (npy, lime, openqcd and members of not compressed tarballs)
+and by the lazy arrays.
+
+The number of threads and the size of the ranges are chosen automatically
+(see default_threads and default_range_size). They can be fixed with
+configure_reads or tuned on a given file with autotune_reads.
+"""
+
+__all__ = [
+    "configure_reads",
+    "autotune_reads",
+]
+
+import os
+from concurrent.futures import ThreadPoolExecutor, CancelledError
+from time import perf_counter
+import numpy
+
+# Ranges start at multiples of ALIGNMENT in the file
+ALIGNMENT = 2**12
+# Reads smaller than MIN_PARALLEL bytes are done by the calling thread
+MIN_PARALLEL = 2**22
+# Bounds of the automatic range size
+MIN_RANGE = 2**20
+MAX_RANGE = 2**26
+# Maximum automatic number of threads
+MAX_THREADS = 16
+
+THREADS = None
+RANGE_SIZE = None
+
+
+def configure_reads(threads=None, range_size=None):
+    """
+    Sets the number of threads and the size in bytes of the ranges of the
+    parallel reads. None restores the automatic choice. threads=1 disables
+    the parallel reads. Returns the previous values.
+    """
+    # pylint: disable=global-statement
+    global THREADS, RANGE_SIZE
+    if threads is not None and threads < 1:
+        raise ValueError("threads must be a positive integer")
+    if range_size is not None and (range_size < 1 or range_size % ALIGNMENT):
+        raise ValueError(f"range_size must be a positive multiple of {ALIGNMENT}")
+    previous = THREADS, RANGE_SIZE
+    THREADS, RANGE_SIZE = threads, range_size
+    return previous
+
+
+def default_threads():
+    "Number of threads of the parallel reads"
+    if THREADS:
+        return THREADS
+    if not hasattr(os, "preadv"):
+        return 1
+    return min(MAX_THREADS, os.cpu_count() or 1)
+
+
+def default_range_size(nbytes, threads):
+    "Size of the ranges: about four per thread for balancing the load"
+    if RANGE_SIZE:
+        return RANGE_SIZE
+    size = min(max(nbytes // (4 * threads), MIN_RANGE), MAX_RANGE)
+    return -(-size // ALIGNMENT) * ALIGNMENT
+
+
+def _preadv(fd, view, offset):
+    "Reads into view at the given offset of the file descriptor"
+    while len(view):
+        if hasattr(os, "preadv"):
+            read = os.preadv(fd, [view], offset)
+        else:
+            os.lseek(fd, offset, os.SEEK_SET)
+            data = os.read(fd, len(view))
+            read = len(data)
+            view[:read] = data
+        if not read:
+            raise ValueError("Unexpected end of file")
+        view = view[read:]
+        offset += read
+
+
+def split_ranges(runs, range_size):
+    """
+    Splits the runs (offset, nbytes) of the file, read consecutively into the
+    buffer, into tasks of about range_size bytes. A task is a list of
+    (offset, position in the buffer, nbytes) that do not cross the multiples
+    of range_size in the file. Small runs are grouped in the same task.
+    """
+    tasks, task, size, pos = [], [], 0, 0
+    for offset, nbytes in runs:
+        end = offset + nbytes
+        while offset < end:
+            stop = min((offset // range_size + 1) * range_size, end)
+            task.append((offset, pos, stop - offset))
+            size += stop - offset
+            pos += stop - offset
+            offset = stop
+            if size >= range_size:
+                tasks.append(task)
+                task, size = [], 0
+    if task:
+        tasks.append(task)
+    return tasks
+
+
+def pread_runs(fd, view, runs, threads=None, range_size=None, cancel=None):
+    """
+    Reads the runs (offset, nbytes) of the file descriptor consecutively
+    into view (a writable buffer of bytes), in parallel if large enough.
+
+    Parameters
+    ----------
+    fd: int
+        File descriptor opened for reading.
+    view: memoryview
+        Destination buffer of bytes. Its length must be the total of the runs.
+    runs: list
+        Pairs of (offset, nbytes) in the file.
+    threads: int
+        Number of threads. By default see default_threads.
+    range_size: int
+        Bytes read per task. By default see default_range_size.
+    cancel: threading.Event
+        If given, the reading is interrupted, raising CancelledError,
+        once the event is set.
+    """
+    # pylint: disable=too-many-arguments
+    view = memoryview(view).cast("B")
+    threads = threads or default_threads()
+    if threads > 1 and len(view) >= MIN_PARALLEL:
+        range_size = range_size or default_range_size(len(view), threads)
+    else:
+        threads = 1
+        range_size = range_size or max(len(view), 1)
+        if cancel is not None:
+            range_size = min(range_size, MIN_RANGE)
+
+    def read(task):
+        for offset, pos, nbytes in task:
+            if cancel is not None and cancel.is_set():
+                raise CancelledError("Reading has been cancelled")
+            _preadv(fd, view[pos : pos + nbytes], offset)
+
+    tasks = split_ranges(runs, range_size)
+    if threads == 1 or len(tasks) == 1:
+        for task in tasks:
+            read(task)
+        return
+
+    with ThreadPoolExecutor(max_workers=min(threads, len(tasks))) as pool:
+        futures = [pool.submit(read, task) for task in tasks]
+        try:
+            for future in futures:
+                future.result()
+        except BaseException:
+            for future in futures:
+                future.cancel()
+            raise
+
+
+def pread_into(filename, view, offset=0, **kwargs):
+    "Reads len(view) bytes of the file from offset into view. See pread_runs."
+    view = memoryview(view).cast("B")
+    fd = os.open(filename, os.O_RDONLY | getattr(os, "O_BINARY", 0))
+    try:
+        pread_runs(fd, view, [(offset, len(view))], **kwargs)
+    finally:
+        os.close(fd)
+
+
+def autotune_reads(filename, offset=0, nbytes=None, threads=None, apply=True):
+    """
+    Measures the throughput of the parallel reads of the file for several
+    numbers of threads and (if apply) configures the fastest one.
+    Meaningful on files (of at least a few hundreds of MB) not in the page cache.
+
+    Parameters
+    ----------
+    filename: str
+        The file to read.
+    offset, nbytes: int
+        The bytes read. By default the file from offset, at most 1 GB.
+    threads: list
+        The numbers of threads tried. By default powers of two up to
+        four times the number of CPUs.
+
+    Returns
+    -------
+    throughput: dict
+        GB/s per number of threads.
+    """
+    size = os.path.getsize(filename) - offset
+    nbytes = min(size, 2**30) if nbytes is None else min(nbytes, size)
+    if threads is None:
+        limit = 4 * (os.cpu_count() or 1)
+        threads = [2**i for i in range(limit.bit_length()) if 2**i <= limit]
+
+    buf = numpy.empty(nbytes, dtype="u1")
+    throughput = {}
+    for num in threads:
+        start = perf_counter()
+        pread_into(filename, buf, offset, threads=num)
+        throughput[num] = nbytes / max(perf_counter() - start, 1e-9) / 1e9
+
+    if apply:
+        configure_reads(threads=max(throughput, key=throughput.get))
+    return throughput
@@ -0,0 +1,340 @@
+"""
+Streaming of files in slabs with bounded memory: conversion between formats
+(convert_file) and iteration over the slabs of an array (iter_load).
+
+The data is moved in slabs, i.e. boxes that are contiguous in C order, such
+that the memory used stays below a given cap whatever the size of the file.
+The slabs are read with positioned reads from the offset of the data (npy,
+lime and members of not compressed tarballs), as hyperslabs (HDF5) or as time
+slices that are reordered (openqcd). They are written at their offset after
+the header (npy, lime), as hyperslabs (HDF5) or in order as a member of a
+tarball. Optionally, the next slabs are read and converted on a pool of
+threads while writing.
+"""
+
+__all__ = [
+    "convert_file",
+    "iter_load",
+]
+
+import os
+import tarfile
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from io import RawIOBase
+from itertools import chain, product
+from time import time
+import numpy
+from numpy.lib.format import dtype_to_descr
+from lyncs_utils import prod
+from .archive import split_filename
+from .base import load
+from .convert import get_attrs
+from .formats import formats
+from .lazy import LazyArray
+from .utils import find_file
+from . import metrics
+
+# Default maximum number of bytes of data held in memory
+MAX_MEMORY = 2**28
+
+sources = ["numpy", "lime", "openqcd", "tar", "hdf5"]
+destinations = ["numpy", "lime", "tar", "hdf5"]
+
+
+def slabs(shape, itemsize, max_nbytes, axes=None):
+    """
+    Yields the boxes (tuples of slices) of at most max_nbytes covering in C order
+    an array of given shape. The boxes are split only along the first axes.
+    """
+    shape = tuple(shape)
+    if not prod(shape):
+        yield tuple(slice(0, size, 1) for size in shape)
+        return
+
+    axes = len(shape) if axes is None else min(axes, len(shape))
+    for axis in range(axes):
+        row = itemsize * prod(shape[axis + 1 :])
+        if row <= max_nbytes:
+            break
+    else:
+        raise ValueError(f"The slabs need at least {row} bytes, given {max_nbytes}")
+    rows = min(max_nbytes // row, shape[axis])
+
+    tail = tuple(slice(0, size, 1) for size in shape[axis + 1 :])
+    for idx in product(*map(range, shape[:axis])):
+        head = tuple(slice(i, i + 1, 1) for i in idx)
+        for start in range(0, shape[axis], rows):
+            stop = min(start + rows, shape[axis])
+            yield head + (slice(start, stop, 1),) + tail
+
+
+def box_offset(box, shape):
+    "Position in elements of the first element of the box in C order"
+    strides = [prod(shape[i + 1 :]) for i in range(len(shape))]
+    return sum(sl.start * stride for sl, stride in zip(box, strides))
+
+
+def _pwrite(fptr, view, offset):
+    "Writes view at the given offset of the file"
+    while len(view):
+        written = os.pwrite(fptr.fileno(), view, offset)
+        view = view[written:]
+        offset += written
+
+
+def _bytes(data):
+    return memoryview(data).cast("B")
+
+
+def _read_slabs(boxes, read, workers=0):
+    """
+    Yields (box, read(box)) in the order of boxes. If workers > 0,
+    up to workers slabs are read in advance on a pool of threads.
+    """
+
+    def task(box):
+        return box, read(box)
+
+    if not workers:
+        for box in boxes:
+            yield task(box)
+        return
+
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        pending = deque()
+        for box in boxes:
+            pending.append(pool.submit(task, box))
+            if len(pending) > workers:
+                yield pending.popleft().result()
+        while pending:
+            yield pending.popleft().result()
+
+
+class _Stream(RawIOBase):
+    "Read-only stream of the given chunks of bytes"
+
+    def __init__(self, chunks):
+        super().__init__()
+        self.chunks = iter(chunks)
+        self.buffer = memoryview(b"")
+
+    def readable(self):
+        return True
+
+    def readinto(self, out):
+        "Fills out unless the stream ends"
+        pos = 0
+        while pos < len(out):
+            if not len(self.buffer):
+                try:
+                    self.buffer = _bytes(next(self.chunks))
+                except StopIteration:
+                    break
+            size = min(len(out) - pos, len(self.buffer))
+            out[pos : pos + size] = self.buffer[:size]
+            self.buffer = self.buffer[size:]
+            pos += size
+        return pos
+
+
+def _header_bytes(fmt, attrs):
+    "Returns the header written before the data"
+    if fmt.name.lower() == "numpy":
+        # pylint: disable=protected-access
+        return fmt.backend._get_header_bytes(attrs)
+    if fmt.name.lower() == "lime":
+        return fmt.backend.get_header_bytes(attrs)
+    raise ValueError(f"Streaming to {fmt} is not supported")
+
+
+def _write_raw(filename, header, nbytes, shape, chunks):
+    "Writes the header and the slabs at their offset"
+    itemsize = nbytes // max(prod(shape), 1)
+    with open(filename, "wb", buffering=0) as fptr:
+        fptr.write(header)
+        fptr.truncate(len(header) + nbytes)
+        for box, data in chunks:
+            offset = len(header) + box_offset(box, shape) * itemsize
+            _pwrite(fptr, _bytes(data), offset)
+
+
+def _write_member(filename, key, header, nbytes, chunks):
+    "Writes the header and the slabs (in order) as a member of the tarball"
+    # pylint: disable=protected-access
+    tar = formats["tar"].backend
+    info = tarfile.TarInfo(name=key)
+    info.size = len(header) + nbytes
+    info.mtime = time()
+    stream = _Stream(chain([header], (data for _, data in chunks)))
+    with tar._open_for_saving(filename, tar._get_mode(filename)) as tfile:
+        tfile.copybufsize = 2**20
+        tfile.addfile(info, stream)
+
+
+def _write_hdf5(filename, key, shape, dtype, attrs, chunks):
+    "Creates the dataset and writes the slabs as hyperslabs"
+    hdf5 = formats["hdf5"].backend
+    with hdf5.File(filename, "a") as h5f:
+        dset = hdf5.create_dataset(h5f, key or "/", shape, dtype, attrs)
+        for box, data in chunks:
+            dset[box] = data
+
+
+def _open_source(src, format=None):
+    "Returns the format and a LazyArray of the data in src"
+    # pylint: disable=redefined-builtin
+    src = find_file(src)
+    fmt = formats.get_format(format, filename=src)
+    if fmt.name.lower() not in sources:
+        raise ValueError(f"Streaming from {fmt} is not supported")
+    source = load(src, format=fmt, lazy=True)
+    if not isinstance(source, LazyArray):
+        raise ValueError(f"{src} does not contain a single array")
+    return fmt, source
+
+
+def iter_load(filename, axis=0, block=1, format=None, readahead=1):
+    """
+    Yields consecutive slabs of the array in the file along the given axis.
+    While the current slab is processed, the next ones are read on a
+    background thread, such that at most readahead + 2 slabs are in memory.
+
+    Parameters
+    ----------
+    filename: str
+        The file to read. It can be a member of an archive (e.g. file.h5/key or
+        a member of a not compressed tarball). Supported formats: npy, lime,
+        openqcd (reordered time slices), tar and HDF5.
+    axis: int
+        The axis along which the array is sliced.
+    block: int
+        Number of indices of the axis per slab. The last slab can be smaller.
+    format: str, Format
+        Format of the file. If not given, it is deduced from the file.
+    readahead: int
+        Number of slabs read in advance. If zero, the slabs are read on demand.
+    """
+    # pylint: disable=redefined-builtin
+    fmt, source = _open_source(filename, format)
+    if not source.shape:
+        raise ValueError("Cannot iterate over a 0-d array")
+    axis = range(source.ndim)[axis]
+    if block < 1:
+        raise ValueError("block must be a positive integer")
+
+    size = source.shape[axis]
+    boxes = (
+        (slice(None),) * axis + (slice(start, min(start + block, size)),)
+        for start in range(0, size, block)
+    )
+
+    def read(box):
+        with metrics.measure("iter_load", fmt.name.lower(), filename) as record:
+            data = source[box]
+            record.nbytes = data.nbytes
+        return data
+
+    return (data for _, data in _read_slabs(boxes, read, workers=readahead))
+
+
+def convert_file(
+    src,
+    dst,
+    format=None,
+    src_format=None,
+    max_memory=MAX_MEMORY,
+    workers=0,
+    metadata=None,
+):
+    """
+    Converts a file to another format moving the data in slabs, such that
+    the memory used is bounded by max_memory whatever the size of the file.
+
+    Parameters
+    ----------
+    src: str
+        The file to convert. It can be a member of an archive (e.g. file.h5/key
+        or a member of a not compressed tarball). Supported formats: npy, lime,
+        openqcd, tar and HDF5.
+    dst: str
+        The file to write. It can be a member of an archive (e.g. file.h5/key
+        or file.tar/key.npy). Supported formats: npy, lime, tar and HDF5.
+    format: str, Format
+        Format of dst. If not given, it is deduced from the extension.
+    src_format: str, Format
+        Format of src. If not given, it is deduced from the file.
+    max_memory: int
+        Maximum number of bytes of the data held in memory, i.e. the slabs
+        and their copies made for converting them.
+    workers: int
+        If given, the next slabs are read and converted on a pool of
+        workers threads while writing.
+    metadata: dict
+        Additional metadata to write in the header.
+    """
+    # pylint: disable=redefined-builtin
+    _, source = _open_source(src, src_format)
+    fmt = formats.get_format(format, filename=dst, sniff=False)
+    if fmt.name.lower() not in destinations:
+        raise ValueError(f"Streaming to {fmt} is not supported")
+    filename, key = split_filename(dst)
+    src_filename, _ = split_filename(find_file(src))
+    if os.path.exists(filename) and os.path.samefile(filename, src_filename):
+        raise ValueError("src and dst must be different files")
+
+    member = None
+    if fmt.name.lower() == "tar":
+        member = formats.get_format(filename=os.path.basename(key), sniff=False)
+
+    dtype = source.dtype
+    if (member or fmt).name.lower() == "lime":
+        dtype = dtype.newbyteorder(">")
+
+    attrs = {name: val for name, val in source.attrs.items() if name[0] != "_"}
+    attrs.update(get_attrs(source), type=repr(numpy.ndarray))
+    attrs.update(
+        shape=source.shape,
+        dtype=dtype,
+        fortran_order=False,
+        descr=dtype_to_descr(dtype),
+        nbytes=source.size * dtype.itemsize,
+    )
+    if metadata:
+        attrs.update(metadata)
+
+    # copies made while reading (e.g. reordering) and converting a slab
+    copies = getattr(source.reader, "copies", 0)
+    if dtype != source.dtype or source.attrs.get("fortran_order"):
+        copies += 1
+    in_flight = (workers + 1) * (copies + 1)
+
+    try:
+        boxes = list(
+            slabs(
+                source.shape,
+                dtype.itemsize,
+                max_memory // in_flight,
+                axes=getattr(source.reader, "slab_axes", None),
+            )
+        )
+    except ValueError as err:
+        raise ValueError(f"max_memory={max_memory} is too small for {src}") from err
+
+    def read(box):
+        data = source[box]
+        if dtype == data.dtype and data.flags["C_CONTIGUOUS"]:
+            return data
+        with metrics.measure("convert", fmt.name.lower(), dst, data.nbytes, 1):
+            return numpy.ascontiguousarray(data, dtype=dtype)
+
+    chunks = _read_slabs(boxes, read, workers=workers)
+    with metrics.measure("convert_file", fmt.name.lower(), dst, attrs["nbytes"]):
+        if fmt.name.lower() == "hdf5":
+            _write_hdf5(filename, key, source.shape, dtype, attrs, chunks)
+        elif member is not None:
+            header = _header_bytes(member, attrs)
+            _write_member(filename, key, header, attrs["nbytes"], chunks)
+        else:
+            header = _header_bytes(fmt, attrs)
+            _write_raw(filename, header, attrs["nbytes"], source.shape, chunks)
@@ -12,8 +12,7 @@ from collections.abc import Mapping
 from contextlib import contextmanager
 from os import listdir
 from os.path import exists, splitext, basename
-from io import BytesIO
-from .mpi_io import check_comm, tempdir_MPI
+from io import BytesIO, BufferedReader
 from .header import Header
 from .archive import split_filename, Data, Archive, Loader
 from .utils import (
@@ -23,6 +22,7 @@ from .utils import (
     find_member,
     get_depth,
 )
+from . import metrics
 
 
 _all_extensions = [
@@ -66,8 +66,9 @@ modes = {
 def _save(arr, tar, key, **kwargs):
     from . import base
     from .formats import formats
+    from .mpi_io import tempdir_MPI
 
-    _format = formats.get_format(filename=basename(key))
+    _format = formats.get_format(filename=basename(key), sniff=False)
     key = key[1:] if key[0] == "/" else key
 
     if kwargs.get("comm", None) is not None:
@@ -118,6 +119,8 @@ def save(arr, filename, key=None, comm=None, **kwargs):
     """
     Save function for tar
     """
+    from .mpi_io import check_comm
+
     filename, key = split_filename(filename, key)
     mode_suffix = _get_mode(filename)
     kwargs = {"comm": comm, **kwargs}
@@ -129,11 +132,68 @@ def save(arr, filename, key=None, comm=None, **kwargs):
         _write_dispatch(arr, tar, key, **kwargs)
 
 
-def _load_member(tar, member, header_only=False, as_data=False, **kwargs):
+def _map_member(tar, member, _format, lazy=False, read=False, **kwargs):
+    """
+    Returns the header and a memory map (a lazy array or, if read, the array
+    read with parallel positioned reads) of the data of a member.
+    The data is accessed directly in the tarball.
+    """
+    from . import base
+    from .lazy import lazy_array
+    from .utils import map_array, read_array
+
+    if not isinstance(tar.fileobj, BufferedReader):
+        raise ValueError("Direct access is supported only for not compressed tarballs")
+
+    header = Header(base.head(tar.extractfile(member), format=_format))
+    if "_offset" not in header:
+        raise ValueError(f"Direct access is not supported for {_format} files")
+    if header["dtype"].hasobject:
+        raise ValueError("Direct access is not supported for object arrays")
+
+    if lazy:
+        return header, lazy_array(tar.name, header, offset=member.offset_data)
+
+    data = (read_array if read else map_array)(
+        tar.name,
+        header["shape"],
+        header["dtype"],
+        member.offset_data + header["_offset"],
+        order="F" if header.get("fortran_order") else "C",
+        **kwargs,
+    )
+    return header, data
+
+
+def _load_member(
+    tar, member, header_only=False, as_data=False, mmap=False, lazy=False, **kwargs
+):
     from . import base
     from .formats import formats
 
-    _format = formats.get_format(filename=basename(member.name))
+    _format = formats.get_format(filename=basename(member.name), sniff=False)
+
+    if (mmap or lazy) and not header_only:
+        if kwargs["comm"] is not None:
+            raise ValueError("mmap/lazy and comm parameters cannot be both set")
+        header, data = _map_member(tar, member, _format, lazy=lazy)
+        return Data(header, data) if as_data else data
+
+    if (
+        not header_only
+        and kwargs["comm"] is None
+        and isinstance(tar.fileobj, BufferedReader)
+        and _format.name in ("Numpy", "lime")
+        and set(kwargs) <= {"comm", "cancel", "out"}
+    ):
+        # not compressed members are read in place with parallel reads
+        options = {key: val for key, val in kwargs.items() if key != "comm"}
+        try:
+            header, data = _map_member(tar, member, _format, read=True, **options)
+        except ValueError:
+            pass
+        else:
+            return Data(header, data) if as_data else data
 
     # 1. get buffer (extractfile) but causes fileno issues
     # 2. extract to a temporary file for parallel read
@@ -209,7 +269,8 @@ def load(filename, key=None, chunks=None, comm=None, **kwargs):
         raise ValueError("chunks and comm parameters cannot be both set")
 
     filename, key = split_filename(filename, key)
-    mode_suffix = _get_mode(filename)
+    # transparent compression if the extension is not known
+    mode_suffix = _get_mode(filename, default=":*")
     kwargs = {"comm": comm, **kwargs}
     loader = Loader(load, filename, kwargs=kwargs)
 
@@ -217,14 +278,19 @@ def load(filename, key=None, chunks=None, comm=None, **kwargs):
         return _load_dispatch(tar, key, loader, **kwargs)
 
 
-def head(*args, **kwargs):
+def head(*args, comm=None, **kwargs):
     """
-    Head function for tar
+    Head function for tar.
+    If comm is given, the tarball is read by rank 0 only.
     """
+    if comm is not None:
+        from .mpi_io import on_root
+
+        return on_root(comm, load, *args, header_only=True, **kwargs)
     return load(*args, header_only=True, **kwargs)
 
 
-def _get_mode(filename):
+def _get_mode(filename, default=None):
     """
     Returns the mode (from modes) with which the tarball should be read/written as
     """
@@ -232,6 +298,8 @@ def _get_mode(filename):
     for key, val in modes.items():
         if ext in val:
             return key
+    if default is not None:
+        return default
     raise ValueError(f"{ext} is not supported.")
 
 
@@ -247,11 +315,14 @@ def is_dir(tar, key):
 
 @contextmanager
 def _extract(tar, member, get_buff=False, **kwargs):
+    from .mpi_io import check_comm, tempdir_MPI
+
     if kwargs.get("comm", None) is not None:
         with tempdir_MPI(kwargs.get("comm")) as temp:
             check_comm(kwargs["comm"])
             if kwargs["comm"].rank == 0:
-                tar.extract(member, path=temp)
+                with metrics.measure("tar.extract", "tar", tar.name, member.size, 1):
+                    tar.extract(member, path=temp)
             kwargs["comm"].Barrier()
             yield temp + "/" + listdir(temp)[0]
     elif get_buff:
@@ -260,6 +331,7 @@ def _extract(tar, member, get_buff=False, **kwargs):
         # This is what's used at the moment
         # get_buff raises errors ('fileno')
         fptr = BytesIO()
-        fptr.write(tar.extractfile(member).read())
+        with metrics.measure("tar.extract", "tar", tar.name, member.size, copies=2):
+            fptr.write(tar.extractfile(member).read())
         fptr.seek(0)
         yield fptr
@@ -39,7 +39,7 @@ parallel_format_loop = mark.parametrize(
     ],
 )
 
-with_hdf5 = formats["hdf5"].error is None
+with_hdf5 = formats["hdf5"].available
 skip_hdf5 = mark.skipif(not with_hdf5, reason="hdf5 not available")
 if with_hdf5:
     from .hdf5 import mpi as with_hdf5_mpi
@@ -0,0 +1,197 @@
+"""
+Tracing of the I/O operations in the Chrome trace-event format.
+
+While tracing, every operation measured by lyncs_io.metrics is stored as a span
+(stage, format, path, bytes) timestamped with the wall clock of the process.
+The spans of the MPI ranks (save with comm) and of the Dask workers (start and
+save with client) are merged in a single JSON file, that can be opened with
+chrome://tracing or https://ui.perfetto.dev. Each rank or worker is shown as
+a process, each thread as a track. Trace files of separate runs or processes
+can be merged with merge.
+
+NOTE: spans of different nodes are aligned assuming synchronized wall clocks.
+"""
+
+__all__ = [
+    "start",
+    "stop",
+    "is_active",
+    "spans",
+    "clear",
+    "save",
+    "merge",
+]
+
+import os
+import json
+import socket
+import threading
+from . import metrics
+
+_active = False
+_metrics_enabled = False
+_name = None
+_events = []
+_threads = {}
+_lock = threading.Lock()
+
+
+def _sink(record):
+    thread = threading.current_thread()
+    event = {
+        "name": record.stage,
+        "cat": record.format or "io",
+        "ph": "X",
+        "ts": record.start * 1e6,
+        "dur": record.seconds * 1e6,
+        "tid": thread.native_id,
+        "args": {
+            "path": record.path,
+            "nbytes": record.nbytes,
+            "copies": record.copies,
+            "GB/s": record.throughput,
+        },
+    }
+    with _lock:
+        _events.append(event)
+        _threads[thread.native_id] = thread.name
+
+
+def start(name=None, client=None):
+    """
+    Starts tracing. Enables the metrics until stop is called.
+
+    Parameters
+    ----------
+    name: str
+        Label of the process in the trace. By default host:pid or the rank.
+    client: dask.distributed.Client
+        If given, the tracing is started also on the workers.
+    """
+    # pylint: disable=global-statement
+    global _active, _metrics_enabled, _name
+    if client is not None:
+        client.run(_start_worker)
+    if name is not None:
+        _name = name
+    if _active:
+        return
+    _metrics_enabled = metrics.is_enabled()
+    metrics.add_sink(_sink)
+    metrics.enable()
+    _active = True
+
+
+def _start_worker(dask_worker):
+    start(name=f"worker {dask_worker.address}")
+
+
+def stop(client=None):
+    "Stops tracing. The spans are kept until clear is called."
+    # pylint: disable=global-statement
+    global _active
+    if client is not None:
+        client.run(stop)
+    if not _active:
+        return
+    metrics.remove_sink(_sink)
+    metrics.enable(_metrics_enabled)
+    _active = False
+
+
+def is_active():
+    "Whether tracing is active"
+    return _active
+
+
+def clear(client=None):
+    "Removes the recorded spans (also on the workers if client is given)"
+    if client is not None:
+        client.run(clear)
+    with _lock:
+        _events.clear()
+        _threads.clear()
+
+
+def spans():
+    "Returns the spans of this process with the information of the process"
+    with _lock:
+        return {
+            "name": _name,
+            "host": socket.gethostname(),
+            "pid": os.getpid(),
+            "threads": dict(_threads),
+            "events": list(_events),
+        }
+
+
+def _trace_events(processes):
+    "Converts a list of spans (see spans) to trace events, one pid per process"
+    events = []
+    for pid, proc in enumerate(processes):
+        name = proc["name"] or f"{proc['host']}:{proc['pid']}"
+        events.append(
+            {"name": "process_name", "ph": "M", "pid": pid, "args": {"name": name}}
+        )
+        for tid, thread in proc["threads"].items():
+            events.append(
+                {
+                    "name": "thread_name",
+                    "ph": "M",
+                    "pid": pid,
+                    "tid": int(tid),
+                    "args": {"name": thread},
+                }
+            )
+        events.extend(dict(event, pid=pid) for event in proc["events"])
+    return events
+
+
+def _write(filename, events):
+    with open(filename, "w", encoding="utf-8") as fptr:
+        json.dump({"traceEvents": events, "displayTimeUnit": "ms"}, fptr)
+
+
+def save(filename, comm=None, client=None):
+    """
+    Writes the spans in a trace-event JSON file.
+
+    Parameters
+    ----------
+    filename: str
+        The trace file to write.
+    comm: MPI.Comm
+        If given, the spans of all the ranks are gathered and written
+        by rank 0 (collective operation).
+    client: dask.distributed.Client
+        If given, the spans of the workers are included.
+    """
+    local = spans()
+    if comm is not None:
+        if local["name"] is None:
+            local["name"] = f"rank {comm.rank}"
+        processes = comm.gather(local, root=0)
+        if comm.rank != 0:
+            return
+    else:
+        processes = [local]
+
+    if client is not None:
+        for proc in client.run(spans).values():
+            # workers running in this process (e.g. processes=False)
+            if (proc["host"], proc["pid"]) != (local["host"], local["pid"]):
+                processes.append(proc)
+
+    _write(filename, _trace_events(processes))
+
+
+def merge(filenames, filename):
+    "Merges the trace files in filenames into filename"
+    events = []
+    for name in filenames:
+        with open(name, encoding="utf-8") as fptr:
+            trace = json.load(fptr)
+        trace = trace["traceEvents"] if isinstance(trace, dict) else trace
+        offset = max((event["pid"] for event in events), default=-1) + 1
+        events.extend(dict(event, pid=event["pid"] + offset) for event in trace)
+    _write(filename, events)
@@ -0,0 +1,330 @@
+"""
+Transcoding of whole archives and ensembles of files.
+
+    python -m lyncs_io.transcode ensemble/ ensemble.h5 --pattern "*.lime"
+
+The members of the source (a directory, a tarball, an HDF5 file or a numpy-z
+file) are loaded, in parallel over a pool of processes or over MPI ranks, and
+written into the destination (a directory, an HDF5 file, a not compressed
+tarball or a numpy-z file). Archives are written by a single writer (the main
+process or rank 0). The transcoded members are recorded in a manifest such
+that an interrupted transcoding is resumed skipping them.
+"""
+
+__all__ = [
+    "transcode",
+]
+
+import os
+import re
+import json
+from concurrent.futures import wait, FIRST_COMPLETED
+from fnmatch import fnmatch
+from time import time
+from .archive import Data, Archive
+from .base import load, head, save
+from .batch import get_executor
+from .formats import formats
+from .header import Header
+
+
+def walk(archive, prefix=""):
+    "Yields the keys of the data in the archive (nested archives included)"
+    for key in archive:
+        if key in archive.data():
+            yield prefix + key
+        else:
+            yield from walk(archive[key], prefix + key + "/")
+
+
+def members(src, pattern=None):
+    """
+    Returns the list of (key, path) of the members of src, where path can be
+    used for loading the member. The keys are filtered by pattern (fnmatch).
+    """
+    if os.path.isdir(src):
+        paths = []
+        for root, dirs, files in os.walk(src):
+            dirs.sort()
+            for name in sorted(files):
+                path = os.path.join(root, name)
+                paths.append((os.path.relpath(path, src).replace(os.sep, "/"), path))
+    elif formats.get_format(filename=src).archive:
+        archive = head(src, all_data=True)
+        if isinstance(archive, Archive):
+            paths = [(key, f"{src}/{key}") for key in walk(archive)]
+        else:
+            paths = [(os.path.basename(src), src)]
+    else:
+        paths = [(os.path.basename(src), src)]
+
+    if pattern:
+        paths = [(key, path) for key, path in paths if fnmatch(key, pattern)]
+    return paths
+
+
+def _strip_extension(key):
+    "Removes the extension from the key if it is the one of a format"
+    root, ext = os.path.splitext(key)
+    try:
+        formats.from_suffix(ext)
+    except ValueError:
+        return key
+    return root
+
+
+def destination(dst, format=None):
+    """
+    Returns the format of the destination archive (None for a directory) and
+    a function mapping the keys of the source to the keys of the destination.
+    format is the format of the members written in directories and tarballs.
+    """
+    # pylint: disable=redefined-builtin
+    if os.path.isdir(dst) or not os.path.splitext(dst)[1]:
+        fmt = None
+    else:
+        fmt = formats.get_format(filename=dst, sniff=False)
+        if not fmt.archive:
+            raise ValueError("The destination must be a directory or an archive")
+
+    if fmt is None or fmt.name == "Tar":
+        ext = formats.get_format(format or "numpy").extensions[0]
+
+        def dst_key(key):
+            return f"{_strip_extension(key)}.{ext}"
+
+    elif fmt.name == "NumpyZ":
+
+        def dst_key(key):
+            return re.sub(r"\W", "_", _strip_extension(key))
+
+    else:
+
+        def dst_key(key):
+            return _strip_extension(key)
+
+    if fmt is not None and fmt.name == "Tar":
+        # pylint: disable=import-outside-toplevel
+        from .tar import _get_mode
+
+        if _get_mode(dst) != ":":
+            raise ValueError("Appending in a compressed tarball is not supported")
+
+    return fmt, dst_key
+
+
+class Manifest:
+    "Record of the transcoded members (JSON lines) used for resuming"
+
+    def __init__(self, filename=None):
+        self.filename = filename
+        self.done = {}
+        if filename and os.path.exists(filename):
+            with open(filename, encoding="utf-8") as fptr:
+                for line in fptr:
+                    if line.strip():
+                        entry = json.loads(line)
+                        self.done[entry["key"]] = entry["dst"]
+
+    def add(self, key, dst):
+        "Records the member key transcoded in dst"
+        self.done[key] = dst
+        if not self.filename:
+            return
+        with open(self.filename, "a", encoding="utf-8") as fptr:
+            fptr.write(json.dumps({"key": key, "dst": dst, "time": time()}) + "\n")
+
+    def __contains__(self, key):
+        return key in self.done
+
+
+def transcode_member(path, dst=None, format=None):
+    """
+    Loads the member and saves it into dst. If dst is None, returns the data.
+    Exceptions are returned (not raised) such that they reach the writer.
+    """
+    # pylint: disable=redefined-builtin
+    try:
+        data = load(path)
+        if isinstance(data, (Archive, Data, Header)):
+            raise TypeError(f"{path} is not a data object")
+        if dst is None:
+            return data
+        os.makedirs(os.path.dirname(dst) or ".", exist_ok=True)
+        save(data, dst, format=format)
+        return None
+    except Exception as err:  # pylint: disable=broad-except
+        return err
+
+
+def transcode(
+    src,
+    dst,
+    format=None,
+    pattern=None,
+    workers=None,
+    executor="process",
+    comm=None,
+    manifest=None,
+    errors="return",
+):
+    """
+    Transcodes the members of src into dst.
+
+    Parameters
+    ----------
+    src: str
+        A directory, a tarball, an HDF5 file, a numpy-z file or a single file.
+    dst: str
+        A directory (any path without extension), an HDF5 file, a not compressed
+        tarball or a numpy-z file. The extensions of the keys are replaced
+        accordingly, e.g. cfg.lime -> cfg (HDF5) or cfg.npy (directory).
+    format: str
+        Format of the members written in directories and tarballs (numpy).
+    pattern: str
+        Only the keys matching the pattern (fnmatch) are transcoded.
+    workers: int
+        Number of workers of the pool.
+    executor: str, Executor
+        Either "process", "thread" or an instance of concurrent.futures.Executor.
+    comm: MPI.Comm
+        If given, the members are distributed over the ranks instead of a pool.
+        Archives are written by rank 0.
+    manifest: str, bool
+        File recording the transcoded members. By default dst + ".manifest".
+        The members already recorded are skipped. If False, nothing is recorded.
+    errors: str
+        Either "return" (default), the exceptions are returned in place of
+        the keys of the destination, or "raise".
+
+    Returns
+    -------
+    results: dict
+        For each transcoded key of src, the path of dst or the exception.
+    """
+    # pylint: disable=redefined-builtin,too-many-arguments,too-many-locals
+    if errors not in ("return", "raise"):
+        raise ValueError("errors must be either 'return' or 'raise'")
+
+    src, dst = str(src).rstrip("/"), str(dst).rstrip("/")
+    fmt, dst_key = destination(dst, format)
+    if manifest is None:
+        manifest = dst + ".manifest"
+
+    root = comm is None or comm.rank == 0
+    todo = None
+    if root:
+        if fmt is None:
+            os.makedirs(dst, exist_ok=True)
+        record = Manifest(manifest or None)
+        todo = [
+            (key, path, f"{dst}/{dst_key(key)}")
+            for key, path in members(src, pattern)
+            if key not in record
+        ]
+    if comm is not None:
+        todo = comm.bcast(todo, root=0)
+
+    results = {}
+
+    def write(key, target, data):
+        "Writes the data (archives only) and records the member"
+        if isinstance(data, Exception):
+            results[key] = data
+            return
+        try:
+            if fmt is not None:
+                kwargs = {"append": True} if fmt.name == "NumpyZ" else {}
+                save(data, target, format=fmt, **kwargs)
+            record.add(key, target)
+            results[key] = target
+        except Exception as err:  # pylint: disable=broad-except
+            results[key] = err
+
+    def args(path, target):
+        "Arguments of transcode_member: archives are written by the writer"
+        return (path, target, format) if fmt is None else (path,)
+
+    if comm is not None:
+        for idx, (key, path, target) in enumerate(todo):
+            owner = idx % comm.size
+            if owner == comm.rank:
+                data = transcode_member(*args(path, target))
+                if not root:
+                    comm.send(data, dest=0, tag=idx)
+            elif root:
+                data = comm.recv(source=owner, tag=idx)
+            if root:
+                write(key, target, data)
+        results = comm.bcast(results, root=0)
+    else:
+        with get_executor(executor, workers) as pool:
+            pending = {}
+            max_pending = 2 * (workers or os.cpu_count() or 1)
+
+            def collect(futures):
+                for future in futures:
+                    key, target = pending.pop(future)
+                    write(key, target, future.result())
+
+            for key, path, target in todo:
+                while len(pending) >= max_pending:
+                    collect(wait(pending, return_when=FIRST_COMPLETED).done)
+                future = pool.submit(transcode_member, *args(path, target))
+                pending[future] = (key, target)
+            collect(wait(pending).done)
+
+    if errors == "raise":
+        for result in results.values():
+            if isinstance(result, Exception):
+                raise result
+    return results
+
+
+def main(args=None):
+    "Command line interface"
+    # pylint: disable=import-outside-toplevel
+    import argparse
+
+    parser = argparse.ArgumentParser(
+        prog="python -m lyncs_io.transcode", description=__doc__
+    )
+    parser.add_argument("src", help="directory, tarball, HDF5 or numpy-z file")
+    parser.add_argument("dst", help="directory, tarball, HDF5 or numpy-z file")
+    parser.add_argument("--format", help="format of the members (default numpy)")
+    parser.add_argument("--pattern", help="only the keys matching the pattern")
+    parser.add_argument("--workers", type=int, help="number of processes")
+    parser.add_argument(
+        "--threads", action="store_true", help="use threads instead of processes"
+    )
+    parser.add_argument("--mpi", action="store_true", help="distribute over MPI")
+    parser.add_argument("--manifest", help="default: DST.manifest")
+    parser.add_argument("--no-manifest", action="store_true")
+    opts = parser.parse_args(args)
+
+    comm = None
+    if opts.mpi:
+        from mpi4py import MPI
+
+        comm = MPI.COMM_WORLD
+
+    results = transcode(
+        opts.src,
+        opts.dst,
+        format=opts.format,
+        pattern=opts.pattern,
+        workers=opts.workers,
+        executor="thread" if opts.threads else "process",
+        comm=comm,
+        manifest=False if opts.no_manifest else opts.manifest,
+    )
+    if comm is None or comm.rank == 0:
+        failed = [key for key, val in results.items() if isinstance(val, Exception)]
+        for key in failed:
+            print(f"{key}: {type(results[key]).__name__}: {results[key]}")
+        print(f"Transcoded {len(results) - len(failed)} members, {len(failed)} failed")
+    return results
+
+
+if __name__ == "__main__":
+    main()
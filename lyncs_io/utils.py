@@ -2,11 +2,181 @@
 Function utils
 """
 
+import os
+import glob
+from copy import copy
+from concurrent.futures import CancelledError
+from threading import Lock
+from io import FileIO
+from time import time_ns
+from fnmatch import fnmatch
 from functools import wraps
 from pathlib import Path
 from os.path import splitext
-from collections import defaultdict
+from collections import defaultdict, OrderedDict
+import numpy
+from lyncs_utils import prod, open_file
 from lyncs_utils.io import FileLike
+from .pread import pread_runs
+
+# Size in bytes of the chunks read by read_array
+CHUNKSIZE = 2**24
+
+
+class DirectoryIndex:
+    """
+    Cache of directory listings.
+
+    A listing is reused as long as the modification time of the directory
+    is unchanged, so that repeated lookups in the same directory cost a
+    single stat instead of a full listing. Listings taken less than `racy`
+    seconds after the last modification are not trusted, since file systems
+    with coarse timestamps may not update the mtime for further changes.
+
+    Attributes
+    ----------
+    - maxsize: maximum number of directories kept in the cache
+    - racy: time window (in seconds) in which a listing is not trusted
+    """
+
+    def __init__(self, maxsize=128, racy=2):
+        self.maxsize = maxsize
+        self.racy = racy
+        self._cache = OrderedDict()
+        # the index is shared by the threads of batch and aio
+        self._lock = Lock()
+
+    def listdir(self, path):
+        "Returns the names of the entries in the directory"
+        key = os.path.abspath(path)
+        try:
+            mtime = os.stat(key).st_mtime_ns
+
+            with self._lock:
+                cached, trusted, names = self._cache.get(key, (None, False, ()))
+                if trusted and cached == mtime:
+                    self._cache.move_to_end(key)
+                    return names
+
+            names = tuple(os.listdir(key))
+        except OSError:
+            # e.g. the directory has been removed
+            self.invalidate(key)
+            raise
+        trusted = time_ns() - mtime > self.racy * 10**9
+        with self._lock:
+            self._cache[key] = (mtime, trusted, names)
+            self._cache.move_to_end(key)
+            while len(self._cache) > self.maxsize:
+                self._cache.popitem(last=False)
+        return names
+
+    def glob(self, path, pattern):
+        "Returns the paths of the entries in the directory matching the pattern"
+        path = Path(path)
+        return [path / name for name in self.listdir(path) if fnmatch(name, pattern)]
+
+    def is_dir(self, path):
+        "Whether the path is a directory. If not, its listing is dropped."
+        if os.path.isdir(path):
+            return True
+        self.invalidate(path)
+        return False
+
+    def invalidate(self, path=None):
+        "Removes the directory from the cache. If path is None, clears the cache."
+        with self._lock:
+            if path is None:
+                self._cache.clear()
+            else:
+                self._cache.pop(os.path.abspath(path), None)
+
+    def __len__(self):
+        return len(self._cache)
+
+
+dir_index = DirectoryIndex()
+
+
+class HeaderCache:
+    """
+    LRU cache of file headers.
+
+    Headers are stored by (realpath, inode, size, mtime) of the file, so that
+    a modified file is parsed again. As for DirectoryIndex, headers of files
+    modified less than `racy` seconds ago are not stored.
+
+    Attributes
+    ----------
+    - maxsize: maximum number of headers kept in the cache
+    - racy: time window (in seconds) in which a file is considered unstable
+    - enabled: global switch of the cache
+    """
+
+    def __init__(self, maxsize=1024, racy=2, enabled=True):
+        self.maxsize = maxsize
+        self.racy = racy
+        self.enabled = enabled
+        self._cache = OrderedDict()
+        # as dir_index, the cache is shared by the threads of batch and aio
+        self._lock = Lock()
+
+    @staticmethod
+    def key(filename):
+        "Returns the key of the file or None if it is not a regular file"
+        if isinstance(filename, FileLike):
+            return None
+        if not isinstance(filename, (str, os.PathLike)):
+            return None
+        try:
+            path = os.path.realpath(filename)
+            stat = os.stat(path)
+        except OSError:
+            return None
+        return (path, stat.st_ino, stat.st_size, stat.st_mtime_ns)
+
+    def __call__(self, fnc):
+        "Decorator that caches the headers returned by fnc(filename)"
+
+        @wraps(fnc)
+        def cached(filename, *args, **kwargs):
+            key = None
+            if self.enabled and not args and not kwargs:
+                key = self.key(filename)
+            if key is None:
+                return fnc(filename, *args, **kwargs)
+
+            key = (fnc.__module__, fnc.__qualname__) + key
+            with self._lock:
+                if key in self._cache:
+                    self._cache.move_to_end(key)
+                    return copy(self._cache[key])
+
+            header = fnc(filename)
+            if time_ns() - key[-1] > self.racy * 10**9:
+                with self._lock:
+                    self._cache[key] = copy(header)
+                    while len(self._cache) > self.maxsize:
+                        self._cache.popitem(last=False)
+            return header
+
+        return cached
+
+    def invalidate(self, filename=None):
+        "Removes the headers of the file from the cache. If None, clears the cache."
+        path = None if filename is None else os.path.realpath(filename)
+        with self._lock:
+            if path is None:
+                self._cache.clear()
+                return
+            for key in [key for key in self._cache if key[2] == path]:
+                del self._cache[key]
+
+    def __len__(self):
+        return len(self._cache)
+
+
+header_cache = HeaderCache()
 
 
 def find_file(filename):
@@ -15,7 +185,7 @@ def find_file(filename):
     as the parameter <filename>. If the file does not exist,
     the directory is searched for <filename.*> instead, and if
     only one match is found, that particular filename is returned.
-
+    The content of the directory is cached in `dir_index`.
     """
 
     if isinstance(filename, FileLike):
@@ -26,13 +196,12 @@ def find_file(filename):
         return filename
 
     # Most probably is an archive
-    if not path.parent.is_dir():
+    if not dir_index.is_dir(path.parent):
         return filename
 
     # A list with files matching the following pattern: filename.*
-    potential_files = [
-        str(f) for f in path.parent.iterdir() if str(f).startswith(str(path))
-    ]
+    pattern = glob.escape(path.name) + "*"
+    potential_files = [str(f) for f in dir_index.glob(path.parent, pattern)]
 
     if len(potential_files) == 1:
         return str(potential_files[0])
@@ -41,6 +210,120 @@ def find_file(filename):
     raise FileNotFoundError(f"No such file: {filename}, {filename}.*")
 
 
+def check_out(out, shape, dtype, order="C"):
+    "Checks that out is a contiguous array of given shape and dtype"
+    if not isinstance(out, numpy.ndarray):
+        raise TypeError(f"out must be a numpy array, got {type(out)}")
+    if tuple(out.shape) != tuple(shape):
+        raise ValueError(f"out has shape {out.shape}, expected {tuple(shape)}")
+    if out.dtype != numpy.dtype(dtype):
+        raise ValueError(f"out has dtype {out.dtype}, expected {numpy.dtype(dtype)}")
+    contiguous = out.flags.f_contiguous if order == "F" else out.flags.c_contiguous
+    if not contiguous:
+        raise ValueError(f"out must be {order}-contiguous")
+    if not out.flags.writeable:
+        raise ValueError("out must be writeable")
+    return out
+
+
+def _fileno(_fp):
+    "Returns the file descriptor of a file opened from disk or None"
+    raw = getattr(_fp, "raw", _fp)
+    if isinstance(raw, FileIO) and hasattr(os, "preadv"):
+        return raw.fileno()
+    return None
+
+
+@open_file
+def read_array(
+    _fp,
+    shape,
+    dtype,
+    offset=0,
+    order="C",
+    cancel=None,
+    out=None,
+    threads=None,
+    range_size=None,
+):
+    """
+    Reads an array from a binary file.
+    Files on disk are read with thread-parallel positioned reads (see pread).
+
+    Parameters
+    ----------
+    _fp: str, file-like object
+        The file to read from.
+    shape: tuple
+        Shape of the array.
+    dtype: data-type
+        numpy data-type of the array.
+    offset: int
+        Position in bytes where the data start in the file.
+    order: str
+        Whether data are stored in row/column major ('C', 'F') order.
+    cancel: threading.Event
+        If given, the data is read in chunks and the reading is interrupted,
+        raising CancelledError, once the event is set.
+    out: numpy.ndarray
+        If given, the data is read directly into out. See check_out.
+    threads: int
+        Number of threads of the parallel reads. By default automatic.
+    range_size: int
+        Bytes read per thread task. By default automatic.
+    """
+    # pylint: disable=too-many-arguments
+    dtype = numpy.dtype(dtype)
+    nbytes = prod(shape) * dtype.itemsize
+    if out is not None:
+        check_out(out, shape, dtype, order)
+        buf = out.reshape(-1, order="A").view("u1")
+    else:
+        buf = numpy.empty(nbytes, dtype="u1")
+    view = memoryview(buf)
+
+    fileno = _fileno(_fp)
+    if fileno is not None:
+        pread_runs(
+            fileno,
+            view,
+            [(offset, nbytes)],
+            threads=threads,
+            range_size=range_size,
+            cancel=cancel,
+        )
+    else:
+        chunksize = CHUNKSIZE if cancel is not None else max(nbytes, 1)
+        _fp.seek(offset)
+        pos = 0
+        while pos < nbytes:
+            if cancel is not None and cancel.is_set():
+                raise CancelledError("Reading has been cancelled")
+            read = _fp.readinto(view[pos : pos + chunksize])
+            if not read:
+                raise ValueError(f"Unexpected end of file: expected {nbytes} bytes")
+            pos += read
+
+    if out is not None:
+        return out
+    return buf.view(dtype).reshape(shape, order=order)
+
+
+def map_array(filename, shape, dtype, offset=0, order="C"):
+    """
+    Returns a read-only memory map of an array stored in a binary file.
+    The data is read from the file only when accessed.
+    """
+    shape = tuple(shape)
+    if prod(shape) == 0:
+        arr = numpy.empty(shape, dtype=dtype, order=order)
+        arr.flags.writeable = False
+        return arr
+    return numpy.memmap(
+        filename, mode="r", dtype=dtype, shape=shape, offset=offset, order=order
+    )
+
+
 def is_dask_array(obj):
     """
     Function for checking if passed object is a dask Array
@@ -0,0 +1,321 @@
+"""
+Incremental writer: the array is written slab by slab.
+
+The header is written up front (numpy, lime) or the dataset is created (HDF5)
+for the global shape and dtype. The slabs are then assigned in any order with
+writer[key] = data and written with positioned writes or as hyperslabs,
+either directly, on a pool of threads or by the MPI ranks.
+The metadata is finalized on close.
+"""
+
+__all__ = [
+    "open_writer",
+]
+
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+import numpy
+from numpy.lib.format import dtype_to_descr
+from lyncs_utils import prod
+from .archive import split_filename
+from .convert import get_attrs
+from .formats import formats
+from .lazy import split_key, box_runs
+from .stream import _pwrite
+from .utils import header_cache
+from . import metrics
+
+
+class Writer:
+    """
+    Writes an array slab by slab. See open_writer.
+    The slabs are assigned with writer[key] = data, where key (integers,
+    slices and Ellipsis) indexes the global array.
+    """
+
+    # pylint: disable=too-many-instance-attributes,too-many-arguments
+    def __init__(
+        self,
+        filename,
+        shape,
+        dtype,
+        format=None,
+        comm=None,
+        collective=False,
+        workers=0,
+        metadata=None,
+        reserve=1024,
+    ):
+        # pylint: disable=redefined-builtin
+        self.format = formats.get_format(format, filename=filename, sniff=False)
+        self.name = self.format.name.lower()
+        if self.name not in ("numpy", "lime", "hdf5"):
+            raise ValueError(f"Incremental writing of {self.format} is not supported")
+        if comm is not None:
+            # pylint: disable=import-outside-toplevel
+            from .mpi_io import check_comm
+
+            check_comm(comm)
+            if workers:
+                raise ValueError("comm and workers parameters cannot be both set")
+        elif collective:
+            raise ValueError("collective requires comm")
+
+        self.filename, self.key = split_filename(filename)
+        self.shape = tuple(shape)
+        self.dtype = numpy.dtype(dtype)
+        if self.name == "lime":
+            self.dtype = self.dtype.newbyteorder(">")
+        self.comm = comm
+        self.collective = collective
+        self.attrs = get_attrs(numpy.ndarray)
+        self.attrs.update(
+            type=repr(numpy.ndarray),
+            shape=self.shape,
+            dtype=self.dtype,
+            fortran_order=False,
+            descr=dtype_to_descr(self.dtype),
+            nbytes=prod(self.shape) * self.dtype.itemsize,
+        )
+        self.attrs.update(metadata or {})
+
+        self.closed = False
+        self._pool = ThreadPoolExecutor(max_workers=workers) if workers else None
+        self._max_pending = 2 * workers
+        self._pending = set()
+        self._file = None
+        self._dset = None
+        self._sizes = None
+        self.offset = 0
+        if self.name == "hdf5":
+            self._create_dataset()
+        else:
+            self._write_header(reserve)
+
+    @property
+    def MPI(self):
+        "Property for importing MPI wherever necessary"
+        # pylint: disable=import-outside-toplevel,invalid-name
+        from mpi4py import MPI
+
+        return MPI
+
+    @property
+    def root(self):
+        "Whether this process writes the header"
+        return self.comm is None or self.comm.rank == 0
+
+    def _header(self):
+        backend = self.format.backend
+        if self.name == "lime":
+            return backend.get_header_bytes(self.attrs, sizes=self._sizes)
+        # pylint: disable=protected-access
+        return backend._get_header_bytes(self.attrs)
+
+    def _write_header(self, reserve):
+        if self.name == "lime":
+            # the metadata records are padded for finalizing them on close
+            records = self.format.backend.get_metadata_records(self.attrs)
+            self._sizes = {key: len(val) + reserve for key, val in records.items()}
+        header = self._header()
+        self.offset = len(header)
+        size = self.offset + self.attrs["nbytes"]
+
+        if self.comm is None:
+            # pylint: disable=consider-using-with
+            self._file = open(self.filename, "wb", buffering=0)
+            self._file.write(header)
+            self._file.truncate(size)
+            return
+
+        mode = self.MPI.MODE_WRONLY | self.MPI.MODE_CREATE
+        self._file = self.MPI.File.Open(self.comm, self.filename, amode=mode)
+        if self.root:
+            self._file.Write_at(0, header)
+        self._file.Set_size(size)
+
+    def _create_dataset(self):
+        hdf5 = self.format.backend
+        if self.comm is None:
+            self._file = hdf5.File(self.filename, "a")
+        else:
+            try:
+                self._file = hdf5.File(
+                    self.filename, "a", driver="mpio", comm=self.comm
+                )
+            except OSError:
+                self._file = hdf5.File(
+                    self.filename, "w", driver="mpio", comm=self.comm
+                )
+        self._dset = hdf5.create_dataset(
+            self._file, self.key or "/", self.shape, self.dtype, self.attrs
+        )
+
+    def _to_box(self, data, box, post):
+        "Returns a contiguous array with the shape of the box"
+        shape = tuple(len(range(sl.start, sl.stop, sl.step)) for sl in box)
+        if slice(None, None, -1) in post:
+            arr = numpy.empty(shape, dtype=self.dtype)
+            arr[post] = data
+            return arr
+        selected = tuple(n for n, key in zip(shape, post) if isinstance(key, slice))
+        arr = numpy.broadcast_to(numpy.asarray(data), selected)
+        return numpy.ascontiguousarray(arr, dtype=self.dtype).reshape(shape)
+
+    def __setitem__(self, key, data):
+        if self.closed:
+            raise ValueError("I/O operation on closed writer")
+        box, post = split_key(key, self.shape)
+        arr = self._to_box(data, box, post)
+
+        if self._pool is None:
+            self._write(box, arr)
+            return
+
+        # snapshot of the data, since the buffer can be reused by the caller
+        if numpy.may_share_memory(arr, data):
+            arr = arr.copy()
+        while len(self._pending) >= self._max_pending:
+            done, self._pending = wait(self._pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                future.result()
+        self._pending.add(self._pool.submit(self._write, box, arr))
+
+    def _write(self, box, arr):
+        # empty slabs are skipped, but take part in the collective writes
+        if not arr.size and (self._dset is not None or not self.collective):
+            return
+        with metrics.measure("writer.write", self.name, self.filename, arr.nbytes):
+            if self._dset is not None:
+                self._dset[box] = arr
+                return
+
+            itemsize = self.dtype.itemsize
+            view = memoryview(arr.reshape(-1).view("u1"))
+            runs = [
+                (self.offset + start * itemsize, count * itemsize)
+                for start, count in box_runs(self.shape, box)
+                if count
+            ]
+            if self.collective:
+                self._write_all(view, runs)
+                return
+
+            pos = 0
+            for offset, nbytes in runs:
+                if self.comm is None:
+                    _pwrite(self._file, view[pos : pos + nbytes], offset)
+                else:
+                    self._file.Write_at(offset, view[pos : pos + nbytes])
+                pos += nbytes
+
+    def _write_all(self, view, runs):
+        "Collective write of the runs through a file view"
+        MPI = self.MPI
+        filetype = MPI.BYTE.Create_hindexed(
+            [nbytes for _, nbytes in runs], [offset for offset, _ in runs]
+        ).Commit()
+        try:
+            self._file.Set_view(0, MPI.BYTE, filetype)
+            self._file.Write_all(view)
+        finally:
+            filetype.Free()
+
+    def wait(self):
+        "Waits for the pending writes (thread-backed mode). Raises their errors."
+        pending, self._pending = self._pending, set()
+        for future in wait(pending).done:
+            future.result()
+
+    def close(self):
+        """
+        Waits for the pending writes, finalizes the metadata and closes the file.
+        Collective operation: the metadata is finalized and the file closed also
+        if a write has failed, such that all the ranks can call it after an error.
+        The error is raised afterwards.
+        """
+        if self.closed:
+            return
+        self.closed = True
+        try:
+            if self._pool is not None:
+                try:
+                    self.wait()
+                finally:
+                    self._pool.shutdown()
+        finally:
+            try:
+                self._finalize()
+            finally:
+                if self.comm is not None and self._dset is None:
+                    self._file.Close()
+                else:
+                    self._file.close()
+                header_cache.invalidate(self.filename)
+
+    def _finalize(self):
+        if self._dset is not None:
+            # pylint: disable=protected-access
+            self.format.backend._write_attrs(self._dset, self.attrs)
+            return
+        if self.name != "lime":
+            return
+        # the metadata can be updated in attrs until closing
+        header = self._header()
+        if self.comm is None:
+            _pwrite(self._file, memoryview(header), 0)
+            return
+        if self.collective:
+            self._file.Set_view(0, self.MPI.BYTE, self.MPI.BYTE)
+        if self.root:
+            self._file.Write_at(0, header)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, traceback):
+        self.close()
+
+    def __repr__(self):
+        return (
+            f"Writer({self.filename!r}, shape={self.shape}, dtype={self.dtype}, "
+            f"format={self.format.name})"
+        )
+
+
+def open_writer(filename, shape, dtype, format=None, **kwargs):
+    """
+    Returns a Writer for writing an array of given (global) shape and dtype
+    slab by slab, in any order, e.g.
+
+        with open_writer("prop.lime", (T, L, L, L, 4, 3), "complex128") as out:
+            for t in range(T):
+                out[t] = solve(t)
+
+    Parameters
+    ----------
+    filename: str
+        The file to write (it can be a dataset of an HDF5 file, e.g. file.h5/key).
+    shape: tuple
+        The global shape of the array.
+    dtype: data-type
+        The dtype of the array (big-endian for lime files).
+    format: str, Format
+        Either numpy, lime or HDF5. If not given, deduced from the extension.
+    comm: MPI.Comm
+        If given, the file is opened by all the ranks that write their slabs
+        with independent positioned writes (collective operations).
+    collective: bool
+        If True (and comm is given), the slabs are written with collective
+        writes, i.e. all the ranks must assign the same number of (possibly
+        empty) slabs. Not used for HDF5 datasets.
+    workers: int
+        If given, the slabs are written on a pool of threads. The data is
+        copied when needed, such that the buffers can be reused immediately.
+    metadata: dict
+        Additional metadata for the header (lime) or the attributes (HDF5).
+        It can be updated in writer.attrs until closing.
+    reserve: int
+        Bytes reserved for each lime metadata record for updating it on close.
+    """
+    # pylint: disable=redefined-builtin
+    return Writer(filename, shape, dtype, format=format, **kwargs)
@@ -0,0 +1,32 @@
+from pytest import raises
+from lyncs_io.testing import mark_dask
+
+
+@mark_dask
+def test_Dask_scaling():
+    from lyncs_io.benchmarks.dask_scaling import run_dask_scaling, default_chunks
+
+    assert default_chunks((16, 16)) == [8, 4, 6, 3]
+
+    report = run_dask_scaling(
+        shape=(8, 8),
+        dtype="float64",
+        workers=[1, 2],
+        chunks=[4, 3],
+        processes=False,
+        repeat=1,
+    )
+    results = report["results"]
+    assert len(results) == 2 * 2 * 2 * 2
+    for res in results:
+        assert res["ntasks"] > 0 and res["graph"] > 0 and res["wall"] > 0
+        if res["operation"] == "save":
+            assert res["lock"] >= 0
+    # misaligned chunks produce more blocks
+    saves = [res for res in results if res["operation"] == "save"]
+    assert max(res["ntasks"] for res in saves if res["chunks"] == 3) > max(
+        res["ntasks"] for res in saves if res["chunks"] == 4
+    )
+
+    with raises(ValueError):
+        run_dask_scaling(shape=(8, 8), repeat=0)
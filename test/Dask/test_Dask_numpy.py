@@ -103,3 +103,15 @@ def test_Dask_numpy_write_update(client, tempdir, dtype, workers):
         filesz = offset + size * x_out.itemsize
 
         assert os.stat(ftmp).st_size == filesz
+
+
+@mark_dask
+def test_Dask_lime_load(client, tempdir):
+    ftmp = tempdir + "/foo_lime_daskio_load.lime"
+    x_ref = generate_rand_arr((10, 10), "float64")
+    io.save(x_ref, ftmp)
+
+    x_lazy_in = io.load(ftmp, chunks=5)
+    assert isinstance(x_lazy_in, da.Array)
+    assert x_lazy_in.dtype == io.head(ftmp)["dtype"]
+    assert (x_ref == x_lazy_in.compute()).all()
@@ -0,0 +1,34 @@
+import json
+import numpy
+
+import lyncs_io as io
+from lyncs_io import trace
+from lyncs_io.testing import client, tempdir, mark_dask
+
+try:
+    import dask.array as da
+except ImportError:
+    pass
+
+
+@mark_dask
+def test_Dask_trace(client, tempdir):
+    trace.clear(client=client)
+    trace.start(client=client)
+
+    x_lazy = da.array(numpy.random.rand(10, 10)).rechunk(chunks=5)
+    io.save(x_lazy, tempdir + "/foo.npy").compute()
+
+    trace.stop(client=client)
+    trace.save(tempdir + "/trace.json", client=client)
+    trace.clear(client=client)
+
+    with open(tempdir + "/trace.json") as fptr:
+        events = json.load(fptr)["traceEvents"]
+    names = [
+        event["args"]["name"] for event in events if event["name"] == "process_name"
+    ]
+    assert any(name.startswith("worker") for name in names)
+    writes = [event for event in events if event["name"] == "dask.write"]
+    assert len(writes) == 4
+    assert all(event["pid"] > 0 for event in writes)
@@ -0,0 +1,30 @@
+from lyncs_io.testing import mark_mpi, get_comm
+
+
+@mark_mpi
+def test_MPI_scaling():
+    from lyncs_io.benchmarks.scaling import run_scaling, group_sizes
+
+    comm = get_comm()
+    for scaling in ("strong", "weak"):
+        report = run_scaling(
+            lattices=["8x8"],
+            site=(2,),
+            dtypes=["float64"],
+            formats=["npy", "lime"],
+            scaling=scaling,
+            max_grids=2,
+            repeat=1,
+        )
+        if comm.rank != 0:
+            assert report is None
+            continue
+
+        results = report["results"]
+        assert {res["nprocs"] for res in results} == set(group_sizes(comm.size))
+        assert {res["operation"] for res in results} == {"save", "load"}
+        assert all(res["aggregate"] > 0 for res in results)
+        assert any(res["efficiency"] == 1 for res in results)
+        if scaling == "weak":
+            for res in results:
+                assert res["local_shape"] == [8, 8, 2]
@@ -118,3 +118,175 @@ def test_MPI_decomposition_Decomposition_Cartesian(tempdir_MPI, procs, shape):
         assert dglobalsz == cglobalsz
         assert dlocalsz == clocalsz
         assert dstart == cstart
+
+
+@mark_mpi
+def test_MPI_decomposition_plans(tempdir_MPI):
+    from mpi4py import MPI
+    from lyncs_io.decomposition import plans
+    import numpy
+    import lyncs_io as io
+
+    topo = MPI.COMM_WORLD.Create_cart(dims=[MPI.COMM_WORLD.size])
+    dec = Decomposition(comm=topo)
+    shape = (2 * topo.size, 3)
+
+    assert dec.decompose(shape) is dec.decompose(shape)
+    assert dec.subcomms() is Decomposition(comm=topo).subcomms()
+    assert dec.compose(dec.decompose(shape)[1]) == dec.decompose(shape)
+
+    # repeated saves and loads reuse the plans and the committed datatypes
+    arr = numpy.random.rand(2, 3)
+    ftmp = tempdir_MPI + "plans.npy"
+    io.save(arr, ftmp, comm=topo)
+    assert (io.load(ftmp, comm=topo) == arr).all()
+    before = len(plans)
+    for _ in range(3):
+        io.save(arr, ftmp, comm=topo)
+        assert (io.load(ftmp, comm=topo) == arr).all()
+        assert len(plans) == before
+
+    plans.release()
+    assert len(plans) == 0
+    topo.Free()
+
+
+@mark_mpi
+def test_MPI_decomposition_custom(tempdir_MPI):
+    from mpi4py import MPI
+    import numpy
+    import lyncs_io as io
+
+    comm = MPI.COMM_WORLD
+    size, rank = comm.size, comm.rank
+    shape = (3, 4 * size + 1, 2)
+
+    # axis mapping
+    dec = Decomposition(comm=comm, axes=[1])
+    sizes, subsizes, starts = dec.decompose(shape)
+    assert subsizes[0] == 3 and subsizes[2] == 2
+    assert sum(comm.allgather(subsizes[1])) == shape[1]
+    assert dec.compose(subsizes) == (sizes, subsizes, starts)
+
+    # alignment: even extents but the last one
+    dec = Decomposition(comm=comm, axes=[1], align=2)
+    _, subsizes, starts = dec.decompose(shape)
+    assert starts[1] % 2 == 0
+    if rank < size - 1:
+        assert subsizes[1] % 2 == 0
+
+    # per-rank blocks and partition functions
+    blocks = [[4] * (size - 1) + [5]]
+    dec = Decomposition(comm=comm, axes=[1], blocks=blocks)
+    assert dec.decompose(shape)[1][1] == blocks[0][rank]
+    with pytest.raises(ValueError):
+        dec.decompose((3, 4 * size, 2))
+    with pytest.raises(ValueError):
+        Decomposition(comm=comm, blocks=blocks, partition=lambda n, p: [n])
+
+    def first(total, parts):
+        return [total - parts + 1] + [1] * (parts - 1)
+
+    dec = Decomposition(comm=comm, axes=[-1], partition=first)
+    _, subsizes, _ = dec.decompose((5, size + 3))
+    assert subsizes[1] == (4 if rank == 0 else 1)
+
+    # consistent in MpiIO and HDF5
+    arr = numpy.full((4, 2 + rank % 2 * 2, 3), rank, dtype="float64")
+    options = dict(axes=[1], partition=lambda n, p: comm.allgather(arr.shape[1]))
+    for ext in ["npy", "lime"]:
+        ftmp = f"{tempdir_MPI}custom.{ext}"
+        io.save(arr, ftmp, comm=comm, decomposition=options)
+        full = io.load(ftmp)
+        assert full.shape == (4, sum(comm.allgather(arr.shape[1])), 3)
+        assert (io.load(ftmp, comm=comm, decomposition=options) == arr).all()
+
+    with pytest.raises(ValueError):
+        dec = Decomposition(comm=comm, blocks=[[1] * size])
+        dec.compose((2, 3))
+
+
+@mark_mpi
+@pytest.mark.parametrize("block", [1, 2, 3])
+def test_MPI_decomposition_cyclic(tempdir_MPI, block):
+    from mpi4py import MPI
+    import numpy
+    import lyncs_io as io
+
+    comm = MPI.COMM_WORLD
+    dims = MPI.Compute_dims(comm.size, 2)
+    cart = comm.Create_cart(dims=dims)
+    shape = (3 * dims[0] + 1, 2 * dims[1] + 1, 2)
+    dec = Decomposition(comm=cart, cyclic=block)
+
+    _, subsizes, _ = dec.decompose(shape)
+    idx = dec.local_indices(shape)
+    assert tuple(map(len, idx)) == subsizes
+    assert sum(cart.allgather(numpy.prod(subsizes))) == numpy.prod(shape)
+
+    arr = numpy.arange(numpy.prod(shape), dtype="float64").reshape(shape)
+    for ext in ["npy", "lime"]:
+        ftmp = f"{tempdir_MPI}cyclic.{ext}"
+        if cart.rank == 0:
+            io.save(arr, ftmp)
+        cart.Barrier()
+
+        # one collective read of the local blocks
+        local = io.load(ftmp, comm=cart, decomposition=dec)
+        assert (local == arr[numpy.ix_(*idx)]).all()
+
+        io.save(local, ftmp, comm=cart, decomposition=dict(cyclic=block))
+        cart.Barrier()
+        assert (io.load(ftmp) == arr).all()
+
+    with pytest.raises(ValueError):
+        Decomposition(comm=cart, cyclic=block, align=2)
+    with pytest.raises(ValueError):
+        Decomposition(comm=cart, cyclic=block, axes=[1, 0])
+    cart.Free()
+
+
+@mark_mpi
+@pytest.mark.parametrize("periodic", [True, False])
+@pytest.mark.parametrize("halo", [1, (2, 1, 0)])
+def test_MPI_decomposition_halo(tempdir_MPI, halo, periodic):
+    from mpi4py import MPI
+    import numpy
+    import lyncs_io as io
+
+    comm = MPI.COMM_WORLD
+    dims = MPI.Compute_dims(comm.size, 2)
+    cart = comm.Create_cart(dims=dims)
+    shape = (2 * dims[0] + 1, 3 * dims[1], 2)
+    dec = Decomposition(comm=cart)
+    _, subsizes, starts = dec.decompose(shape)
+    widths = (halo, halo, 0) if isinstance(halo, int) else halo
+
+    arr = numpy.arange(numpy.prod(shape), dtype="float64").reshape(shape)
+    mode = "wrap" if periodic else "constant"
+    padded = numpy.pad(arr, [(width, width) for width in widths], mode=mode)
+    expected = padded[
+        tuple(
+            slice(start, start + size + 2 * width)
+            for start, size, width in zip(starts, subsizes, widths)
+        )
+    ]
+
+    for ext in ["npy", "lime"]:
+        ftmp = f"{tempdir_MPI}halo.{ext}"
+        if cart.rank == 0:
+            io.save(arr, ftmp)
+        cart.Barrier()
+
+        local = io.load(ftmp, comm=cart, halo=halo, periodic=periodic)
+        assert local.shape == expected.shape
+        assert (local == expected).all()
+
+        # lime arrays are big-endian
+        out = numpy.ones(expected.shape, dtype=local.dtype)
+        io.load(ftmp, comm=cart, halo=halo, periodic=periodic, out=out)
+        assert (out == expected).all()
+
+    with pytest.raises(ValueError):
+        io.load(ftmp, halo=halo)
+    cart.Free()
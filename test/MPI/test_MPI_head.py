@@ -0,0 +1,48 @@
+import numpy as np
+from pytest import raises, mark, param
+
+import lyncs_io as io
+from lyncs_io import metrics
+from lyncs_io.mpi_io import on_root
+from lyncs_io.testing import mark_mpi, tempdir_MPI, get_comm, skip_hdf5
+
+
+@mark_mpi
+@mark.parametrize(
+    "ext", ["npy", "lime", "tar/arr.npy", param("h5/arr", marks=skip_hdf5)]
+)
+def test_MPI_head(tempdir_MPI, ext):
+    comm = get_comm()
+    arr = np.random.rand(4, 3)
+    ftmp = f"{tempdir_MPI}arr.{ext}"
+    # an error in the save is raised on all the ranks
+    on_root(comm, io.save, arr, ftmp)
+    comm.Barrier()
+
+    io.utils.header_cache.invalidate()
+    metrics.reset()
+    metrics.enable()
+    try:
+        header = io.head(ftmp, comm=comm)
+    finally:
+        metrics.disable()
+
+    assert header["shape"] == arr.shape
+    assert header == comm.bcast(header, root=0)
+    # only rank 0 parses the header
+    parsed = any(stage == "head" for stage, _ in metrics.summary())
+    assert parsed == (comm.rank == 0)
+
+
+@mark_mpi
+@mark.parametrize("fmt,ext", [("numpy", "npy"), ("lime", "lime")])
+def test_MPI_format_head(tempdir_MPI, fmt, ext):
+    comm = get_comm()
+    ftmp = f"{tempdir_MPI}arr.{ext}"
+    on_root(comm, io.save, np.zeros((2, 3)), ftmp, format=fmt)
+    comm.Barrier()
+
+    backend = io.formats[fmt].backend
+    assert backend.head(ftmp, comm=comm)["shape"] == (2, 3)
+    with raises(FileNotFoundError):
+        backend.head(f"{tempdir_MPI}missing.{ext}", comm=comm)
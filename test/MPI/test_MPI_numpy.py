@@ -128,3 +128,78 @@ def test_MPI_save_cart(tempdir_MPI, dtype, lshape, procs, format):
 
     global_array = io.load(ftmp, format=format)
     assert (local_array == global_array[slices]).all()
+
+
+@mark_mpi
+@lshape_loop  # enables local domain
+@parallel_format_loop
+def test_MPI_save_background(tempdir_MPI, lshape, format):
+
+    comm = get_comm()
+    rank = comm.rank
+    ftmp = tempdir_MPI + "/mpiio_save_background"
+    if format == "hdf5":
+        if skip_hdf5_mpi.args[0]:
+            return
+        ftmp += ".h5/data"
+
+    if format == "tar":
+        ftmp += ".tar/data.npy"
+
+    write_global_array(comm, ftmp, lshape, format=format)
+    global_array = io.load(ftmp, format=format)
+
+    slc = tuple(slice(rank * lshape[i], (rank + 1) * lshape[i]) for i in range(1))
+    local_array = global_array[slc].copy()
+    orig = local_array.copy()
+
+    future = io.save(local_array, ftmp, comm=comm, format=format, background=True)
+    local_array[:] = 0  # the snapshot is written
+    future.result()
+    io.flush_all()
+    comm.Barrier()
+
+    global_array = io.load(ftmp, format=format)
+    assert (global_array[slc] == orig).all()
+
+
+@mark_mpi
+@dtype_mpi_loop
+@lshape_loop  # enables local domain
+def test_MPI_load_out(tempdir_MPI, dtype, lshape):
+    comm = get_comm()
+    rank = comm.rank
+    ftmp = tempdir_MPI + "/mpiio_load_out.npy"
+
+    write_global_array(comm, ftmp, lshape, dtype=dtype)
+    global_array = io.load(ftmp)
+
+    out = numpy.empty(lshape, dtype=dtype)
+    assert io.load(ftmp, comm=comm, out=out) is out
+
+    slc = tuple(slice(rank * lshape[i], (rank + 1) * lshape[i]) for i in range(1))
+    assert (global_array[slc] == out).all()
+
+
+@mark_mpi
+def test_MPI_trace(tempdir_MPI):
+    import json
+    from lyncs_io import trace
+
+    comm = get_comm()
+    ftmp = tempdir_MPI + "/mpiio_trace.npy"
+
+    trace.clear()
+    trace.start()
+    io.save(numpy.zeros((4, 4)), ftmp, comm=comm)
+    io.load(ftmp, comm=comm)
+    trace.stop()
+    trace.save(tempdir_MPI + "/trace.json", comm=comm)
+    trace.clear()
+
+    if comm.rank == 0:
+        with open(tempdir_MPI + "/trace.json") as fptr:
+            events = json.load(fptr)["traceEvents"]
+        reads = [event for event in events if event["name"] == "mpi.read"]
+        assert sorted(event["pid"] for event in reads) == list(range(comm.size))
+    comm.Barrier()
@@ -0,0 +1,25 @@
+import os
+import numpy as np
+
+import lyncs_io as io
+from lyncs_io.testing import mark_mpi, tempdir_MPI, get_comm
+
+
+@mark_mpi
+def test_MPI_transcode(tempdir_MPI):
+    comm = get_comm()
+    arrs = {f"cfg_{i}.lime": np.full((3, 4), i) for i in range(2 * comm.size + 1)}
+    if comm.rank == 0:
+        os.makedirs(f"{tempdir_MPI}/ens")
+        for key, arr in arrs.items():
+            io.save(arr, f"{tempdir_MPI}/ens/{key}")
+    comm.Barrier()
+
+    for dst in ("out.npz", "dir"):
+        results = io.transcode(
+            f"{tempdir_MPI}/ens", f"{tempdir_MPI}/{dst}", comm=comm, errors="raise"
+        )
+        assert set(results) == set(arrs)
+        comm.Barrier()
+        for key, arr in arrs.items():
+            assert np.array_equal(io.load(results[key]), arr)
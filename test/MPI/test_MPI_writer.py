@@ -0,0 +1,33 @@
+import numpy as np
+from pytest import mark
+
+import lyncs_io as io
+from lyncs_io.testing import mark_mpi, tempdir_MPI, get_comm
+
+
+@mark_mpi
+@mark.parametrize("ext", ["npy", "lime"])
+@mark.parametrize("collective", [False, True])
+def test_MPI_writer(tempdir_MPI, ext, collective):
+    comm = get_comm()
+    shape = (2 * comm.size + 1, 5, 4)
+    arr = np.arange(np.prod(shape), dtype="float64").reshape(shape)
+    ftmp = f"{tempdir_MPI}/writer_{collective}.{ext}"
+
+    with io.open_writer(
+        ftmp, shape, arr.dtype, comm=comm, collective=collective
+    ) as out:
+        # round-robin slices in reversed order, the same number per rank
+        for step in range(3):
+            t = shape[0] - 1 - (step * comm.size + comm.rank)
+            if t >= 0:
+                out[t] = arr[t]
+            else:
+                out[0:0] = arr[0:0]
+        if comm.rank == 0:
+            out.attrs["rank"] = comm.rank
+    comm.Barrier()
+
+    assert np.array_equal(io.load(ftmp), arr)
+    if ext == "lime":
+        assert io.head(ftmp)["rank"] == 0
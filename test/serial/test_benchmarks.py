@@ -0,0 +1,64 @@
+import json
+from pytest import raises
+
+from lyncs_io.benchmarks import run, parse_size, compare, cases
+from lyncs_io.benchmarks.suite import Mode
+from lyncs_io.benchmarks.__main__ import main
+from lyncs_io.testing import tempdir
+
+
+def test_parse_size():
+    assert parse_size(10) == 10
+    assert parse_size("1KB") == 1024
+    assert parse_size("1.5 GiB") == 3 * 2**29
+    assert parse_size("20G") == 20 * 2**30
+    with raises(ValueError):
+        parse_size("1 parsec")
+
+
+def test_run(tempdir):
+    report = run(
+        formats=["npy", "lime", "tar", "pickle"],
+        sizes=["1KB", "1MB"],
+        repeat=2,
+        directory=tempdir,
+        max_dense="1KB",
+    )
+    results = report["results"]
+    ops = {(res["format"], res["size"], res["operation"]) for res in results}
+    # sparse files for large arrays, save is not measured
+    assert ("npy", "1MB", "load") in ops and ("npy", "1MB", "save") not in ops
+    assert ("tar", "1MB", "load") not in ops
+    assert ("pickle", "1KB", "save") in ops and ("pickle", "1KB", "head") not in ops
+    assert all(len(res["times"]) == 2 for res in results)
+    assert all(res["throughput"] > 0 for res in results if res["operation"] == "load")
+
+    ratios = compare(report, report)
+    assert set(ratios.values()) == {1}
+
+    with raises(ValueError):
+        run(formats=["npy"], sizes=["1KB"], repeat=0, directory=tempdir)
+
+
+def test_run_without_save(tempdir, monkeypatch):
+    saves = []
+    save = Mode.save
+
+    def counted(self, arr, path):
+        saves.append(path)
+        save(self, arr, path)
+
+    monkeypatch.setattr(Mode, "save", counted)
+    report = run(formats=["npy"], sizes=["1KB"], operations=["load"], directory=tempdir)
+    # the file is written once for load
+    assert len(saves) == 1
+    assert [res["operation"] for res in report["results"]] == ["load"]
+
+
+def test_main(tempdir):
+    output = tempdir + "results.json"
+    main(["--formats", "npz", "--sizes", "1KB", "--repeat", "1", "--output", output])
+    with open(output) as fptr:
+        report = json.load(fptr)
+    assert report["metadata"]["mode"] == "serial"
+    assert [res["operation"] for res in report["results"]] == ["save", "head", "load"]
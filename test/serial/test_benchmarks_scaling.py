@@ -0,0 +1,66 @@
+import csv
+from pytest import raises
+
+from lyncs_io.benchmarks.scaling import (
+    parse_lattice,
+    group_sizes,
+    process_grids,
+    global_shape,
+    scaling_table,
+    run_scaling,
+    write_plot_data,
+    _add_efficiency,
+)
+from lyncs_io.testing import tempdir
+
+
+def test_grids():
+    assert parse_lattice("16x8x8x32") == (16, 8, 8, 32)
+    assert group_sizes(1) == [1]
+    assert group_sizes(6) == [1, 2, 4, 6]
+    assert process_grids(1, 4) == [(1,)]
+    assert process_grids(4, 2) == [(4,), (2, 2), (1, 4)]
+    assert process_grids(4, 2, max_grids=1) == [(4,)]
+    assert len(process_grids(12, 3)) == 18
+
+
+def test_global_shape():
+    assert global_shape((4, 4), (2,), site=(3,)) == (4, 4, 3)
+    assert global_shape((4, 4), (8,)) is None
+    assert global_shape((4, 4), (2,), scaling="weak") == (8, 4)
+    assert global_shape((4, 4), (2, 3), scaling="weak") == (8, 12)
+
+
+def test_table(tempdir):
+    def result(nprocs, grid, aggregate):
+        return dict(
+            scaling="strong",
+            format="npy",
+            operation="load",
+            dtype="float64",
+            lattice=[8, 8],
+            nprocs=nprocs,
+            grid=grid,
+            time=1 / aggregate,
+            aggregate=aggregate,
+            rank_min=aggregate / nprocs,
+            rank_max=aggregate / nprocs,
+            imbalance=1.0,
+        )
+
+    results = [result(1, [1], 1.0), result(2, [2], 1.5), result(2, [1, 2], 2.0)]
+    _add_efficiency(results)
+    assert [res["efficiency"] for res in results] == [1.0, 0.75, 1.0]
+
+    table = scaling_table(results)
+    assert len(table.splitlines()) == 4 and "75.0%" in table
+
+    write_plot_data(tempdir + "scaling.csv", results)
+    with open(tempdir + "scaling.csv") as fptr:
+        rows = list(csv.DictReader(fptr))
+    assert [row["grid"] for row in rows] == ["1", "2", "1x2"]
+
+
+def test_run_scaling_repeat():
+    with raises(ValueError):
+        run_scaling(repeat=0)
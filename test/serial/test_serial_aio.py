@@ -0,0 +1,100 @@
+import asyncio
+import time
+from concurrent.futures import CancelledError
+from threading import Event
+import numpy as np
+from pytest import raises
+import lyncs_io as io
+from lyncs_io import aio, pread
+from lyncs_io.testing import tempdir
+from lyncs_io.utils import read_array
+
+
+def test_serial_aio(tempdir):
+    arrs = [np.random.rand(10, 10) for _ in range(10)]
+
+    async def main():
+        await asyncio.gather(
+            *(aio.save(arr, tempdir + f"arr{i}.npy") for i, arr in enumerate(arrs))
+        )
+        await aio.save(arrs[0], tempdir + "arr.lime")
+        assert (await aio.load(tempdir + "arr.lime") == arrs[0]).all()
+        assert (await aio.head(tempdir + "arr0"))["shape"] == (10, 10)
+        return await asyncio.gather(
+            *(aio.load(tempdir + f"arr{i}.npy") for i in range(len(arrs)))
+        )
+
+    aio.set_limit(3)
+    for arr, out in zip(arrs, asyncio.run(main())):
+        assert (arr == out).all()
+
+    with raises(ValueError):
+        aio.set_limit(0)
+
+
+def test_serial_aio_cancel(tempdir):
+    arr = np.random.rand(10, 10)
+    io.save(arr, tempdir + "arr.npy")
+
+    # The cancel event is set when the coroutine is cancelled
+    started = Event()
+
+    def blocking(cancel=None):
+        started.set()
+        while not cancel.is_set():
+            cancel.wait(0.01)
+        return "cancelled"
+
+    async def main():
+        cancel = Event()
+        task = asyncio.create_task(aio.run(blocking, cancel=cancel))
+        while not started.is_set():
+            await asyncio.sleep(0.01)
+        task.cancel()
+        with raises(asyncio.CancelledError):
+            await task
+        return cancel
+
+    assert asyncio.run(main()).is_set()
+
+    cancel = Event()
+    cancel.set()
+    with raises(CancelledError):
+        read_array(tempdir + "arr.npy", (10, 10), "float64", cancel=cancel)
+    assert (io.load(tempdir + "arr.npy", cancel=Event()) == arr).all()
+
+
+def test_serial_aio_cancel_load(tempdir, monkeypatch):
+    arr = np.zeros(2**23)
+    io.save(arr, tempdir + "big.npy")
+
+    # slow reads of 1 MB each (see pread.MIN_RANGE), about 3 s in total
+    started, calls = Event(), []
+    preadv = pread._preadv
+
+    def slow_preadv(fd, view, offset):
+        calls.append(offset)
+        started.set()
+        time.sleep(0.05)
+        preadv(fd, view, offset)
+
+    monkeypatch.setattr(pread, "_preadv", slow_preadv)
+
+    async def main():
+        task = asyncio.create_task(aio.load(tempdir + "big.npy"))
+        while not started.is_set():
+            await asyncio.sleep(0.01)
+        task.cancel()
+        with raises(asyncio.CancelledError):
+            await task
+        # the only thread of the pool is free once the read has stopped
+        await aio.run(int)
+
+    previous = pread.configure_reads(threads=1)
+    aio.set_limit(1)
+    try:
+        asyncio.run(main())
+    finally:
+        pread.configure_reads(*previous)
+        aio.set_limit(16)
+    assert 0 < len(calls) < arr.nbytes // pread.MIN_RANGE
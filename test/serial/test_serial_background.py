@@ -0,0 +1,36 @@
+import numpy as np
+from pytest import raises
+import lyncs_io as io
+from lyncs_io import background
+from lyncs_io.testing import tempdir
+
+
+def test_serial_background(tempdir):
+    arr = np.random.rand(10, 10)
+    orig = arr.copy()
+
+    for ext in ["npy", "lime", "pkl"]:
+        future = io.save(arr, tempdir + "arr." + ext, background=True)
+        arr[:] = 0  # modifying after save does not affect the file
+        future.result()
+        assert (io.load(tempdir + "arr." + ext) == orig).all()
+        arr[:] = orig
+
+    background.set_limit(2)
+    futures = [
+        io.save({"arr": arr * i}, tempdir + f"arr{i}.pkl", background=True)
+        for i in range(10)
+    ]
+    assert len(background._outstanding) <= 2
+    io.flush_all()
+    assert all(future.done() for future in futures)
+    assert (io.load(tempdir + "arr3.pkl")["arr"] == orig * 3).all()
+
+    # ndarray is not JSON serializable
+    io.save(arr, tempdir + "arr.json", background=True)
+    with raises(TypeError):
+        io.flush_all()
+
+    with raises(ValueError):
+        background.set_limit(0)
+    background.set_limit(4)
@@ -0,0 +1,69 @@
+from concurrent.futures import ThreadPoolExecutor
+from threading import Lock
+from time import sleep
+import numpy as np
+from pytest import raises
+import lyncs_io as io
+from lyncs_io.batch import run_many
+from lyncs_io.testing import tempdir
+
+
+def test_serial_batch(tempdir):
+    arrs = {tempdir + f"arr{i}.npy": np.random.rand(10, i + 1) for i in range(8)}
+
+    results = io.save_many(arrs, workers=3, max_bytes=200)
+    assert results == [None] * len(arrs)
+
+    for executor in ["thread", "process"]:
+        loaded = io.load_many(arrs, workers=2, executor=executor, max_bytes=1)
+        for arr, out in zip(arrs.values(), loaded):
+            assert (arr == out).all()
+
+    with ThreadPoolExecutor(2) as pool:
+        heads = io.head_many(arrs, executor=pool)
+    assert [head["shape"] for head in heads] == [arr.shape for arr in arrs.values()]
+
+    # per-item errors
+    filenames = [tempdir + "arr0.npy", tempdir + "missing.npy"]
+    loaded = io.load_many(filenames)
+    assert (loaded[0] == arrs[tempdir + "arr0.npy"]).all()
+    assert isinstance(loaded[1], FileNotFoundError)
+
+    with raises(FileNotFoundError):
+        io.load_many(filenames, errors="raise")
+
+    with raises(ValueError):
+        io.load_many(filenames, executor="unknown")
+
+
+def test_serial_run_many():
+    calls = [((i,), {}, 1) for i in range(10)]
+    lock = Lock()
+    running = [0, 0]  # current, max
+
+    def square(i):
+        with lock:
+            running[0] += 1
+            running[1] = max(running)
+        sleep(0.01)
+        with lock:
+            running[0] -= 1
+        return i**2
+
+    assert run_many(square, calls, workers=8, max_bytes=2) == [i**2 for i in range(10)]
+    assert running[1] <= 2
+    with raises(ValueError):
+        run_many(print, calls, errors="ignore")
+
+    # the calls not started are cancelled at the first failure
+    started = []
+
+    def fail_first(i):
+        started.append(i)
+        if i == 0:
+            raise RuntimeError("failed")
+        sleep(0.01)
+
+    with raises(RuntimeError):
+        run_many(fail_first, iter(calls), workers=1, errors="raise")
+    assert len(started) < len(calls)
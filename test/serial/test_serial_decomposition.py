@@ -0,0 +1,60 @@
+from lyncs_io.decomposition import PlanCache
+
+
+class Handle:
+    "Stand-in for MPI communicators and datatypes"
+
+    def __init__(self, handle=0):
+        self.handle = handle
+        self.freed = False
+
+    def py2f(self):
+        return self.handle
+
+    def Free(self):
+        self.freed = True
+
+
+def test_plan_cache():
+    plans = PlanCache(maxsize=2)
+    comm, other = Handle(1), Handle(2)
+
+    created = []
+
+    def create(value):
+        def fnc():
+            created.append(value)
+            return value
+
+        return fnc
+
+    types = [Handle() for _ in range(3)]
+    assert plans.get(comm, "a", create(types[0])) is types[0]
+    assert plans.get(comm, "a", create(None)) is types[0]
+    assert plans.get(comm, "b", create(types[1])) is types[1]
+    assert plans.get(other, "a", create((1, 2))) == (1, 2)
+    assert len(plans) == 3
+    assert created == [types[0], types[1], (1, 2)]
+
+    # the least recently used datatype is freed
+    plans.get(comm, "a", create(None))
+    plans.get(comm, "c", create(types[2]))
+    assert types[1].freed and not types[0].freed
+
+    subs = [Handle(), Handle()]
+    assert plans.subcomms(comm, ((2,), (0,)), create(subs)) is subs
+    assert plans.subcomms(comm, ((2,), (0,)), create(None)) is subs
+    # a different topology for the same handle
+    new = [Handle()]
+    assert plans.subcomms(comm, ((1,), (0,)), create(new)) is new
+    assert all(sub.freed for sub in subs)
+
+    plans.release(comm)
+    assert types[0].freed and types[2].freed and new[0].freed
+    assert len(plans) == 1
+    plans.release()
+    assert len(plans) == 0
+
+    plans.enabled = False
+    assert plans.get(comm, "a", create(types[0])) is types[0]
+    assert len(plans) == 0
@@ -1,5 +1,28 @@
+import os
+import sys
+from subprocess import run
+import numpy
 from pytest import raises
+import lyncs_io as io
 from lyncs_io.format import Formats
+from lyncs_io.formats import formats
+from lyncs_io.testing import tempdir, with_hdf5
+
+IMPORT_BUDGET_EXCLUDES = [
+    "lyncs_io.numpy",
+    "lyncs_io.lime",
+    "lyncs_io.hdf5",
+    "lyncs_io.openqcd",
+    "lyncs_io.mpi_io",
+    "lyncs_io.dask_io",
+    "h5py",
+    "dill",
+    "dask",
+    "mpi4py",
+    "lyncs_cppyy",
+    "xmltodict",
+    "filelock",
+]
 
 
 def test_serial_error():
@@ -13,3 +36,109 @@ def test_serial_error():
 
     with raises(ImportError):
         formats.get_format(filename="foo.bar")
+
+
+def test_serial_lazy():
+    formats = Formats()
+    formats.register(
+        "lazy", extensions=["bar"], module="lyncs_io.not_a_module", load="load"
+    )
+    fmt = formats["lazy"]
+    assert fmt.error is None
+    assert fmt.available
+
+    with raises(ImportError):
+        fmt.load("foo.bar")
+    assert not fmt.available
+
+    with raises(ImportError):
+        formats.get_format(filename="foo.bar")
+
+    with raises(ValueError):
+        formats.register("broken", extensions=["bar"], load="load")
+
+
+def test_serial_available():
+    from lyncs_io.lib import with_lib
+
+    names = [fmt.name.lower() for fmt in formats.available()]
+    assert "numpy" in names
+    # loading and saving openqcd files need the compiled library
+    assert ("openqcd" in names) == with_lib
+
+
+def test_serial_import_budget():
+    # Backends and their dependencies must not be imported by `import lyncs_io`
+    code = "import sys, lyncs_io; print(' '.join(sys.modules))"
+    out = run([sys.executable, "-c", code], capture_output=True, check=True)
+    modules = out.stdout.decode().split()
+
+    for module in IMPORT_BUDGET_EXCLUDES:
+        assert module not in modules
+
+
+def test_serial_sniff(tempdir):
+    arr = numpy.arange(10)
+
+    for ext, fmt in [
+        ("npy", "numpy"),
+        ("npz", "numpyz"),
+        ("lime", "lime"),
+        ("tar/arr.npy", "tar"),
+        ("tgz/arr.npy", "tar"),
+        ("pkl", "pickle"),
+    ] + ([("h5", "hdf5")] if with_hdf5 else []):
+        ftmp = tempdir + "foo." + ext
+        io.save(arr, ftmp)
+        ftmp = ftmp.split("/arr.npy")[0]
+        assert formats.get_format(filename=ftmp) is formats[fmt]
+
+        # without extension
+        os.rename(ftmp, tempdir + "foo")
+        assert formats.get_format(filename=tempdir + "foo") is formats[fmt]
+        # with wrong extension
+        wrong = tempdir + ("foo.npy" if fmt != "numpy" else "foo.lime")
+        os.rename(tempdir + "foo", wrong)
+        assert formats.get_format(filename=wrong) is formats[fmt]
+        os.remove(wrong)
+
+    io.save(arr, tempdir + "foo.npy")
+    os.rename(tempdir + "foo.npy", tempdir + "foo")
+    assert (io.load(tempdir + "foo") == arr).all()
+    assert io.head(tempdir + "foo")["shape"] == arr.shape
+
+    io.save(arr, tempdir + "foo.tar/arr.npy")
+    os.rename(tempdir + "foo.tar", tempdir + "bar")
+    assert (io.load(tempdir + "bar/arr.npy") == arr).all()
+
+    # unknown content and no extension
+    with open(tempdir + "unknown", "w") as fptr:
+        fptr.write("unknown")
+    with raises(ValueError):
+        formats.get_format(filename=tempdir + "unknown")
+
+
+class SelfComm:
+    "Communicator of a single rank"
+
+    rank = 0
+    size = 1
+
+
+def test_serial_head_comm(tempdir):
+    comm = SelfComm()
+    arr = numpy.arange(12).reshape(3, 4)
+    for ext in ["npy", "lime"] + (["h5/arr"] if with_hdf5 else []):
+        ftmp = tempdir + "comm." + ext
+        io.save(arr, ftmp)
+        assert io.head(ftmp, comm=comm) == io.head(ftmp)
+    assert io.formats["lime"].backend.head(tempdir + "comm.lime", comm=comm) == (
+        io.head(tempdir + "comm.lime")
+    )
+
+    with raises(FileNotFoundError):
+        io.head(tempdir + "missing.npy", comm=comm)
+
+    io.save(arr, tempdir + "comm.tar/arr.npy")
+    archive = io.head(tempdir + "comm.tar", comm=comm)
+    assert archive.loader.kwargs["comm"] is comm
@@ -3,7 +3,14 @@ import lyncs_io as io
 import numpy as np
 import tempfile
 
-from lyncs_io.testing import dtype_loop, shape_loop, skip_hdf5, generate_rand_arr
+from pytest import raises
+from lyncs_io.testing import (
+    dtype_loop,
+    shape_loop,
+    skip_hdf5,
+    generate_rand_arr,
+    tempdir,
+)
 
 
 @skip_hdf5
@@ -29,3 +36,18 @@ def test_serial_hdf5(dtype, shape):
         # Testing Head
         assert list(io.load(ftmp).keys()) == list(io.head(ftmp).keys())
         assert io.load(ftmp)["arr0"].shape == io.head(ftmp)["arr0"]["shape"]
+
+
+@skip_hdf5
+def test_serial_hdf5_out(tempdir):
+    arr = np.random.rand(10, 10)
+    io.save(arr, tempdir + "foo.h5/arr")
+
+    out = np.empty_like(arr)
+    assert io.load(tempdir + "foo.h5/arr", out=out) is out
+    assert (out == arr).all()
+
+    with raises(ValueError):
+        io.load(tempdir + "foo.h5/arr", out=np.empty((5, 5)))
+    with raises(ValueError):
+        io.load(tempdir + "foo.h5", out=out)
@@ -0,0 +1,83 @@
+import numpy as np
+from pytest import raises, mark
+
+import lyncs_io as io
+from lyncs_io.lazy import LazyArray, RawReader, split_key
+from lyncs_io.testing import tempdir, with_hdf5
+
+keys = [
+    0,
+    -1,
+    (1, 2),
+    slice(1, 3),
+    (slice(None), 2),
+    (Ellipsis, slice(None, None, 2)),
+    (slice(None, None, -1), 1, slice(1, None, 3)),
+    (slice(3, 1), Ellipsis),
+    (1, slice(2, 5), slice(None, None, -2)),
+]
+
+
+@mark.parametrize("order", ["C", "F"])
+def test_raw_reader(tempdir, order):
+    arr = np.asarray(np.random.rand(4, 5, 6), order=order)
+    ftmp = tempdir + "/raw.dat"
+    with open(ftmp, "wb") as fptr:
+        fptr.write(b"x" * 10)
+        fptr.write(arr.tobytes(order="A"))
+
+    reader = RawReader(ftmp, arr.shape, arr.dtype, 10, order)
+    lazy = LazyArray(arr.shape, arr.dtype, reader)
+    for key in keys:
+        assert np.array_equal(lazy[key], arr[key])
+    assert np.array_equal(np.array(lazy), arr)
+
+    # a box of full inner axes is read in a single run
+    box, _ = split_key(1 if order == "C" else (Ellipsis, 1), arr.shape)
+    assert len(lazy.reader.runs(box)) == 1
+
+    with raises(IndexError):
+        lazy[4]
+    with raises(IndexError):
+        lazy[0, 0, 0, 0]
+    with raises(TypeError):
+        lazy[[0, 1]]
+
+
+@mark.parametrize("ext", ["npy", "lime"])
+def test_lazy_load(tempdir, ext):
+    arr = np.random.rand(4, 5, 6)
+    ftmp = f"{tempdir}/arr.{ext}"
+    io.save(arr, ftmp)
+
+    lazy = io.load(ftmp, lazy=True)
+    assert isinstance(lazy, LazyArray)
+    assert lazy.shape == arr.shape and lazy.dtype == io.head(ftmp)["dtype"]
+    for key in keys:
+        assert np.array_equal(lazy[key], arr[key])
+
+
+def test_lazy_tar(tempdir):
+    arr = np.random.rand(4, 5)
+    ftmp = tempdir + "/data.tar"
+    io.save(arr, ftmp + "/arr.npy")
+
+    lazy = io.load(ftmp + "/arr.npy", lazy=True)
+    assert isinstance(lazy, LazyArray)
+    assert np.array_equal(lazy[1:3, ::2], arr[1:3, ::2])
+
+    io.save(arr, tempdir + "/data.tar.gz/arr.npy")
+    with raises(ValueError):
+        io.load(tempdir + "/data.tar.gz/arr.npy", lazy=True)
+
+
+@mark.skipif(not with_hdf5, reason="h5py not available")
+def test_lazy_hdf5(tempdir):
+    arr = np.random.rand(4, 5, 6)
+    ftmp = tempdir + "/data.h5"
+    io.save({"cfg": arr}, ftmp)
+
+    lazy = io.load(ftmp, lazy=True)["cfg"]
+    assert isinstance(lazy, LazyArray)
+    for key in keys:
+        assert np.array_equal(lazy[key], arr[key])
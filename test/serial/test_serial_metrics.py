@@ -0,0 +1,92 @@
+import asyncio
+import logging
+import numpy as np
+from pytest import fixture
+
+import lyncs_io as io
+from lyncs_io import aio, metrics
+from lyncs_io.testing import tempdir
+
+
+@fixture
+def enabled():
+    metrics.reset()
+    metrics.enable()
+    yield
+    metrics.disable()
+    metrics.reset()
+
+
+def test_disabled(tempdir):
+    metrics.reset()
+    assert not metrics.is_enabled()
+    io.save(np.zeros(10), tempdir + "arr.npy")
+    assert metrics.summary() == {}
+    with metrics.measure("load") as record:
+        record.nbytes = 10
+    assert metrics.records() == []
+
+
+def test_metrics(tempdir, enabled):
+    arr = np.random.rand(10, 10)
+    io.save(arr, tempdir + "arr.lime")
+    io.load(tempdir + "arr.lime")
+    io.head(tempdir + "arr.lime")
+
+    stats = metrics.summary()
+    assert stats["save", "lime"]["calls"] == 1
+    assert stats["save", "lime"]["nbytes"] == arr.nbytes
+    assert stats["convert", "lime"]["copies"] == 1
+    assert stats["load", "lime"]["nbytes"] == arr.nbytes
+    assert stats["head", "lime"]["calls"] == 1
+    assert stats["header", "lime"]["calls"] >= 1
+    assert stats["load", "lime"]["throughput"] > 0
+
+    io.save(arr, tempdir + "data.tar.gz/arr.npy")
+    io.load(tempdir + "data.tar.gz/arr.npy")
+    assert metrics.summary()["tar.extract", "tar"]["nbytes"] > arr.nbytes
+
+    record = metrics.records()[-1]
+    assert record.stage == "load" and record.path == tempdir + "data.tar.gz/arr.npy"
+
+
+def test_metrics_aio(tempdir, enabled):
+    arr = np.random.rand(10, 10)
+
+    async def main():
+        await aio.save(arr, tempdir + "arr.npy")
+        await aio.head(tempdir + "arr.npy")
+        return await aio.load(tempdir + "arr.npy")
+
+    asyncio.run(main())
+    stats = metrics.summary()
+    assert stats["save", "numpy"]["nbytes"] == arr.nbytes
+    assert stats["head", "numpy"]["calls"] == 1
+    assert stats["load", "numpy"]["nbytes"] == arr.nbytes
+
+
+def test_metrics_background(tempdir, enabled):
+    arr = np.random.rand(10, 10)
+    io.save(arr, tempdir + "arr.npy", background=True).result()
+    assert metrics.summary()["save", "numpy"]["nbytes"] == arr.nbytes
+
+
+def test_sinks(tempdir, enabled, caplog):
+    calls = []
+    sink = metrics.add_sink(calls.append)
+    logs = metrics.add_sink(metrics.log_sink(level=logging.WARNING))
+    try:
+        io.save(np.zeros(10), tempdir + "arr.npy")
+        metrics.remove_sink(sink)
+        io.load(tempdir + "arr.npy")
+    finally:
+        metrics.remove_sink(logs)
+
+    assert [record.stage for record in calls] == ["save"]
+    assert "save numpy" in caplog.text
+
+    metrics.write_prometheus(tempdir + "io.prom")
+    with open(tempdir + "io.prom", encoding="utf-8") as fptr:
+        text = fptr.read()
+    assert "# TYPE lyncs_io_bytes_total counter" in text
+    assert 'lyncs_io_calls_total{stage="load",format="numpy"} 1' in text
@@ -1,5 +1,6 @@
 import lyncs_io as io
 import numpy as np
+from pytest import raises
 
 from lyncs_io.testing import dtype_loop, shape_loop, tempdir, generate_rand_arr
 from lyncs_utils import prod
@@ -51,3 +52,69 @@ def test_serial_numpy_with_txt(tempdir, dtype, shape):
         io.save(arr, ftmp)
         assert np.allclose(arr, io.load(ftmp, dtype=dtype))
         assert np.allclose(arr, io.load(ftmp, format="ascii", dtype=dtype))
+
+
+@shape_loop
+def test_serial_numpy_mmap(tempdir, shape):
+    arr = generate_rand_arr(shape, "float64")
+    farr = np.asfortranarray(arr)
+
+    for ftmp, data in [
+        ("foo.npy", arr),
+        ("fortran.npy", farr),
+        ("foo.lime", arr),
+        ("foo.tar/arr.npy", arr),
+        ("foo.npz/arr", arr),
+    ]:
+        io.save(data, tempdir + ftmp)
+        out = io.load(tempdir + ftmp, mmap=True)
+        assert isinstance(out, np.memmap)
+        assert not out.flags.writeable
+        assert (out == data).all()
+
+    out = io.load(tempdir + "foo.tar", mmap=True)
+    assert isinstance(out["arr.npy"], np.memmap)
+    assert (io.load(tempdir + "foo.npz", mmap=True)["arr"] == arr).all()
+
+    io.save(arr, tempdir + "foo.tgz/arr.npy")
+    with raises(ValueError):
+        io.load(tempdir + "foo.tgz/arr.npy", mmap=True)
+
+    np.savez_compressed(tempdir + "comp.npz", arr=arr)
+    with raises(ValueError):
+        io.load(tempdir + "comp.npz/arr", mmap=True)
+
+
+@shape_loop
+def test_serial_numpy_out(tempdir, shape):
+    arr = generate_rand_arr(shape, "float64")
+
+    for ftmp, data in [
+        ("foo.npy", arr),
+        ("fortran.npy", np.asfortranarray(arr)),
+        ("foo.lime", arr),
+    ]:
+        io.save(data, tempdir + ftmp)
+        header = io.head(tempdir + ftmp)
+        order = "F" if header["fortran_order"] else "C"
+        out = np.empty(shape, dtype=header["dtype"], order=order)
+        assert io.load(tempdir + ftmp, out=out) is out
+        assert (out == data).all()
+
+        with raises(ValueError):
+            io.load(tempdir + ftmp, out=np.empty(shape, dtype="float32"))
+        with raises(ValueError):
+            io.load(tempdir + ftmp, out=np.empty(shape + (2,), dtype=header["dtype"]))
+
+    # the options of numpy.load cannot be honored with out
+    with raises(ValueError):
+        io.load(tempdir + "foo.npy", out=np.empty(shape), allow_pickle=True)
+
+
+def test_serial_numpy_halo(tempdir):
+    arr = generate_rand_arr((4, 3), "float64")
+    for ftmp in ["foo.npy", "foo.lime"]:
+        io.save(arr, tempdir + ftmp)
+        # the halo is read from the neighbouring domains of comm
+        with raises(ValueError):
+            io.load(tempdir + ftmp, halo=1)
@@ -1,7 +1,9 @@
+import struct
+import numpy as np
 from numpy import dtype
-from lyncs_io import load, head
+from lyncs_io import load, head, convert_file, iter_load
 from lyncs_io.lib import lib
-from lyncs_io.testing import skip_openqcd
+from lyncs_io.testing import skip_openqcd, tempdir
 
 
 @skip_openqcd
@@ -15,3 +17,42 @@ def test_reference():
     assert attrs["shape"] == (16, 8, 8, 8, 4, 3, 3)
     assert dtype(attrs["dtype"]) == "<c16"
     assert "plaq" in attrs
+
+
+def from_openqcd(data, dims):
+    "Reference implementation of lib.from_openqcd"
+    volume = np.prod(dims)
+    faces = [np.prod(dims[mu + 1 :], dtype=int) for mu in range(4)]
+    data = data.reshape(volume // 2, 4, 2, 3, 3)
+    out = np.empty((volume, 4, 3, 3), dtype=data.dtype)
+    for site in range(volume):
+        coords = np.unravel_index(site, dims)
+        for mu in range(4):
+            if sum(coords) % 2:
+                out[site, mu] = data[site // 2, mu, 0]
+            else:
+                step = faces[mu] * (1 - dims[mu] if coords[mu] + 1 == dims[mu] else 1)
+                out[site, mu] = data[(site + step) // 2, mu, 1]
+    return out.reshape(tuple(dims) + (4, 3, 3))
+
+
+def test_lazy(tempdir):
+    dims = (4, 2, 6, 4)
+    data = np.random.rand(np.prod(dims) * 36) * (1 + 1j)
+    ftmp = tempdir + "/conf.oqcd"
+    with open(ftmp, "wb") as fptr:
+        fptr.write(struct.pack("<iiiid", *dims, 1.0))
+        data.tofile(fptr)
+
+    ref = from_openqcd(data, dims)
+    lazy = load(ftmp, lazy=True)
+    assert lazy.shape == ref.shape
+    for key in (slice(None), 0, -1, slice(1, 3), (slice(None, None, -2), 1)):
+        assert np.array_equal(lazy[key], ref[key])
+
+    convert_file(ftmp, tempdir + "/conf.npy", max_memory=10 * 2**16)
+    assert np.array_equal(load(tempdir + "/conf.npy"), ref)
+
+    slabs = list(iter_load(ftmp))
+    assert len(slabs) == dims[0]
+    assert np.array_equal(np.concatenate(slabs), ref)
@@ -0,0 +1,102 @@
+import os
+from threading import Event
+from concurrent.futures import CancelledError
+import numpy as np
+from pytest import raises, mark
+
+import lyncs_io as io
+from lyncs_io import pread
+from lyncs_io.pread import split_ranges, pread_runs, pread_into
+from lyncs_io.utils import read_array
+from lyncs_io.testing import tempdir
+
+
+def test_split_ranges():
+    runs = [(10, 5000), (6000, 3), (6010, 8200)]
+    for size in (4096, 8192, 2**20):
+        tasks = split_ranges(runs, size)
+        pieces = [piece for task in tasks for piece in task]
+        assert sum(nbytes for _, _, nbytes in pieces) == 5000 + 3 + 8200
+        pos = 0
+        for offset, start, nbytes in pieces:
+            assert start == pos
+            pos += nbytes
+            # the pieces do not cross the boundaries of the ranges
+            assert offset // size == (offset + nbytes - 1) // size
+    assert split_ranges([], 4096) == []
+
+
+@mark.parametrize("threads", [1, 3, 8])
+def test_pread_runs(tempdir, monkeypatch, threads):
+    monkeypatch.setattr(pread, "MIN_PARALLEL", 0)
+    data = np.random.bytes(100_000)
+    ftmp = tempdir + "data.bin"
+    with open(ftmp, "wb") as fptr:
+        fptr.write(data)
+
+    buf = bytearray(len(data) - 7)
+    pread_into(ftmp, buf, 7, threads=threads, range_size=4096)
+    assert bytes(buf) == data[7:]
+
+    runs = [(1, 10), (5000, 20000), (99_000, 1000)]
+    buf = bytearray(sum(num for _, num in runs))
+    fd = os.open(ftmp, os.O_RDONLY)
+    try:
+        pread_runs(fd, buf, runs, threads=threads, range_size=4096)
+        expected = b"".join(data[off : off + num] for off, num in runs)
+        assert bytes(buf) == expected
+
+        cancel = Event()
+        cancel.set()
+        with raises(CancelledError):
+            pread_runs(fd, buf, runs, threads=threads, cancel=cancel)
+        with raises(ValueError):
+            pread_runs(fd, bytearray(10), [(len(data) - 5, 10)], threads=threads)
+    finally:
+        os.close(fd)
+
+
+def test_read_array(tempdir, monkeypatch):
+    monkeypatch.setattr(pread, "MIN_PARALLEL", 0)
+    arr = np.random.rand(50, 40)
+    for ext in ("npy", "lime", "tar/arr.npy"):
+        ftmp = tempdir + "arr." + ext
+        io.save(arr, ftmp)
+        assert np.array_equal(io.load(ftmp), arr)
+
+    header = io.head(tempdir + "arr.npy")
+    out = np.empty_like(arr)
+    read_array(
+        tempdir + "arr.npy",
+        arr.shape,
+        arr.dtype,
+        header["_offset"],
+        out=out,
+        threads=4,
+        range_size=4096,
+    )
+    assert np.array_equal(out, arr)
+
+
+def test_configure(tempdir):
+    previous = io.configure_reads(threads=2, range_size=8192)
+    try:
+        assert pread.default_threads() == 2
+        assert pread.default_range_size(2**30, 2) == 8192
+        with raises(ValueError):
+            io.configure_reads(threads=0)
+        with raises(ValueError):
+            io.configure_reads(range_size=1000)
+
+        io.configure_reads()
+        assert pread.default_range_size(2**30, 4) == pread.MAX_RANGE
+        assert pread.default_range_size(1, 4) == pread.MIN_RANGE
+
+        ftmp = tempdir + "data.bin"
+        with open(ftmp, "wb") as fptr:
+            fptr.write(np.random.bytes(10_000))
+        result = io.autotune_reads(ftmp, threads=[1, 2])
+        assert set(result) == {1, 2}
+        assert pread.THREADS in result
+    finally:
+        io.configure_reads(*previous)
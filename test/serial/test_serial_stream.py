@@ -0,0 +1,137 @@
+import numpy as np
+from pytest import raises, mark
+
+import lyncs_io as io
+from lyncs_io import metrics
+from lyncs_io.stream import slabs
+from lyncs_io.testing import tempdir, skip_hdf5
+
+
+def test_slabs():
+    shape = (4, 5, 6)
+    for nbytes in (8, 40, 48, 100, 240, 1000, 10000):
+        boxes = list(slabs(shape, 8, nbytes))
+        arr = np.zeros(shape)
+        for box in boxes:
+            assert arr[box].nbytes <= nbytes
+            arr[box] += 1
+        assert (arr == 1).all()
+
+    assert len(list(slabs(shape, 8, 10000))) == 1
+    assert len(list(slabs(shape, 8, 480, axes=1))) == 2
+    with raises(ValueError):
+        list(slabs(shape, 8, 100, axes=1))
+    assert list(slabs((0, 3), 8, 8)) == [(slice(0, 0, 1), slice(0, 3, 1))]
+
+
+conversions = [
+    ("npy", "lime"),
+    ("lime", "npy"),
+    ("npy", "tar/arr.lime"),
+    ("tar/arr.npy", "npy"),
+    ("lime", "tar.gz/arr.npy"),
+]
+
+
+@mark.parametrize("src,dst", conversions)
+@mark.parametrize("workers", [0, 2])
+@mark.parametrize("order", ["C", "F"])
+def test_convert_file(tempdir, src, dst, workers, order):
+    arr = np.asarray(np.random.rand(6, 5, 4), order=order)
+    src, dst = f"{tempdir}/src.{src}", f"{tempdir}/dst.{dst}"
+    io.save(arr, src)
+
+    io.convert_file(src, dst, max_memory=1000, workers=workers, metadata={"a": 1})
+    assert np.array_equal(io.load(dst), arr)
+    assert io.head(dst)["shape"] == arr.shape
+
+
+@skip_hdf5
+@mark.parametrize("ext", ["npy", "lime"])
+def test_convert_hdf5(tempdir, ext):
+    arr = np.random.rand(6, 5, 4)
+    io.save(arr, f"{tempdir}/arr.{ext}")
+
+    io.convert_file(f"{tempdir}/arr.{ext}", f"{tempdir}/arr.h5/grp/x", max_memory=500)
+    assert np.array_equal(io.load(f"{tempdir}/arr.h5/grp/x"), arr)
+
+    io.convert_file(f"{tempdir}/arr.h5/grp/x", f"{tempdir}/new.{ext}", max_memory=500)
+    assert np.array_equal(io.load(f"{tempdir}/new.{ext}"), arr)
+
+
+def test_convert_memory(tempdir):
+    arr = np.random.rand(8, 10)
+    io.save(arr, f"{tempdir}/arr.npy")
+
+    metrics.reset()
+    metrics.enable()
+    try:
+        # a row and its big-endian copy fit in max_memory
+        io.convert_file(f"{tempdir}/arr.npy", f"{tempdir}/arr.lime", max_memory=160)
+        stats = metrics.summary()
+    finally:
+        metrics.disable()
+    assert stats[("convert", "lime")]["calls"] == 8
+    assert stats[("convert_file", "lime")]["nbytes"] == arr.nbytes
+    assert np.array_equal(io.load(f"{tempdir}/arr.lime"), arr)
+
+    with raises(ValueError):
+        io.convert_file(f"{tempdir}/arr.npy", f"{tempdir}/new.lime", max_memory=8)
+
+
+def test_convert_errors(tempdir):
+    io.save(np.zeros(3), f"{tempdir}/arr.npy")
+    io.save(np.zeros(3), f"{tempdir}/arr.tar.gz/arr.npy")
+    io.save(np.zeros(3), f"{tempdir}/arr.pkl")
+
+    with raises(ValueError):
+        io.convert_file(f"{tempdir}/arr.npy", f"{tempdir}/arr.npy")
+    with raises(ValueError):
+        io.convert_file(f"{tempdir}/arr.pkl", f"{tempdir}/new.npy")
+    with raises(ValueError):
+        io.convert_file(f"{tempdir}/arr.npy", f"{tempdir}/new.pkl")
+    with raises(ValueError):
+        io.convert_file(f"{tempdir}/arr.tar.gz/arr.npy", f"{tempdir}/new.npy")
+
+
+@mark.parametrize("ext", ["npy", "lime", "tar/arr.npy"])
+@mark.parametrize("axis", [0, 1, -1])
+@mark.parametrize("block", [1, 2, 5])
+@mark.parametrize("readahead", [0, 1, 2])
+def test_iter_load(tempdir, ext, axis, block, readahead):
+    arr = np.random.rand(4, 5, 3)
+    ftmp = f"{tempdir}/arr.{ext}"
+    io.save(arr, ftmp)
+
+    slabs = list(io.iter_load(ftmp, axis=axis, block=block, readahead=readahead))
+    assert len(slabs) == -(-arr.shape[axis] // block)
+    assert all(slab.shape[axis] <= block for slab in slabs)
+    assert np.array_equal(np.concatenate(slabs, axis=axis), arr)
+
+
+@skip_hdf5
+def test_iter_load_hdf5(tempdir):
+    arr = np.random.rand(6, 4)
+    io.save(arr, f"{tempdir}/arr.h5/x")
+    slabs = list(io.iter_load(f"{tempdir}/arr.h5/x", block=4))
+    assert [slab.shape for slab in slabs] == [(4, 4), (2, 4)]
+    assert np.array_equal(np.concatenate(slabs), arr)
+
+
+def test_iter_load_errors(tempdir):
+    io.save(np.zeros(3), f"{tempdir}/arr.npy")
+    io.save(np.zeros(()), f"{tempdir}/scalar.npy")
+    io.save(np.zeros(3), f"{tempdir}/arr.pkl")
+
+    slabs = io.iter_load(f"{tempdir}/arr.npy", block=2)
+    assert np.array_equal(next(slabs), np.zeros(2))
+    slabs.close()
+
+    with raises(ValueError):
+        io.iter_load(f"{tempdir}/arr.pkl")
+    with raises(ValueError):
+        io.iter_load(f"{tempdir}/scalar.npy")
+    with raises(ValueError):
+        io.iter_load(f"{tempdir}/arr.npy", block=0)
+    with raises(IndexError):
+        io.iter_load(f"{tempdir}/arr.npy", axis=1)
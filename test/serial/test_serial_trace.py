@@ -0,0 +1,48 @@
+import json
+import numpy as np
+
+import lyncs_io as io
+from lyncs_io import metrics, trace
+from lyncs_io.testing import tempdir
+
+
+def test_trace(tempdir):
+    trace.clear()
+    trace.start(name="main")
+    assert trace.is_active() and metrics.is_enabled()
+    io.save(np.zeros((4, 4)), tempdir + "arr.lime")
+    io.load(tempdir + "arr.lime")
+    trace.stop()
+    assert not trace.is_active() and not metrics.is_enabled()
+
+    # not recorded after stop
+    io.load(tempdir + "arr.lime")
+    names = [event["name"] for event in trace.spans()["events"]]
+    assert names.count("load") == 1 and "convert" in names
+
+    trace.save(tempdir + "trace.json")
+    with open(tempdir + "trace.json", encoding="utf-8") as fptr:
+        events = json.load(fptr)["traceEvents"]
+    assert {
+        "name": "process_name",
+        "ph": "M",
+        "pid": 0,
+        "args": {"name": "main"},
+    } in events
+    spans = [event for event in events if event["ph"] == "X"]
+    assert len(spans) == len(names)
+    load = next(event for event in spans if event["name"] == "load")
+    assert load["cat"] == "lime" and load["dur"] > 0
+    assert load["args"]["nbytes"] == 128
+    # nested spans are within the parent span
+    save = next(event for event in spans if event["name"] == "save")
+    convert = next(event for event in spans if event["name"] == "convert")
+    assert save["ts"] <= convert["ts"] <= save["ts"] + save["dur"]
+
+    trace.merge([tempdir + "trace.json"] * 2, tempdir + "merged.json")
+    with open(tempdir + "merged.json", encoding="utf-8") as fptr:
+        events = json.load(fptr)["traceEvents"]
+    assert {event["pid"] for event in events} == {0, 1}
+    assert len([event for event in events if event["ph"] == "X"]) == 2 * len(spans)
+    trace.clear()
+    metrics.reset()
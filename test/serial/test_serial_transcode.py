@@ -0,0 +1,106 @@
+import os
+import numpy as np
+from pytest import raises, mark
+
+import lyncs_io as io
+from lyncs_io.transcode import members, main
+from lyncs_io.testing import tempdir, skip_hdf5
+
+
+def write_ensemble(path, num=4):
+    os.makedirs(path + "/sub")
+    arrs = {}
+    for i in range(num):
+        key = f"cfg_{i}.lime" if i < num - 1 else f"sub/cfg_{i}.lime"
+        arrs[key] = np.random.rand(3, 4)
+        io.save(arrs[key], f"{path}/{key}")
+    return arrs
+
+
+def test_members(tempdir):
+    arrs = write_ensemble(tempdir + "ens")
+    with open(tempdir + "ens/README", "w") as fptr:
+        fptr.write("readme")
+
+    keys = [key for key, _ in members(tempdir + "ens", pattern="*.lime")]
+    assert keys == sorted(arrs)
+    assert len(members(tempdir + "ens")) == len(arrs) + 1
+    assert members(tempdir + "ens/cfg_0.lime")[0][0] == "cfg_0.lime"
+
+
+dsts = [
+    ("dir", lambda key: key.replace(".lime", ".npy")),
+    ("out.npz", lambda key: key[:-5].replace("/", "_")),
+    ("out.tar", lambda key: key.replace(".lime", ".npy")),
+]
+
+
+@mark.parametrize("dst,dst_key", dsts)
+@mark.parametrize("executor", ["thread", "process"])
+def test_transcode(tempdir, dst, dst_key, executor):
+    arrs = write_ensemble(tempdir + "ens")
+    dst = tempdir + dst
+
+    results = io.transcode(tempdir + "ens", dst, workers=2, executor=executor)
+    assert set(results) == set(arrs)
+    for key, arr in arrs.items():
+        assert results[key] == f"{dst}/{dst_key(key)}"
+        assert np.array_equal(io.load(results[key]), arr)
+
+    # back to lime files
+    back = tempdir + "back"
+    results = io.transcode(dst, back, format="lime", errors="raise")
+    assert len(results) == len(arrs)
+    for arr in results.values():
+        assert arr.endswith(".lime")
+
+
+@skip_hdf5
+def test_transcode_hdf5(tempdir):
+    arrs = write_ensemble(tempdir + "ens")
+    results = io.transcode(tempdir + "ens", tempdir + "out.h5", executor="thread")
+    for key, arr in arrs.items():
+        assert np.array_equal(io.load(tempdir + "out.h5/" + key[:-5]), arr)
+
+    results = io.transcode(tempdir + "out.h5", tempdir + "out.npz")
+    assert set(results) == {key[:-5] for key in arrs}
+
+
+def test_transcode_resume(tempdir):
+    arrs = write_ensemble(tempdir + "ens")
+    with open(tempdir + "ens/README", "w") as fptr:
+        fptr.write("readme")
+    dst = tempdir + "out.npz"
+
+    results = io.transcode(tempdir + "ens", dst, executor="thread")
+    assert isinstance(results.pop("README"), ValueError)
+    assert len(results) == len(arrs)
+    assert os.path.exists(dst + ".manifest")
+
+    # only the failed member is retried
+    results = io.transcode(tempdir + "ens", dst, executor="thread")
+    assert list(results) == ["README"]
+    with raises(ValueError):
+        io.transcode(tempdir + "ens", dst, executor="thread", errors="raise")
+
+    # without manifest all the members are transcoded
+    results = io.transcode(tempdir + "ens", tempdir + "new", manifest=False)
+    assert len(results) == len(arrs) + 1
+    assert not os.path.exists(tempdir + "new.manifest")
+
+
+def test_transcode_errors(tempdir):
+    write_ensemble(tempdir + "ens")
+    with raises(ValueError):
+        io.transcode(tempdir + "ens", tempdir + "out.lime")
+    with raises(ValueError):
+        io.transcode(tempdir + "ens", tempdir + "out.tar.gz")
+    with raises(ValueError):
+        io.transcode(tempdir + "ens", tempdir + "out", errors="ignore")
+
+
+def test_transcode_main(tempdir, capsys):
+    arrs = write_ensemble(tempdir + "ens")
+    main([tempdir + "ens", tempdir + "out", "--threads", "--pattern", "cfg_*"])
+    assert "Transcoded 3 members, 0 failed" in capsys.readouterr().out
+    assert os.path.exists(tempdir + "out/cfg_0.npy")
@@ -0,0 +1,94 @@
+import numpy as np
+from pytest import raises, mark, param
+
+import lyncs_io as io
+from lyncs_io import metrics
+from lyncs_io.testing import tempdir, skip_hdf5
+
+
+@mark.parametrize("ext", ["npy", "lime", param("h5/arr", marks=skip_hdf5)])
+@mark.parametrize("workers", [0, 2])
+def test_writer(tempdir, ext, workers):
+    arr = np.random.rand(6, 5, 4)
+    ftmp = tempdir + "writer." + ext
+
+    with io.open_writer(ftmp, arr.shape, arr.dtype, workers=workers) as out:
+        # any order, any slabs
+        for t in (5, 1, 3):
+            out[t] = arr[t]
+        out[::2, :, ::-1] = arr[::2, :, ::-1]
+        buf = arr[1, 1:3].copy()
+        out[1, 1:3] = buf
+        buf[:] = 0
+        # empty slabs are skipped
+        out[0:0] = arr[0:0]
+        out[2, 5:] = arr[2, 5:]
+
+    assert np.array_equal(io.load(ftmp), arr)
+
+
+@mark.parametrize("ext", ["lime", param("h5/arr", marks=skip_hdf5)])
+def test_writer_metadata(tempdir, ext):
+    ftmp = tempdir + "meta." + ext
+
+    with io.open_writer(ftmp, (4, 3), "int64", metadata={"run": "a"}) as out:
+        out[...] = 1
+        out.attrs["run"] = "b" * 100
+        out.attrs["trajectory"] = 7
+
+    assert np.array_equal(io.load(ftmp), np.ones((4, 3), dtype="int64"))
+    header = io.head(ftmp)
+    assert header["run"] == "b" * 100
+    assert header["trajectory"] == 7
+
+
+def test_writer_errors(tempdir):
+    ftmp = tempdir + "err.lime"
+    with raises(ValueError):
+        with io.open_writer(ftmp, (4, 3), "int64", reserve=8) as out:
+            out[...] = 1
+            out.attrs["run"] = "b" * 100
+    with raises(ValueError):
+        io.open_writer(tempdir + "err.tar", (4,), "int64")
+    with raises(ValueError):
+        io.open_writer(ftmp, (4,), "int64", collective=True)
+
+    out = io.open_writer(ftmp, (4, 3), "int64")
+    with raises(IndexError):
+        out[4] = 1
+    with raises(ValueError):
+        out[0] = np.ones(4)
+    out.close()
+    with raises(ValueError):
+        out[0] = 1
+
+
+def test_writer_close_after_error(tempdir, monkeypatch):
+    from lyncs_io import writer
+
+    def failing(*args):
+        raise OSError("disk full")
+
+    # the failed write is raised on close, after finalizing and closing the file
+    out = io.open_writer(tempdir + "fail.lime", (4, 3), "int64", workers=1)
+    monkeypatch.setattr(writer, "_pwrite", failing)
+    out[0] = 1
+    with raises(OSError):
+        out.close()
+    assert out.closed and out._file.closed
+    out.close()
+
+
+def test_writer_metrics(tempdir):
+    ftmp = tempdir + "metrics.npy"
+    metrics.reset()
+    metrics.enable()
+    try:
+        with io.open_writer(ftmp, (4, 3), "float64") as out:
+            for t in range(4):
+                out[t] = t
+    finally:
+        metrics.disable()
+    stats = metrics.summary()[("writer.write", "numpy")]
+    assert stats["calls"] == 4
+    assert stats["nbytes"] == 4 * 3 * 8
@@ -5,9 +5,17 @@ Tests for utils.py
 # ignore missing doc-string warnings
 # pylint: disable=C0116
 
+import os
 import tarfile
 import pytest
-from lyncs_io.utils import find_file, get_depth, find_member, format_key
+from lyncs_io.utils import (
+    find_file,
+    get_depth,
+    find_member,
+    format_key,
+    DirectoryIndex,
+    HeaderCache,
+)
 from lyncs_io.testing import tempdir
 from lyncs_io.base import save
 
@@ -27,11 +35,127 @@ def test_find_file(tempdir):
     with pytest.raises(FileNotFoundError):
         find_file(tempdir + "/d_data")
 
+    # names are not patterns
+    open(tempdir + "x[1]*.npy", "w")
+    open(tempdir + "x1.npy", "w")
+    assert find_file(tempdir + "x[1]*") == tempdir + "x[1]*.npy"
+    with pytest.raises(FileNotFoundError):
+        find_file(tempdir + "x?")
+
     # test FileLike objects
     with open(tempdir + "data.npy", "w") as data:
         assert find_file(data) is data
 
 
+def test_directory_index(tempdir):
+    index = DirectoryIndex(maxsize=2, racy=0)
+    open(tempdir + "data.npy", "w")
+    assert index.listdir(tempdir) == ("data.npy",)
+    assert index.is_dir(tempdir)
+    assert len(index) == 1
+
+    # the cached listing is used while the directory is unchanged
+    mtime, trusted, _ = index._cache[os.path.abspath(tempdir)]
+    index._cache[os.path.abspath(tempdir)] = (mtime, trusted, ("cached",))
+    assert index.listdir(tempdir) == ("cached",)
+
+    # a change of the directory updates the listing
+    open(tempdir + "data.h5", "w")
+    os.utime(tempdir, ns=(mtime + 10**9, mtime + 10**9))
+    assert sorted(index.listdir(tempdir)) == ["data.h5", "data.npy"]
+    assert [p.name for p in index.glob(tempdir, "*.h5")] == ["data.h5"]
+
+    # recently modified directories are not trusted
+    index.racy = 10**9
+    index.invalidate(tempdir)
+    index.listdir(tempdir)
+    assert not index._cache[os.path.abspath(tempdir)][1]
+
+    # bounded size
+    for name in ("a", "b", "c"):
+        os.mkdir(tempdir + name)
+        index.listdir(tempdir + name)
+    assert len(index) == 2
+    assert not index.is_dir(tempdir + "d")
+
+    # removed directories are dropped
+    os.rmdir(tempdir + "c")
+    assert not index.is_dir(tempdir + "c")
+    assert len(index) == 1
+    open(tempdir + "c", "w")
+    with pytest.raises(OSError):
+        index.listdir(tempdir + "c")
+    os.rmdir(tempdir + "b")
+    with pytest.raises(OSError):
+        index.listdir(tempdir + "b")
+    assert len(index) == 0
+
+    index.listdir(tempdir)
+    index.invalidate()
+    assert len(index) == 0
+
+
+def test_directory_index_threads(tempdir):
+    from concurrent.futures import ThreadPoolExecutor
+
+    index = DirectoryIndex(maxsize=2, racy=0)
+    dirs = [tempdir + str(i) for i in range(8)]
+    for path in dirs:
+        os.mkdir(path)
+
+    # concurrent lookups and evictions
+    with ThreadPoolExecutor(8) as pool:
+        assert all(names == () for names in pool.map(index.listdir, dirs * 50))
+    assert len(index) == 2
+
+
+def test_header_cache(tempdir):
+    cache = HeaderCache(maxsize=2, racy=0)
+    calls = []
+
+    @cache
+    def head(filename):
+        calls.append(filename)
+        return {"size": os.path.getsize(getattr(filename, "name", filename))}
+
+    ftmp = tempdir + "data.npy"
+    with open(ftmp, "wb") as fptr:
+        fptr.write(b"x")
+    assert head(ftmp) == {"size": 1}
+    assert head(ftmp) == {"size": 1}
+    assert len(calls) == 1 and len(cache) == 1
+
+    # returned headers are copies
+    head(ftmp)["size"] = 10
+    assert head(ftmp) == {"size": 1}
+
+    # a modified file is parsed again
+    with open(ftmp, "ab") as fptr:
+        fptr.write(b"x")
+    assert head(ftmp) == {"size": 2}
+    assert len(calls) == 2
+
+    # file-like objects and extra arguments are not cached
+    with open(ftmp, "rb") as fptr:
+        head(fptr)
+    assert len(calls) == 3
+
+    # global switch
+    cache.enabled = False
+    head(ftmp)
+    assert len(calls) == 4
+    cache.enabled = True
+
+    # recently modified files are not cached
+    cache.invalidate(ftmp)
+    cache.racy = 10**9
+    head(ftmp)
+    assert len(cache) == 0
+
+    cache.invalidate()
+    assert len(cache) == 0
+
+
 def test_find_member(tempdir):
     arr = None
     path = tempdir + "tarball.tar"
@@ -80,3 +204,24 @@ def test_get_depth():
 
     key = "user/bar/.."
     assert get_depth(path, key) == 1
+
+
+def test_header_cache_threads(tempdir):
+    from concurrent.futures import ThreadPoolExecutor
+
+    cache = HeaderCache(maxsize=2, racy=0)
+
+    @cache
+    def head(filename):
+        return {"name": os.path.basename(filename)}
+
+    files = [tempdir + f"data{i}.npy" for i in range(8)]
+    for ftmp in files:
+        open(ftmp, "w").close()
+        os.utime(ftmp, ns=(0, 0))
+
+    # concurrent lookups and evictions
+    with ThreadPoolExecutor(8) as pool:
+        headers = list(pool.map(head, files * 50))
+    assert headers == [{"name": os.path.basename(ftmp)} for ftmp in files * 50]
+    assert len(cache) == 2